@@ -17,7 +17,7 @@ fileConfig(config.config_file_name)
 # add your model's MetaData object here
 # for 'autogenerate' support
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
-from app.models import user, podcast
+from app.models import user, podcast, series
 from app.core.database import Base
 
 target_metadata = Base.metadata
@@ -0,0 +1,42 @@
+"""Add podcast series
+
+Revision ID: add_podcast_series
+Revises: merge_multiple_heads
+Create Date: 2026-10-16 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_podcast_series'
+down_revision = 'merge_multiple_heads'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # 批量生成的多集节目归入同一个系列
+    op.create_table(
+        'podcast_series',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('title', sa.String(255), nullable=False),
+        sa.Column('description', sa.Text(), nullable=True),
+        sa.Column('cover_image_url', sa.String(500), nullable=True),
+        sa.Column('user_email', sa.String(100), nullable=False),
+        sa.Column('episode_count', sa.Integer(), nullable=True, server_default='0'),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    )
+    op.create_index('ix_podcast_series_id', 'podcast_series', ['id'])
+    op.create_index('ix_podcast_series_user_email', 'podcast_series', ['user_email'])
+    op.add_column('podcasts', sa.Column('series_id', sa.Integer(), sa.ForeignKey('podcast_series.id'), nullable=True))
+    op.add_column('podcasts', sa.Column('episode_number', sa.Integer(), nullable=True))
+    op.create_index('ix_podcasts_series_id', 'podcasts', ['series_id'])
+
+def downgrade():
+    op.drop_index('ix_podcasts_series_id', table_name='podcasts')
+    op.drop_column('podcasts', 'episode_number')
+    op.drop_column('podcasts', 'series_id')
+    op.drop_index('ix_podcast_series_user_email', table_name='podcast_series')
+    op.drop_index('ix_podcast_series_id', table_name='podcast_series')
+    op.drop_table('podcast_series')
@@ -0,0 +1,24 @@
+from celery import Celery
+from app.core.config import settings
+
+# 播客生成任务队列，broker 和结果存储默认都使用 Redis
+celery_app = Celery(
+    "longanai",
+    broker=settings.CELERY_BROKER_URL or settings.REDIS_URL,
+    backend=settings.CELERY_RESULT_BACKEND or settings.REDIS_URL,
+    include=["app.tasks.podcast_tasks", "app.tasks.batch_tasks"]
+)
+
+celery_app.conf.update(
+    task_serializer="json",
+    result_serializer="json",
+    accept_content=["json"],
+    task_track_started=True,
+    # worker 执行完才确认消息，worker 重启或崩溃时任务会重新投递而不是丢失
+    task_acks_late=True,
+    task_reject_on_worker_lost=True,
+    worker_prefetch_multiplier=1,
+    task_time_limit=settings.PODCAST_JOB_TIME_LIMIT,
+    result_expires=settings.PODCAST_JOB_TTL,
+    broker_transport_options={"visibility_timeout": settings.PODCAST_JOB_TIME_LIMIT * 2},
+)
@@ -9,6 +9,52 @@ class Settings(BaseSettings):
     # Redis
     REDIS_URL: str = "redis://redis:6379"
     
+    # Audio Processing Settings
+    AUDIO_SINGLE_PASS_PIPELINE: bool = True  # 使用 ffmpeg 单遍完成标准化、重采样和编码
+    AUDIO_PASSTHROUGH: bool = True  # 输入MP3已符合目标编码规格时直接使用，不再重新编码
+    
+    # Audio Cache Settings (按内容寻址的合成音频缓存)
+    AUDIO_CACHE_ENABLED: bool = True
+    AUDIO_CACHE_MAX_BYTES: int = 2 * 1024 * 1024 * 1024  # 缓存总大小上限 2GB，超出后按LRU淘汰
+    
+    # Translation Cache Settings (翻译结果缓存：进程内LRU + Redis)
+    TRANSLATION_CACHE_ENABLED: bool = True
+    TRANSLATION_CACHE_TTL: int = 7 * 24 * 3600  # 译文缓存过期时间（秒）
+    TRANSLATION_CACHE_LOCAL_SIZE: int = 1000  # 进程内LRU最多保存的条目数
+    
+    # Cantonese Fast Path Settings (短文本先用短语表规则转换，置信度足够时跳过大模型)
+    CANTONESE_FASTPATH_MAX_CHARS: int = 60  # 只有短句走规则转换，超过该长度的文本直接交给大模型翻译
+    CANTONESE_FASTPATH_MIN_CONFIDENCE: float = 0.8  # 规则转换置信度下限
+    
+    # Translation Engine Settings (异步分段并行翻译)
+    TRANSLATION_SEGMENT_TOKENS: int = 600  # 每个翻译分段的估算 token 上限
+    TRANSLATION_CONCURRENCY: int = 8  # 进程内同时进行的 GPT 请求数
+    TRANSLATION_TIMEOUT: float = 60.0  # 单个分段请求超时（秒）
+    TRANSLATION_MAX_RETRIES: int = 1  # 单个分段失败后的重试次数
+    TRANSLATION_BATCH_MAX_ITEMS: int = 50  # 批量翻译接口一次最多接受的文本数
+    TRANSLATION_PIPELINE_ENABLED: bool = True  # 普通话输入时翻译分段完成即送入TTS，两阶段并行
+    TRANSLATION_PIPELINE_QUEUE_SIZE: int = 2  # 翻译与TTS阶段之间的缓冲分段数（背压）
+    
+    # Generation Quota Settings (Redis 原子计数，定期批量写回 users 表)
+    QUOTA_RESERVATION_TTL: int = 1800  # 预占额度的租约时长（秒），进程崩溃后自动释放
+    QUOTA_FLUSH_INTERVAL: float = 30.0  # 计数写回数据库的间隔（秒）
+    QUOTA_FLUSH_BATCH_SIZE: int = 500  # 每批写回的用户数
+    
+    # Single Flight Settings (相同的进行中生成请求只合成一次)
+    SINGLE_FLIGHT_LOCK_TTL: int = 120  # 执行者锁的租约时长（秒），执行期间自动续约
+    SINGLE_FLIGHT_RESULT_TTL: int = 60  # 执行结果保留时间（秒），供其他 worker 上的等待者读取
+    SINGLE_FLIGHT_POLL_INTERVAL: float = 0.5  # 其他 worker 上的等待者轮询结果的间隔（秒）
+    
+    # Celery Settings (异步生成任务队列，默认复用 REDIS_URL)
+    CELERY_BROKER_URL: Optional[str] = None
+    CELERY_RESULT_BACKEND: Optional[str] = None
+    PODCAST_JOB_TTL: int = 86400  # 任务状态保留时间（秒）
+    PODCAST_JOB_TIME_LIMIT: int = 900  # 单个生成任务的最长运行时间（秒）
+    BATCH_MAX_EPISODES: int = 50  # 单个批量任务最多包含的集数
+    BATCH_PARALLELISM: int = 4  # 单个批量任务同时在 worker 池中生成的集数
+    BATCH_ADMISSION_RETRIES: int = 20  # 排队等待名额超时后重新投递的最多次数
+    BATCH_ADMISSION_RETRY_DELAY: int = 30  # 排队超时后重新投递的延迟（秒）
+    
     # Security
     SECRET_KEY: str = "your-secret-key-here"
     ALGORITHM: str = "HS256"
@@ -30,6 +76,7 @@ class Settings(BaseSettings):
     
     # OpenAI Settings (for GPT translation)
     OPENAI_API_KEY: Optional[str] = None
+    OPENAI_API_BASE: Optional[str] = None  # 自定义 API 地址（如本地 fake_openai_server 用于离线测试）
     
     # TTS Settings
     EDGE_TTS_VOICES: ClassVar[Dict[str, str]] = {
@@ -43,10 +90,45 @@ class Settings(BaseSettings):
     PROJECT_NAME: str = "Longan AI"
     
     # Concurrency Settings
-    MAX_CONCURRENT_GENERATIONS: int = 20  # 最大并发生成数
+    MAX_CONCURRENT_GENERATIONS: int = 20  # 集群范围的最大并发生成数
+    ADMISSION_LEASE_TTL: float = 60.0  # 生成名额租约时长（秒），持有期间自动续约
+    ADMISSION_POLL_INTERVAL: float = 0.25  # 排队请求检查名额的间隔（秒）
+    ADMISSION_WAIT_TIMEOUT: float = 300.0  # 排队最长等待时间（秒），超时返回 503
+    ADMISSION_SERVICE_SECONDS: float = 30.0  # 加权公平排队中单个生成任务的标称耗时（秒）
     THREAD_POOL_WORKERS: int = 10  # 线程池工作线程数
     MAX_AUDIO_DURATION: int = 3600  # 最大音频时长（秒）
     
+    # Chunked TTS Settings
+    TTS_CHUNKED_SYNTHESIS: bool = True  # 长文本按句分块并行合成
+    TTS_CHUNK_MAX_CHARS: int = 300  # 每个分块最大字符数
+    TTS_CHUNK_CONCURRENCY: int = 4  # 单个任务内同时合成的分块数
+    TTS_CHUNK_MAX_RETRIES: int = 2  # 单个分块失败后的重试次数
+    TTS_CHUNK_TIMEOUT: float = 60.0  # 单个分块单次合成超时（秒）
+    TTS_SEGMENT_CACHE: bool = True  # 按分段缓存音频，文稿修改后只重新合成变化的分段
+    TTS_WORKER_LOOPS: int = 2  # TTS工作池常驻事件循环数
+    TTS_SESSIONS_PER_LOOP: int = 16  # 每个事件循环同时运行的TTS会话数
+    
+    # Google TTS Settings
+    GOOGLE_TTS_MAX_BYTES: int = 5000  # Google TTS 单次请求输入字节上限
+    GOOGLE_TTS_CONCURRENCY: int = 4  # 长文本分块同时合成的请求数
+    GOOGLE_TTS_TIMEOUT: float = 60.0  # 单次请求超时（秒）
+    GOOGLE_TTS_MAX_TEXT_CHARS: int = 50000  # /api/tts 接口接受的最大文本长度
+    
+    # TTS Engine Router Settings (Edge/Google 熔断与对冲请求)
+    TTS_HEDGE_ENABLED: bool = True  # 主引擎超过延迟阈值仍未返回时，向备用引擎发起对冲请求
+    TTS_HEDGE_PERCENTILE: float = 95.0  # 对冲延迟阈值取主引擎历史延迟的百分位
+    TTS_HEDGE_DELAY_FACTOR: float = 1.5  # 对冲延迟 = 按文本长度换算的百分位延迟 × 该系数
+    TTS_HEDGE_MIN_DELAY: float = 3.0  # 对冲延迟下限（秒）
+    TTS_HEDGE_DEFAULT_DELAY: float = 30.0  # 历史样本不足时每千字的对冲延迟（秒）
+    TTS_BREAKER_FAILURE_THRESHOLD: int = 3  # 连续失败多少次后熔断
+    TTS_BREAKER_ERROR_RATE: float = 0.5  # 统计窗口内错误率超过该值时熔断
+    TTS_BREAKER_RESET_TIMEOUT: float = 30.0  # 熔断后多久允许一次试探请求（秒）
+    TTS_ENGINE_STATS_WINDOW: int = 100  # 延迟和错误率统计窗口（请求数）
+    
+    # Scratch Space Settings (生成过程中的中间音频文件)
+    SCRATCH_DIR: str = os.getenv("SCRATCH_DIR", "")  # 暂存文件目录，建议挂载 tmpfs（如 /dev/shm/longanai）；为空时使用系统临时目录
+    SCRATCH_STALE_SECONDS: int = 3600  # 启动时清理超过该时长的遗留暂存文件
+    
     RESEND_API_KEY: str = os.getenv("RESEND_API_KEY", "")
     RESEND_FROM: str = os.getenv("RESEND_FROM", "noreply@yourdomain.com")
     
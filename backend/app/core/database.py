@@ -2,12 +2,14 @@ from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from app.core.config import settings
+from app.core.metrics import instrument_pool
 
 # Create database engine
 engine = create_engine(
     settings.DATABASE_URL,
     connect_args={"check_same_thread": False} if "sqlite" in settings.DATABASE_URL else {}
 )
+instrument_pool(engine)
 
 # Create SessionLocal class
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -35,6 +37,7 @@ def init_db():
             Community, CommunityMember, CommunityPost
         )
         from app.models.notification import Notification, NotificationSetting
+        from app.models.series import PodcastSeries
         
         # Create all tables
         Base.metadata.create_all(bind=engine)
@@ -0,0 +1,122 @@
+import os
+import time
+from contextlib import contextmanager
+from typing import Iterator, Tuple
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+from prometheus_client import multiprocess
+from sqlalchemy import event
+
+# 生成流程各阶段耗时跨度很大（毫秒级的缓存命中到分钟级的长文本合成）
+STAGE_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300)
+HTTP_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+POOL_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 30)
+SIZE_BUCKETS = (64 * 1024, 256 * 1024, 1024 ** 2, 4 * 1024 ** 2, 16 * 1024 ** 2, 64 * 1024 ** 2, 256 * 1024 ** 2)
+
+GENERATION_STAGE_SECONDS = Histogram(
+    "longan_generation_stage_seconds",
+    "Time spent in each stage of the podcast generation pipeline",
+    ["stage"],
+    buckets=STAGE_BUCKETS,
+)
+GENERATION_TOTAL = Counter(
+    "longan_generations_total",
+    "Podcast generations by outcome",
+    ["outcome"],
+)
+HTTP_REQUEST_SECONDS = Histogram(
+    "longan_http_request_seconds",
+    "HTTP request latency by route template",
+    ["method", "route", "status"],
+    buckets=HTTP_BUCKETS,
+)
+DB_POOL_CHECKOUT_SECONDS = Histogram(
+    "longan_db_pool_checkout_seconds",
+    "Time spent waiting for a connection from the database pool",
+    buckets=POOL_BUCKETS,
+)
+DB_POOL_CHECKED_OUT = Gauge(
+    "longan_db_pool_checked_out",
+    "Database connections currently checked out of the pool",
+    multiprocess_mode="livesum",
+)
+CACHE_REQUESTS = Counter(
+    "longan_cache_requests_total",
+    "Cache lookups by cache and result (hit ratio = hit / total)",
+    ["cache", "result"],
+)
+TTS_ENGINE_REQUESTS = Counter(
+    "longan_tts_engine_requests_total",
+    "TTS engine requests by engine and outcome",
+    ["engine", "outcome"],
+)
+TTS_ENGINE_SECONDS = Histogram(
+    "longan_tts_engine_seconds",
+    "TTS engine request latency",
+    ["engine"],
+    buckets=STAGE_BUCKETS,
+)
+SCRATCH_IN_USE = Gauge(
+    "longan_scratch_in_use",
+    "Scratch artifacts currently open",
+    multiprocess_mode="livesum",
+)
+SCRATCH_BYTES = Histogram(
+    "longan_scratch_bytes",
+    "Size of scratch artifacts",
+    buckets=SIZE_BUCKETS,
+)
+
+
+@contextmanager
+def track_stage(stage: str) -> Iterator[None]:
+    """记录生成流程某个阶段的耗时（无论成功与否）"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        GENERATION_STAGE_SECONDS.labels(stage=stage).observe(time.perf_counter() - start)
+
+
+def record_cache(cache: str, hit: bool):
+    CACHE_REQUESTS.labels(cache=cache, result="hit" if hit else "miss").inc()
+
+
+def instrument_pool(engine):
+    """统计从连接池取得连接的等待时间和当前借出的连接数"""
+    pool = engine.pool
+    do_get = pool._do_get
+
+    def timed_do_get():
+        start = time.perf_counter()
+        try:
+            return do_get()
+        finally:
+            DB_POOL_CHECKOUT_SECONDS.observe(time.perf_counter() - start)
+
+    pool._do_get = timed_do_get
+    event.listen(engine, "checkout", lambda *args: DB_POOL_CHECKED_OUT.inc())
+    event.listen(engine, "checkin", lambda *args: DB_POOL_CHECKED_OUT.dec())
+
+
+def render_metrics() -> Tuple[bytes, str]:
+    """
+    导出 Prometheus 文本格式的指标
+
+    设置了 PROMETHEUS_MULTIPROC_DIR 时汇总所有 worker 进程的指标。
+
+    Returns:
+        (内容, Content-Type)
+    """
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(), CONTENT_TYPE_LATEST
@@ -16,6 +16,7 @@ from app.models.user import User
 
 # JWT Token 安全配置
 security = HTTPBearer()
+optional_security = HTTPBearer(auto_error=False)
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """创建访问令牌"""
@@ -64,6 +65,14 @@ def get_current_user(
     
     return user
 
+def get_optional_user_email(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security)
+) -> Optional[str]:
+    """可选认证：返回令牌中的用户邮箱，未携带令牌或令牌无效时返回 None"""
+    if credentials is None:
+        return None
+    return verify_token(credentials.credentials)
+
 # 管理员安全配置
 class AdminSecurityConfig:
     # 登录尝试限制
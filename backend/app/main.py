@@ -1,4 +1,4 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from starlette.middleware.sessions import SessionMiddleware
@@ -15,8 +15,14 @@ from app.core.error_handlers import (
     general_exception_handler,
     http_exception_handler
 )
+from app.core.metrics import render_metrics
+from app.middleware.metrics import metrics_middleware
 from app.middleware.rate_limit import rate_limit_middleware
+from app.services.audio_cache import audio_cache
 from app.services.cdn_service import cdn_middleware
+from app.services.generation_quota import generation_quota
+from app.services.scratch_space import scratch_space
+from app.services.tts_worker_pool import tts_worker_pool
 from fastapi.exceptions import RequestValidationError
 from sqlalchemy.exc import SQLAlchemyError
 
@@ -30,9 +36,18 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         print(f"❌ Failed to initialize database: {e}")
         raise
+    # 启动常驻事件循环的TTS工作池
+    tts_worker_pool.start()
+    # 定期把 Redis 中的生成额度计数批量写回数据库
+    generation_quota.start()
+    # 清理进程崩溃遗留的暂存文件
+    scratch_space.sweep()
     yield
     # Shutdown
     print("👋 Longan AI Backend Shutting down...")
+    await generation_quota.shutdown()
+    await audio_cache.drain()
+    tts_worker_pool.shutdown()
 
 app = FastAPI(
     title="Longan AI API",
@@ -55,6 +70,7 @@ app.add_middleware(
 
 # 添加中间件
 app.middleware("http")(rate_limit_middleware)
+app.middleware("http")(metrics_middleware)
 # 暂时禁用CDN中间件，避免初始化问题
 # app.middleware("http")(cdn_middleware)
 
@@ -93,5 +109,11 @@ async def root():
 async def health_check():
     return {"status": "healthy"}
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus 指标"""
+    content, content_type = render_metrics()
+    return Response(content=content, media_type=content_type)
+
 if __name__ == "__main__":
     uvicorn.run("app.main:app", host="0.0.0.0", port=8000, reload=True) 
\ No newline at end of file
@@ -0,0 +1,21 @@
+import time
+
+from fastapi import Request
+
+from app.core.metrics import HTTP_REQUEST_SECONDS
+
+
+async def metrics_middleware(request: Request, call_next):
+    """按路由模板记录HTTP请求耗时（不使用实际路径，避免ID等参数导致标签数量失控）"""
+    start = time.perf_counter()
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        route_path = getattr(route, "path", None) or "unmatched"
+        HTTP_REQUEST_SECONDS.labels(
+            method=request.method, route=route_path, status=str(status_code)
+        ).observe(time.perf_counter() - start)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, Float, Boolean
+from sqlalchemy import Column, Integer, String, DateTime, Text, Float, Boolean, ForeignKey
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.core.database import Base
@@ -21,6 +21,8 @@ class Podcast(Base):
     tags = Column(String(200), nullable=True)  # 新增标签
     is_public = Column(Boolean, default=True)  # 是否公开
     language = Column(String(20), default="cantonese")  # 播客语言：cantonese, mandarin, english
+    series_id = Column(Integer, ForeignKey("podcast_series.id"), nullable=True, index=True)  # 所属系列
+    episode_number = Column(Integer, nullable=True)  # 在系列中的集数（从1开始）
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
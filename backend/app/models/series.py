@@ -0,0 +1,16 @@
+from sqlalchemy import Column, Integer, String, DateTime, Text
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+class PodcastSeries(Base):
+    """播客系列表（批量生成的多集节目）"""
+    __tablename__ = "podcast_series"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    title = Column(String(255), nullable=False)
+    description = Column(Text, nullable=True)
+    cover_image_url = Column(String(500), nullable=True)
+    user_email = Column(String(100), nullable=False, index=True)  # 系列作者
+    episode_count = Column(Integer, default=0)  # 已生成的集数（失败的集不计入）
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
@@ -192,7 +192,7 @@ async def upload_and_generate_podcast(
     
     # 2. 调用播客生成API
     from app.routers.podcast import generate_podcast
-    from app.routers.podcast import PodcastGenerateRequest
+    from app.services.podcast_generation import PodcastGenerateRequest
     
     # 创建播客生成请求
     podcast_request = PodcastGenerateRequest(
@@ -1,53 +1,68 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Query, status
+from fastapi import APIRouter, Depends, HTTPException, Request, UploadFile, File, Query, status
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.background import BackgroundTask
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from pydantic import BaseModel
-import edge_tts
 import asyncio
 import os
-import uuid
 import traceback
+from contextlib import AsyncExitStack
 from datetime import datetime, timedelta
-from pydub import AudioSegment
 import openai
-from concurrent.futures import ThreadPoolExecutor
 import threading
 
 from app.core.database import get_db
 from app.core.config import settings
+from app.core.security import get_current_admin_user_secure, get_current_user, get_optional_user_email
 from app.models.podcast import Podcast
+from app.models.series import PodcastSeries
 from app.models.user import User
+from app.services.podcast_generation import (
+    SUBSCRIPTION_LIMITS,
+    PodcastGenerateRequest,
+    VOICE_MAPPING,
+    format_duration,
+    podcast_generation_service,
+)
+from app.services.audio_cache import audio_cache
+from app.services.cdn_service import cdn_service
+from app.services.cloud_storage import cloud_storage_service
+from app.services.file_optimizer import file_optimizer
+from app.services.generation_admission import generation_admission
+from app.services.generation_quota import generation_quota
+from app.services.single_flight import single_flight
+from app.services.translation_cache import translation_cache
+from app.services.tts_engine_router import tts_engine_router
+from app.utils.disconnect import run_until_disconnected
+from app.utils.text_splitter import split_by_headings
+from app.services.tts_worker_pool import tts_worker_pool
+from app.tasks.batch_tasks import enqueue_batch_job, get_batch_status
+from app.tasks.podcast_tasks import enqueue_generation_job, get_job_status
 
 router = APIRouter()
 
-# Voice mapping - 所有选项都使用粤语TTS语音，因为最终都生成粤语播客
-VOICE_MAPPING = {
-    "young-lady": "zh-HK-HiuGaaiNeural",
-    "young-man": "zh-HK-WanLungNeural", 
-    "grandma": "zh-HK-HiuGaaiNeural",
-    "elderly-woman": "zh-HK-HiuGaaiNeural",
-}
-
-# Subscription limits
-SUBSCRIPTION_LIMITS = {
-    "free": 10,      # 免费用户每月10个
-    "pro": 50,       # 专业版每月50个
-    "enterprise": -1  # 企业版无限制 (-1表示无限制)
-}
-
-class PodcastGenerateRequest(BaseModel):
+class PodcastEpisodeSpec(BaseModel):
     text: str
+    title: str = ""
+    description: str = ""
+    tags: str = ""
+
+class PodcastBatchRequest(BaseModel):
+    user_email: str
+    episodes: List[PodcastEpisodeSpec] = []
+    document: str = ""  # 长文档，按标题（Markdown 标题或“第X章”）自动切分为多集，追加在 episodes 之后
     voice: str = "young-lady"
     emotion: str = "normal"
     speed: float = 1.0
-    user_email: str  # 添加用户邮箱字段
-    description: str = ""
+    description: str = ""  # 各集未指定简介时使用
     cover_image_url: str = ""
-    tags: str = ""
+    tags: str = ""  # 各集未指定标签时使用
     is_public: bool = True
-    title: str = ""  # 添加标题字段
-    is_translated: bool = False  # 添加字段指示文本是否已经翻译过
-    language: str = "cantonese"  # 播客语言：cantonese, mandarin, english
+    is_translated: bool = False
+    language: str = "cantonese"
+    series_title: str = ""  # 非空时把所有剧集归入同一个系列
+    series_description: str = ""
 
 class UserProfileUpdateRequest(BaseModel):
     display_name: str = None
@@ -60,307 +75,32 @@ class PodcastUpdateRequest(BaseModel):
     description: str = None
     tags: str = None
     is_public: bool = None
+    content: str = None  # 修改文稿后只重新合成变化的分段
 
-# 添加并发控制
+# 并发控制：名额在所有 worker 之间共享（Redis 分布式信号量）
 MAX_CONCURRENT_GENERATIONS = settings.MAX_CONCURRENT_GENERATIONS  # 最大并发生成数
-generation_semaphore = asyncio.Semaphore(MAX_CONCURRENT_GENERATIONS)
-executor = ThreadPoolExecutor(max_workers=settings.THREAD_POOL_WORKERS)  # 线程池
+executor = podcast_generation_service.executor  # 线程池
 
 @router.post("/generate")
 async def generate_podcast(
     request: PodcastGenerateRequest,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    http_request: Request = None
 ):
     """Generate podcast from text"""
-    async with generation_semaphore:  # 限制并发数
+    if request.async_mode:
+        return enqueue_podcast_generation(request, db)
+    
+    plan = podcast_generation_service.subscription_plan_of(request.user_email, db)
+    # 客户端断开连接时取消排队和生成，名额、额度和临时文件立即释放
+    return await run_until_disconnected(http_request, _generate_in_slot(request, db, plan))
+
+async def _generate_in_slot(request: PodcastGenerateRequest, db: Session, plan: str):
+    async with generation_admission.slot(request.user_email, plan):  # 按套餐排队，限制集群范围的并发数
         try:
             print(f"🎤 Starting podcast generation with voice: {request.voice}")
-            print(f"📊 Current active generations: {MAX_CONCURRENT_GENERATIONS - generation_semaphore._value}")
-            
-            # Check user and their generation limits
-            user = db.query(User).filter(User.email == request.user_email).first()
-            if not user:
-                raise HTTPException(status_code=404, detail="用户不存在，请重新登录")
-            
-            if not user.is_verified:
-                raise HTTPException(status_code=403, detail="请先验证邮箱后再生成播客")
-            
-            # Check if monthly count needs to be reset
-            now = datetime.utcnow()
-            if user.last_generation_reset is None or user.last_generation_reset.month != now.month or user.last_generation_reset.year != now.year:
-                user.monthly_generation_count = 0
-                user.last_generation_reset = now
-            
-            # Check generation limits
-            user_limit = SUBSCRIPTION_LIMITS.get(user.subscription_plan, 10)
-            if user_limit != -1 and user.monthly_generation_count >= user_limit:
-                raise HTTPException(
-                    status_code=429, 
-                    detail=f"已达到本月生成限制 ({user_limit} 个)。请升级到专业版获得更多生成次数。"
-                )
-            
-            # Validate voice - 所有语言选项都使用相同的粤语语音
-            valid_voices = ["young-lady", "young-man", "grandma", "elderly-woman"]
-            
-            if request.voice not in valid_voices:
-                print(f"❌ Invalid voice: {request.voice}")
-                raise HTTPException(status_code=400, detail="无效的声音选择")
-            
-            # Get TTS voice - 所有选项都使用粤语TTS语音
-            tts_voice = VOICE_MAPPING[request.voice]
-            print(f"🎵 Using TTS voice: {tts_voice} for language: {request.language}")
-            
-            # Validate text length
-            if not request.text or len(request.text.strip()) == 0:
-                raise HTTPException(status_code=400, detail="请输入要转换的文本内容")
-            
-            if len(request.text) > 10000:  # 限制文本长度
-                raise HTTPException(status_code=400, detail="文本内容过长，请控制在10000字符以内")
-            
-            # 增加中文检测逻辑
-            def is_chinese(text):
-                # 简单判断是否包含中文字符
-                for ch in text:
-                    if '\u4e00' <= ch <= '\u9fff':
-                        return True
-                return False
-            # 增加粤语检测逻辑
-            def is_cantonese(text):
-                # 常见粤语字/词，可根据需要扩展
-                cantonese_keywords = [
-                    '咗', '冇', '啱', '嘅', '咩', '啦', '喺', '嚟', '咁', '佢', '乜', '唔', '嘢', '呢', '噉', '啲', '嗰', '喂', '咩', '哋', '咗', '嚟', '冇', '咩', '啱', '嘅', '啦', '喺', '佢', '乜', '嘢', '噉', '啲', '嗰', '哋', '咗', '嚟', '冇', '咩', '啱', '嘅', '啦', '喺', '佢', '乜', '嘢', '噉', '啲', '嗰', '哋'
-                ]
-                return any(word in text for word in cantonese_keywords)
-
-            tts_text = request.text
-            # 当选择mandarin时，表示用户想要将普通话转换为粤语播客
-            # 只有当文本未翻译过且是中文但不是粤语时，才进行翻译
-            if (not request.is_translated and 
-                is_chinese(request.text) and 
-                not is_cantonese(request.text) and 
-                request.language == "mandarin"):  # 明确选择普通话转粤语
-                print("🔄 用户选择普通话转粤语，开始翻译...")
-                try:
-                    # 直接调用翻译函数，避免HTTP请求
-                    from app.routers.translate import translate_text
-                    from app.routers.translate import TranslationRequest
-                    
-                    translation_request = TranslationRequest(
-                        text=request.text,
-                        targetLanguage="cantonese"
-                    )
-                    
-                    translation_response = await translate_text(translation_request)
-                    tts_text = translation_response.translatedText
-                    print(f"✅ 普通话转粤语翻译成功: {tts_text}")
-                    
-                except Exception as e:
-                    print(f"⚠️ 翻译异常，使用原文: {str(e)}")
-                    tts_text = request.text
-            elif (not request.is_translated and 
-                  is_chinese(request.text) and 
-                  not is_cantonese(request.text) and 
-                  request.language != "mandarin"):  # 其他情况下的自动翻译
-                print("🔄 检测到普通话且未翻译，自动调用翻译服务...")
-                try:
-                    # 直接调用翻译函数，避免HTTP请求
-                    from app.routers.translate import translate_text
-                    from app.routers.translate import TranslationRequest
-                    
-                    translation_request = TranslationRequest(
-                        text=request.text,
-                        targetLanguage="cantonese"
-                    )
-                    
-                    translation_response = await translate_text(translation_request)
-                    tts_text = translation_response.translatedText
-                    print(f"✅ 后端翻译成功: {tts_text}")
-                    
-                except Exception as e:
-                    print(f"⚠️ 后端翻译异常，使用原文: {str(e)}")
-                    tts_text = request.text
-            else:
-                print(f"✅ 使用前端提供的文本（已翻译: {request.is_translated}, 语言: {request.language}）")
-                tts_text = request.text
-            
-            # Validate text length and duration
-            estimated_duration = len(request.text) * 0.1  # 粗略估算：每个字符0.1秒
-            if estimated_duration > settings.MAX_AUDIO_DURATION:
-                raise HTTPException(
-                    status_code=400, 
-                    detail=f"文本过长，预计音频时长 {estimated_duration:.1f} 秒，超过最大限制 {settings.MAX_AUDIO_DURATION} 秒"
-                )
-
-            # Generate audio using Edge TTS in thread pool with timeout
-            print("🔄 Creating Edge TTS communicate object...")
-            communicate = edge_tts.Communicate(tts_text, tts_voice)
-            
-            # Create unique filename
-            filename = f"podcast_{uuid.uuid4()}.mp3"
-            
-            # 启用云存储、文件优化和CDN功能
-            print(f"📁 Audio file path: {filename}")
-            
-            # 导入云存储、文件优化和CDN服务
-            from app.services.cloud_storage import cloud_storage_service
-            from app.services.file_optimizer import file_optimizer
-            from app.services.cdn_service import cdn_service
-            
-            # 创建临时文件路径
-            temp_filepath = os.path.join("static", filename)
-            os.makedirs("static", exist_ok=True)
             
-            try:
-                # 尝试Edge TTS
-                print("🎵 Generating audio with Edge TTS...")
-                print(f"🔍 Debug: Text to synthesize: {tts_text[:100]}...")
-                print(f"🔍 Debug: Voice: {tts_voice}")
-                
-                loop = asyncio.get_event_loop()
-                await asyncio.wait_for(
-                    loop.run_in_executor(executor, lambda: asyncio.run(communicate.save(temp_filepath))),
-                    timeout=180.0
-                )
-                
-                print("✅ Edge TTS audio generated successfully")
-                
-            except asyncio.TimeoutError:
-                raise HTTPException(status_code=408, detail="生成超时，请稍后重试或减少文本长度")
-            except Exception as e:
-                print(f"❌ Edge TTS failed: {e}")
-                
-                # 尝试Google TTS作为回退
-                print("🔄 Trying Google TTS as fallback...")
-                try:
-                    from app.services.google_tts import GoogleTTSService
-                    tts_service = GoogleTTSService()
-                    
-                    audio_content = tts_service.text_to_speech(
-                        text=tts_text,
-                        language="cantonese",
-                        voice_name="yue-HK-Standard-A",
-                        speaking_rate=1.0,
-                        pitch=0.0
-                    )
-                    
-                    # 保存音频文件到临时位置
-                    temp_audio_url = tts_service.save_audio_to_file(audio_content, filename)
-                    print(f"✅ Google TTS fallback successful: {temp_audio_url}")
-                    
-                    # 更新临时文件路径为 Google TTS 保存的路径
-                    temp_filepath = os.path.join("uploads", "tts", filename)
-                    print(f"🔄 Updated temp_filepath for Google TTS: {temp_filepath}")
-                    
-                except Exception as google_error:
-                    print(f"❌ Google TTS fallback also failed: {google_error}")
-                    raise HTTPException(status_code=500, detail="音频生成失败，请稍后重试")
-            
-            # 文件优化、云存储上传和CDN URL生成
-            print("🔧 Starting file optimization and cloud storage upload...")
-            
-            try:
-                # 读取临时文件内容
-                with open(temp_filepath, 'rb') as f:
-                    audio_content = f.read()
-                
-                # 文件优化
-                print("🔧 Optimizing audio file...")
-                optimized_content, optimization_info = await file_optimizer.optimize_file(
-                    audio_content, 
-                    filename
-                )
-                print(f"✅ File optimization completed: {optimization_info}")
-                
-                # 上传到云存储
-                print("☁️ Uploading to cloud storage...")
-                storage_path = f"podcasts/{datetime.now().strftime('%Y/%m/%d')}/{filename}"
-                uploaded_path = await cloud_storage_service.upload_file(
-                    optimized_content,
-                    storage_path,
-                    "audio/mpeg"
-                )
-                print(f"✅ Cloud storage upload completed: {uploaded_path}")
-                
-                # 生成CDN URL
-                cdn_url = cdn_service.get_cdn_url(storage_path, "audio")
-                print(f"🚀 CDN URL generated: {cdn_url}")
-                
-                # 使用CDN URL作为最终音频URL
-                audio_url = cdn_url
-                
-            except Exception as e:
-                print(f"⚠️ Cloud storage/optimization failed, using local URL: {e}")
-                # 如果云存储失败，回退到本地URL
-                audio_url = f"/static/{filename}"
-            
-            # Calculate audio duration
-            try:
-                audio = AudioSegment.from_mp3(temp_filepath)
-                duration_seconds = len(audio) / 1000.0  # Convert milliseconds to seconds
-                duration_str = format_duration(duration_seconds)
-                print(f"⏱️ Audio duration: {duration_str}")
-            except Exception as e:
-                print(f"⚠️ Could not calculate duration: {e}")
-                duration_str = "00:00:00"
-            
-            # Get file size
-            file_size = os.path.getsize(temp_filepath)
-            print(f"📊 File size: {file_size} bytes")
-            
-            # Generate title from content if not provided
-            def generate_title_from_content(content: str) -> str:
-                # Remove special characters and get first meaningful sentence or phrase
-                import re
-                clean_content = re.sub(r'[^\u4e00-\u9fa5a-zA-Z0-9\s]', '', content).strip()
-                
-                # Try to find the first sentence (ending with 。！？.!?)
-                sentence_match = re.match(r'^[^。！？.!?]+[。！？.!?]', clean_content)
-                if sentence_match:
-                    sentence = sentence_match.group(0).rstrip('。！？.!?')
-                    return sentence[:50] + '...' if len(sentence) > 50 else sentence
-                
-                # If no sentence found, take first 30-50 characters
-                title = clean_content[:50] + '...' if len(clean_content) > 50 else clean_content
-                return title or '我的播客'
-            
-            # Generate title if not provided
-            podcast_title = request.title if request.title else generate_title_from_content(request.text)
-
-            # Create podcast record
-            podcast = Podcast(
-                title=podcast_title,  # 使用生成的标题
-                description=request.description,
-                content=tts_text,
-                voice=request.voice,
-                emotion=request.emotion,
-                speed=request.speed,
-                audio_url=audio_url,  # 使用优化后的CDN URL或本地URL
-                cover_image_url=request.cover_image_url,
-                duration=duration_str,
-                file_size=file_size,
-                user_email=request.user_email,
-                tags=request.tags,
-                is_public=request.is_public,
-                language=request.language # 设置播客语言
-            )
-            
-            print("💾 Saving podcast record to database...")
-            db.add(podcast)
-            
-            # Update user's generation count
-            user.monthly_generation_count += 1
-            db.commit()
-            db.refresh(podcast)
-            print(f"✅ Podcast saved with ID: {podcast.id}")
-            
-            return {
-                "id": podcast.id,
-                "audioUrl": podcast.audio_url,
-                "title": podcast.title,
-                "duration": duration_str,
-                "message": "播客生成成功",
-                "remainingGenerations": user_limit - user.monthly_generation_count if user_limit != -1 else -1
-            }
+            return await podcast_generation_service.generate(request, db)
             
         except HTTPException:
             raise
@@ -369,6 +109,209 @@ async def generate_podcast(
             print(f"🔍 Full traceback: {traceback.format_exc()}")
             raise HTTPException(status_code=500, detail="播客生成失败，请稍后重试")
 
+@router.post("/generate/stream")
+async def generate_podcast_stream(
+    request: PodcastGenerateRequest,
+    db: Session = Depends(get_db),
+    http_request: Request = None
+):
+    """Generate podcast and stream MP3 audio while it is being synthesized"""
+    plan = podcast_generation_service.subscription_plan_of(request.user_email, db)
+    # 名额在返回响应头之前获得：排队超时（503）或排队期间断开都作为普通错误返回，
+    # 此时还没有创建播客记录和预占额度；名额在音频流结束时释放
+    slot = AsyncExitStack()
+    
+    async def prepare():
+        await slot.enter_async_context(generation_admission.slot(request.user_email, plan))  # 按套餐排队，限制集群范围的并发数
+        return await podcast_generation_service.start_stream(request, db)
+    
+    try:
+        # 响应开始前的排队和翻译阶段同样在客户端断开时取消；开始输出后由 StreamingResponse 检测断开
+        podcast, tts_text, tts_voice, reservation = await run_until_disconnected(http_request, prepare())
+    except BaseException:
+        await slot.aclose()
+        raise
+    audio_buffer = bytearray()
+    state = {"completed": False}
+    
+    async def audio_stream():
+        try:
+            async for piece in podcast_generation_service.stream_audio(tts_text, tts_voice, audio_buffer):
+                yield piece
+            state["completed"] = True
+        except Exception as e:
+            print(f"❌ Error during streaming generation: {str(e)}")
+            raise
+        finally:
+            try:
+                if not state["completed"]:
+                    await podcast_generation_service.abort_stream(podcast.id, reservation)
+            finally:
+                await slot.aclose()
+    
+    async def finalize():
+        # 响应发送完毕后再上传音频并补全播客记录
+        if state["completed"]:
+            await podcast_generation_service.finalize_stream(
+                podcast.id, request, tts_text, tts_voice, bytes(audio_buffer), reservation
+            )
+    
+    return StreamingResponse(
+        audio_stream(),
+        media_type="audio/mpeg",
+        headers={"X-Podcast-Id": str(podcast.id), "Cache-Control": "no-cache"},
+        background=BackgroundTask(finalize)
+    )
+
+def enqueue_podcast_generation(request: PodcastGenerateRequest, db: Session):
+    """先做快速校验，再把生成任务投递到 Celery，立即返回任务ID"""
+    podcast_generation_service.validate_request(request, db)
+    
+    try:
+        job_id = enqueue_generation_job(request.dict(exclude={"async_mode"}))
+    except Exception as e:
+        print(f"❌ Failed to enqueue generation job: {e}")
+        raise HTTPException(status_code=503, detail="任务队列暂不可用，请稍后重试")
+    
+    print(f"📨 Podcast generation job queued: {job_id}")
+    return JSONResponse(
+        status_code=202,
+        content={
+            "jobId": job_id,
+            "status": "queued",
+            "statusUrl": f"/api/podcast/jobs/{job_id}",
+            "message": "播客生成任务已提交"
+        }
+    )
+
+@router.post("/generate/batch")
+def generate_podcast_batch(batch: PodcastBatchRequest, db: Session = Depends(get_db)):
+    """批量生成多集播客：一次校验用户和额度，各集作为一个批量任务在 worker 池中并行生成"""
+    specs = list(batch.episodes)
+    if batch.document.strip():
+        specs.extend(PodcastEpisodeSpec(text=body, title=title) for title, body in split_by_headings(batch.document))
+    if not specs:
+        raise HTTPException(status_code=400, detail="请提供至少一集的内容")
+    if len(specs) > settings.BATCH_MAX_EPISODES:
+        raise HTTPException(status_code=400, detail=f"单次最多生成 {settings.BATCH_MAX_EPISODES} 集")
+    
+    requests = [
+        PodcastGenerateRequest(
+            text=spec.text,
+            title=spec.title,
+            description=spec.description or batch.description,
+            tags=spec.tags or batch.tags,
+            voice=batch.voice,
+            emotion=batch.emotion,
+            speed=batch.speed,
+            user_email=batch.user_email,
+            cover_image_url=batch.cover_image_url,
+            is_public=batch.is_public,
+            is_translated=batch.is_translated,
+            language=batch.language
+        )
+        for spec in specs
+    ]
+    podcast_generation_service.validate_user(batch.user_email, db, episodes=len(requests))
+    for index, request in enumerate(requests):
+        try:
+            podcast_generation_service.validate_content(request)
+        except HTTPException as e:
+            raise HTTPException(status_code=e.status_code, detail=f"第 {index + 1} 集: {e.detail}")
+    
+    series = None
+    if batch.series_title.strip():
+        series = PodcastSeries(
+            title=batch.series_title.strip(),
+            description=batch.series_description,
+            cover_image_url=batch.cover_image_url,
+            user_email=batch.user_email,
+            # 集数和编号随各集完成更新，失败的集不占编号
+            episode_count=0
+        )
+        db.add(series)
+        db.commit()
+        db.refresh(series)
+    
+    try:
+        batch_id = enqueue_batch_job(
+            batch.user_email,
+            [request.dict(exclude={"async_mode"}) for request in requests],
+            series.id if series else None
+        )
+    except Exception as e:
+        print(f"❌ Failed to enqueue batch generation: {e}")
+        if series is not None:
+            db.delete(series)
+            db.commit()
+        raise HTTPException(status_code=503, detail="任务队列暂不可用，请稍后重试")
+    
+    print(f"📨 Batch generation queued: {batch_id} ({len(requests)} episodes)")
+    return JSONResponse(
+        status_code=202,
+        content={
+            "batchId": batch_id,
+            "status": "queued",
+            "total": len(requests),
+            "seriesId": series.id if series else None,
+            "episodes": [{"index": index, "title": request.title} for index, request in enumerate(requests)],
+            "statusUrl": f"/api/podcast/batches/{batch_id}",
+            "message": "批量生成任务已提交"
+        }
+    )
+
+def _ensure_job_owner(owner: Optional[str], current_user: User):
+    """任务只对提交者（和管理员）可见；对其他人与任务不存在一样返回 404，不暴露任务是否存在"""
+    if owner != current_user.email and not current_user.is_admin:
+        raise HTTPException(status_code=404, detail="任务不存在或已过期")
+
+@router.get("/batches/{batch_id}")
+def get_batch_job(batch_id: str, current_user: User = Depends(get_current_user)):
+    """查询批量生成任务的整体进度和每一集的状态"""
+    batch_status = get_batch_status(batch_id)
+    if batch_status is None:
+        raise HTTPException(status_code=404, detail="任务不存在或已过期")
+    _ensure_job_owner(batch_status.get("userEmail"), current_user)
+    return batch_status
+
+@router.get("/series/{series_id}")
+def get_podcast_series(series_id: int, db: Session = Depends(get_db)):
+    """获取系列信息和已生成的剧集（按集数排序）"""
+    series = db.query(PodcastSeries).filter(PodcastSeries.id == series_id).first()
+    if not series:
+        raise HTTPException(status_code=404, detail="系列不存在")
+    
+    episodes = db.query(Podcast).filter(Podcast.series_id == series_id).order_by(Podcast.episode_number).all()
+    return {
+        "id": series.id,
+        "title": series.title,
+        "description": series.description,
+        "coverImageUrl": series.cover_image_url,
+        "userEmail": series.user_email,
+        "episodeCount": series.episode_count,
+        "createdAt": series.created_at.isoformat() if series.created_at else None,
+        "episodes": [
+            {
+                "id": podcast.id,
+                "episodeNumber": podcast.episode_number,
+                "title": podcast.title,
+                "audioUrl": podcast.audio_url,
+                "duration": podcast.duration,
+                "isPublic": podcast.is_public
+            }
+            for podcast in episodes
+        ]
+    }
+
+@router.get("/jobs/{job_id}")
+def get_generation_job(job_id: str, current_user: User = Depends(get_current_user)):
+    """查询异步生成任务的阶段、进度和结果"""
+    job_status = get_job_status(job_id)
+    if job_status is None:
+        raise HTTPException(status_code=404, detail="任务不存在或已过期")
+    _ensure_job_owner(job_status.get("userEmail"), current_user)
+    return job_status
+
 @router.get("/history")
 def get_podcast_history(db: Session = Depends(get_db)):
     """Get podcast history"""
@@ -396,8 +339,11 @@ def delete_podcast(podcast_id: int, db: Session = Depends(get_db)):
     if not podcast:
         raise HTTPException(status_code=404, detail="播客不存在")
     
-    # Delete audio file if exists
-    if podcast.audio_url:
+    # Delete audio file if exists - 合并生成的播客共用同一个音频文件，仍被引用时保留
+    shared_audio = podcast.audio_url and db.query(Podcast.id).filter(
+        Podcast.audio_url == podcast.audio_url, Podcast.id != podcast.id
+    ).first()
+    if podcast.audio_url and not shared_audio:
         filepath = os.path.join(settings.UPLOAD_DIR, os.path.basename(podcast.audio_url))
         if os.path.exists(filepath):
             os.remove(filepath)
@@ -414,19 +360,14 @@ def get_user_stats(user_email: str, db: Session = Depends(get_db)):
     if not user:
         raise HTTPException(status_code=404, detail="用户不存在")
     
-    # Check if monthly count needs to be reset
-    now = datetime.utcnow()
-    if user.last_generation_reset is None or user.last_generation_reset.month != now.month or user.last_generation_reset.year != now.year:
-        user.monthly_generation_count = 0
-        user.last_generation_reset = now
-        db.commit()
-    
+    # 本月用量以 Redis 中的额度计数为准，数据库中的计数定期批量写回
+    used = generation_quota.usage(user)
     user_limit = SUBSCRIPTION_LIMITS.get(user.subscription_plan, 10)
-    remaining = user_limit - user.monthly_generation_count if user_limit != -1 else -1
+    remaining = max(user_limit - used, 0) if user_limit != -1 else -1
     
     return {
         "subscription_plan": user.subscription_plan,
-        "monthly_generation_count": user.monthly_generation_count,
+        "monthly_generation_count": used,
         "monthly_generation_limit": user_limit,
         "remaining_generations": remaining,
         "is_unlimited": user_limit == -1,
@@ -497,7 +438,7 @@ def get_user_podcasts(
     }
 
 @router.put("/podcast/{podcast_id}")
-def update_podcast(
+async def update_podcast(
     podcast_id: int,
     request: PodcastUpdateRequest,
     user_email: str,
@@ -517,9 +458,20 @@ def update_podcast(
     if request.is_public is not None:
         podcast.is_public = request.is_public
     
+    segment_stats = None
+    if request.content is not None and request.content != podcast.content:
+        segment_stats = await podcast_generation_service.resynthesize(podcast, request.content)
+    
     db.commit()
     db.refresh(podcast)
     
+    if segment_stats is not None:
+        return {
+            "message": "播客更新成功",
+            "audioUrl": podcast.audio_url,
+            "duration": podcast.duration,
+            "segments": segment_stats
+        }
     return {"message": "播客更新成功"}
 
 @router.delete("/podcast/{podcast_id}")
@@ -779,14 +731,21 @@ def admin_review_podcast(podcast_id: int, req: ReviewStatusRequest, db: Session
 
 # 添加系统状态API
 @router.get("/system/status")
-async def get_system_status():
-    """获取系统当前状态"""
+async def get_system_status(caller: Optional[str] = Depends(get_optional_user_email)):
+    """获取系统当前状态，携带登录令牌时同时返回调用方自己的请求的排队位置"""
     try:
+        # 排队和音频缓存统计需要访问 Redis，放到线程中执行，避免 Redis 变慢时阻塞事件循环
+        admission_stats = await asyncio.to_thread(generation_admission.stats, caller)
+        audio_cache_stats = await asyncio.to_thread(audio_cache.stats)
         return {
-            "max_concurrent_generations": MAX_CONCURRENT_GENERATIONS,
-            "current_active_generations": MAX_CONCURRENT_GENERATIONS - generation_semaphore._value,
-            "available_slots": generation_semaphore._value,
+            **admission_stats,
             "thread_pool_workers": executor._max_workers,
+            "tts_worker_pool": tts_worker_pool.stats(),
+            "tts_engines": tts_engine_router.engine_stats(),
+            "audio_cache": audio_cache_stats,
+            "audio_optimizer": file_optimizer.audio_stats,
+            "translation_cache": translation_cache.stats(),
+            "single_flight": single_flight.stats(),
             "system_health": "healthy"
         }
     except Exception as e:
@@ -799,27 +758,41 @@ async def get_system_status():
             "system_health": "healthy"
         } 
 
-# 工具函数：格式化秒为HH:MM:SS
-
-def format_duration(seconds: float) -> str:
-    hours = int(seconds // 3600)
-    minutes = int((seconds % 3600) // 60)
-    secs = int(seconds % 60)
-    return f"{hours:02d}:{minutes:02d}:{secs:02d}"
-
 # 新增：自动清理无效音频记录的API（可定时调用）
 @router.delete("/admin/cleanup-invalid-podcasts")
-def cleanup_invalid_podcasts(db: Session = Depends(get_db)):
+async def cleanup_invalid_podcasts(
+    db: Session = Depends(get_db),
+    current_admin: User = Depends(get_current_admin_user_secure)
+):
     """自动清理数据库中指向不存在音频文件的播客记录"""
+    cdn_base = (cdn_service.cdn_config['base_url'] or '').rstrip('/') + '/'
     podcasts = db.query(Podcast).all()
     removed = 0
     for podcast in podcasts:
-        if podcast.audio_url:
-            # 兼容/static/前缀和绝对路径
-            filename = os.path.basename(podcast.audio_url)
-            filepath = os.path.join("static", filename)
-            if not os.path.exists(filepath):
+        if not podcast.audio_url:
+            continue
+        url = podcast.audio_url.split("?", 1)[0]
+        # 上传到存储的音频（/static/podcasts/... 或 CDN 地址）通过存储服务确认；
+        # 云存储失败时回退保存的本地文件直接检查 static 目录；其他地址无法确认，跳过
+        if url.startswith("/static/podcasts/"):
+            storage_path = url[len("/static/"):]
+        elif cdn_base != '/' and url.startswith(cdn_base + "podcasts/"):
+            storage_path = url[len(cdn_base):]
+        elif url.startswith("/static/"):
+            if not os.path.exists(os.path.join("static", url[len("/static/"):])):
                 db.delete(podcast)
                 removed += 1
+            continue
+        else:
+            continue
+        try:
+            exists = await cloud_storage_service.file_exists(storage_path)
+        except Exception as e:
+            # 无法确认时保留记录，避免存储服务故障导致误删
+            print(f"⚠️ 检查音频文件失败，跳过 {storage_path}: {e}")
+            continue
+        if not exists:
+            db.delete(podcast)
+            removed += 1
     db.commit()
-    return {"message": f"已清理无效音频记录 {removed} 条"} 
\ No newline at end of file
+    return {"message": f"已清理无效音频记录 {removed} 条"} 
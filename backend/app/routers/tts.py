@@ -5,19 +5,20 @@ from typing import Optional
 from pydantic import BaseModel
 import io
 import logging
-import time
 
 # from app.core.security import get_current_user  # 临时注释掉认证
 from app.core.database import get_db
 from app.models.user import User
-from app.services.google_tts import GoogleTTSService
+from app.core.config import settings
+from app.services.google_tts import google_tts_service
+from app.services.audio_cache import audio_cache
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(tags=["TTS"])
 
-# 初始化Google TTS服务
-tts_service = GoogleTTSService()
+# Google TTS服务（全局单例）
+tts_service = google_tts_service
 
 class TTSRequest(BaseModel):
     text: str
@@ -26,6 +27,12 @@ class TTSRequest(BaseModel):
     speaking_rate: float = 1.0
     pitch: float = 0.0
 
+def _cache_key(request: TTSRequest) -> str:
+    """音频缓存键：未指定声音时使用该语言的默认声音"""
+    language_config = tts_service.voice_mapping.get(request.language, tts_service.voice_mapping['english'])
+    voice_name = request.voice_name or language_config['default_voice']
+    return audio_cache.make_key(request.text, voice_name, "google", request.speaking_rate, request.pitch)
+
 class TTSResponse(BaseModel):
     success: bool
     message: str
@@ -51,8 +58,8 @@ async def synthesize_speech(
         logger.info(f"TTS synthesis request: text_length={len(request.text)}, language={request.language}, voice_name={request.voice_name}")
         
         # 验证文本长度
-        if len(request.text) > 5000:
-            raise HTTPException(status_code=400, detail="Text too long. Maximum 5000 characters.")
+        if len(request.text) > settings.GOOGLE_TTS_MAX_TEXT_CHARS:
+            raise HTTPException(status_code=400, detail=f"Text too long. Maximum {settings.GOOGLE_TTS_MAX_TEXT_CHARS} characters.")
         
         if len(request.text.strip()) == 0:
             raise HTTPException(status_code=400, detail="Text cannot be empty.")
@@ -69,26 +76,39 @@ async def synthesize_speech(
         if not (-20.0 <= request.pitch <= 20.0):
             raise HTTPException(status_code=400, detail="Pitch must be between -20.0 and 20.0")
         
-        logger.info("Starting Google TTS synthesis...")
-        
-        # 执行TTS转换
-        audio_content = tts_service.text_to_speech(
-            text=request.text,
-            language=request.language,
-            voice_name=request.voice_name,
-            speaking_rate=request.speaking_rate,
-            pitch=request.pitch
-        )
-        
-        logger.info(f"TTS synthesis completed, audio_content_size={len(audio_content)}")
-        
-        # 保存音频文件并获取URL
-        file_name = f"tts_{int(time.time())}.mp3"
-        logger.info(f"Saving audio file: {file_name}")
-        
-        audio_url = tts_service.save_audio_to_file(audio_content, file_name)
-        
-        logger.info(f"Audio file saved successfully: {audio_url}")
+        # 返回给客户端的地址指向按缓存键命名的发布副本，而不是缓存对象本身：
+        # 缓存条目会被LRU淘汰，已发出的URL不能因此失效
+        cache_key = _cache_key(request)
+        file_name = f"tts_{cache_key}.mp3"
+        audio_url = tts_service.get_saved_audio_url(file_name)
+        if audio_url:
+            logger.info(f"TTS already published: {audio_url}")
+        else:
+            # 相同文本和合成参数命中缓存时直接使用缓存音频，不调用TTS
+            audio_content = await audio_cache.get_audio(cache_key)
+            if audio_content is not None:
+                logger.info(f"TTS cache hit: {cache_key}")
+            else:
+                logger.info("Starting Google TTS synthesis...")
+                
+                # 执行TTS转换（异步请求，长文本自动分块并发合成）
+                audio_content = await tts_service.text_to_speech_async(
+                    text=request.text,
+                    language=request.language,
+                    voice_name=request.voice_name,
+                    speaking_rate=request.speaking_rate,
+                    pitch=request.pitch
+                )
+                
+                logger.info(f"TTS synthesis completed, audio_content_size={len(audio_content)}")
+                
+                audio_cache.put_nowait(
+                    cache_key, audio_content, engine="google", voice=request.voice_name, language=request.language
+                )
+            
+            logger.info(f"Saving audio file: {file_name}")
+            audio_url = tts_service.save_audio_to_file(audio_content, file_name)
+            logger.info(f"Audio file saved successfully: {audio_url}")
         
         # 计算音频时长（估算：假设每分钟150个字符）
         estimated_duration = len(request.text) / 150  # 分钟
@@ -109,6 +129,8 @@ async def synthesize_speech(
             duration=formatted_duration
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"TTS synthesis error: {e}")
         logger.error(f"Exception type: {type(e)}")
@@ -134,20 +156,26 @@ async def synthesize_speech_stream(
     """
     try:
         # 验证文本长度
-        if len(request.text) > 5000:
-            raise HTTPException(status_code=400, detail="Text too long. Maximum 5000 characters.")
+        if len(request.text) > settings.GOOGLE_TTS_MAX_TEXT_CHARS:
+            raise HTTPException(status_code=400, detail=f"Text too long. Maximum {settings.GOOGLE_TTS_MAX_TEXT_CHARS} characters.")
         
         if len(request.text.strip()) == 0:
             raise HTTPException(status_code=400, detail="Text cannot be empty.")
         
-        # 执行TTS转换
-        audio_content = tts_service.text_to_speech(
-            text=request.text,
-            language=request.language,
-            voice_name=request.voice_name,
-            speaking_rate=request.speaking_rate,
-            pitch=request.pitch
-        )
+        # 执行TTS转换（优先读取缓存）
+        cache_key = _cache_key(request)
+        audio_content = await audio_cache.get_audio(cache_key)
+        if audio_content is None:
+            audio_content = await tts_service.text_to_speech_async(
+                text=request.text,
+                language=request.language,
+                voice_name=request.voice_name,
+                speaking_rate=request.speaking_rate,
+                pitch=request.pitch
+            )
+            audio_cache.put_nowait(
+                cache_key, audio_content, engine="google", voice=request.voice_name, language=request.language
+            )
         
         # 返回音频流
         return StreamingResponse(
@@ -159,6 +187,8 @@ async def synthesize_speech_stream(
             }
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"TTS stream error: {e}")
         raise HTTPException(status_code=500, detail=f"TTS synthesis failed: {str(e)}")
@@ -0,0 +1,211 @@
+import asyncio
+import hashlib
+import logging
+import re
+import time
+import unicodedata
+from typing import Any, Dict, Iterable, Optional, Set
+
+from app.core.config import settings
+from app.core.metrics import record_cache
+from app.services.cache_service import cache_service
+from app.services.cloud_storage import cloud_storage_service
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+class AudioCache:
+    """按内容寻址的合成音频缓存
+
+    缓存键是规范化文本、声音、引擎和语速等合成参数的哈希。
+    音频本身保存在云存储（或本地 static）中，Redis 中保存索引：
+      audio_cache:meta:{key}  条目元数据（存储路径、大小等）
+      audio_cache:lru         以最近访问时间为分数的有序集合
+      audio_cache:bytes       缓存总字节数
+    总大小超过 AUDIO_CACHE_MAX_BYTES 时按最久未访问淘汰。
+    生成流程通过 put_nowait 在后台写入缓存，上传不占用合成的关键路径。
+    """
+
+    META_PREFIX = "audio_cache:meta"
+    LRU_KEY = "audio_cache:lru"
+    BYTES_KEY = "audio_cache:bytes"
+    STORAGE_PREFIX = "audio-cache"
+
+    def __init__(self):
+        self.enabled = settings.AUDIO_CACHE_ENABLED
+        self.max_bytes = settings.AUDIO_CACHE_MAX_BYTES
+        self.evict_batch = 20
+        self._pending: Set[asyncio.Task] = set()
+
+    @property
+    def redis(self):
+        return cache_service.redis_client
+
+    @staticmethod
+    def normalize_text(text: str) -> str:
+        """规范化文本：统一Unicode形式，合并空白"""
+        text = unicodedata.normalize("NFC", text or "")
+        return _WHITESPACE_RE.sub(" ", text).strip()
+
+    def make_key(self, text: str, voice: str, engine: str, rate: float = 1.0,
+                 pitch: float = 0.0, audio_format: str = "mp3") -> str:
+        """根据文本和合成参数生成缓存键"""
+        parts = [
+            self.normalize_text(text),
+            voice or "",
+            engine,
+            f"{float(rate):.3f}",
+            f"{float(pitch):.3f}",
+            audio_format,
+        ]
+        return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+    def storage_path(self, key: str) -> str:
+        """缓存条目在存储中的路径（按哈希前两位分目录）"""
+        return f"{self.STORAGE_PREFIX}/{key[:2]}/{key}.mp3"
+
+    def _meta_key(self, key: str) -> str:
+        return f"{self.META_PREFIX}:{key}"
+
+    @staticmethod
+    def _decode(meta: Dict[bytes, bytes]) -> Dict[str, str]:
+        return {k.decode("utf-8"): v.decode("utf-8") for k, v in meta.items()}
+
+    def lookup(self, key: str) -> Optional[Dict[str, Any]]:
+        """查询缓存索引，命中时刷新LRU时间并返回元数据"""
+        if not self.enabled:
+            return None
+        try:
+            meta = self.redis.hgetall(self._meta_key(key))
+            record_cache("audio", bool(meta))
+            if not meta:
+                return None
+            self.redis.zadd(self.LRU_KEY, {key: time.time()})
+            meta = self._decode(meta)
+            meta["size"] = int(meta.get("size", 0))
+            return meta
+        except Exception as e:
+            logger.error(f"Audio cache lookup error: {e}")
+            return None
+
+    async def get_audio(self, key: str) -> Optional[bytes]:
+        """读取缓存的音频，未命中或文件已丢失时返回 None"""
+        meta = self.lookup(key)
+        if meta is None:
+            return None
+        try:
+            return await cloud_storage_service.download_file(meta["path"])
+        except Exception as e:
+            # 索引存在但文件已丢失，删除失效条目
+            logger.warning(f"⚠️ 音频缓存文件丢失，移除索引: {key}: {e}")
+            self._drop_index(key, meta["size"])
+            return None
+
+    async def put(self, key: str, audio_content: bytes, **meta: Any) -> Optional[str]:
+        """
+        写入缓存
+
+        Args:
+            key: make_key 生成的缓存键
+            audio_content: 音频字节
+            meta: 额外记录的元数据（引擎、声音等）
+
+        Returns:
+            缓存文件的存储路径，写入失败时返回 None
+        """
+        if not self.enabled or not audio_content:
+            return None
+        path = self.storage_path(key)
+        try:
+            if self.redis.exists(self._meta_key(key)):
+                self.redis.zadd(self.LRU_KEY, {key: time.time()})
+                return path
+
+            await cloud_storage_service.upload_file(audio_content, path, "audio/mpeg")
+
+            size = len(audio_content)
+            record = {"path": path, "size": size, "created_at": int(time.time())}
+            record.update({k: str(v) for k, v in meta.items() if v is not None})
+            self.redis.hset(self._meta_key(key), mapping=record)
+            # zadd 返回新增成员数，只有首次写入才累计大小，避免并发重复写入时重复计数
+            if self.redis.zadd(self.LRU_KEY, {key: time.time()}):
+                self.redis.incrby(self.BYTES_KEY, size)
+
+            await self._evict_if_needed()
+            return path
+        except Exception as e:
+            logger.error(f"Audio cache put error: {e}")
+            return None
+
+    def put_nowait(self, key: str, audio_content: bytes, **meta: Any):
+        """在后台写入缓存，不等待上传完成（写入失败只记录日志）"""
+        if not self.enabled or not audio_content:
+            return
+        task = asyncio.ensure_future(self.put(key, audio_content, **meta))
+        # 保留任务引用，避免未完成的任务被垃圾回收
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    async def drain(self):
+        """等待后台的缓存写入完成（事件循环关闭前调用，例如 Celery 任务结束时）"""
+        while self._pending:
+            await asyncio.gather(*self._pending, return_exceptions=True)
+
+    def contains_all(self, keys: Iterable[str]) -> bool:
+        """所有键是否都已在缓存中"""
+        keys = list(keys)
+        if not self.enabled or not keys:
+            return False
+        try:
+            pipe = self.redis.pipeline()
+            for key in keys:
+                pipe.exists(self._meta_key(key))
+            return all(pipe.execute())
+        except Exception as e:
+            logger.error(f"Audio cache contains error: {e}")
+            return False
+
+    def _drop_index(self, key: str, size: int):
+        try:
+            if self.redis.zrem(self.LRU_KEY, key):
+                self.redis.decrby(self.BYTES_KEY, size)
+            self.redis.delete(self._meta_key(key))
+        except Exception as e:
+            logger.error(f"Audio cache drop index error: {e}")
+
+    async def _evict_if_needed(self):
+        """缓存总大小超限时，淘汰最久未访问的条目"""
+        total = int(self.redis.get(self.BYTES_KEY) or 0)
+        while total > self.max_bytes:
+            oldest = self.redis.zrange(self.LRU_KEY, 0, self.evict_batch - 1)
+            if not oldest:
+                break
+            for raw_key in oldest:
+                key = raw_key.decode("utf-8")
+                meta = self.redis.hgetall(self._meta_key(key))
+                size = int(meta.get(b"size", 0)) if meta else 0
+                await cloud_storage_service.delete_file(self.storage_path(key))
+                self._drop_index(key, size)
+                total -= size
+                logger.info(f"🧹 淘汰音频缓存: {key} ({size} bytes)")
+                if total <= self.max_bytes:
+                    break
+
+    def stats(self) -> Dict[str, Any]:
+        """缓存条目数和占用空间"""
+        try:
+            return {
+                "enabled": self.enabled,
+                "entries": self.redis.zcard(self.LRU_KEY),
+                "bytes": int(self.redis.get(self.BYTES_KEY) or 0),
+                "max_bytes": self.max_bytes,
+            }
+        except Exception as e:
+            logger.error(f"Audio cache stats error: {e}")
+            return {"enabled": self.enabled, "error": str(e)}
+
+
+# 全局音频缓存实例
+audio_cache = AudioCache()
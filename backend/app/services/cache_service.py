@@ -5,6 +5,7 @@ from typing import Any, Optional, Union
 from datetime import timedelta
 import logging
 from app.core.config import settings
+from app.core.metrics import record_cache
 
 logger = logging.getLogger(__name__)
 
@@ -33,6 +34,7 @@ class CacheService:
         """获取缓存"""
         try:
             value = self.redis_client.get(key)
+            record_cache("redis", value is not None)
             if value is None:
                 return default
             
@@ -1,4 +1,5 @@
 import os
+import asyncio
 import logging
 from typing import Optional, Dict, Any
 from abc import ABC, abstractmethod
@@ -69,8 +70,9 @@ class AWSS3Provider(CloudStorageProvider):
             if not content_type:
                 content_type = mimetypes.guess_type(file_path)[0] or 'application/octet-stream'
             
-            # 上传文件
-            self.s3_client.put_object(
+            # 上传文件（boto3 是阻塞调用，放到线程中执行，避免阻塞事件循环）
+            await asyncio.to_thread(
+                self.s3_client.put_object,
                 Bucket=self.bucket_name,
                 Key=file_path,
                 Body=file_content,
@@ -88,8 +90,11 @@ class AWSS3Provider(CloudStorageProvider):
     async def download_file(self, file_path: str) -> bytes:
         """从S3下载文件"""
         try:
-            response = self.s3_client.get_object(Bucket=self.bucket_name, Key=file_path)
-            return response['Body'].read()
+            def download():
+                response = self.s3_client.get_object(Bucket=self.bucket_name, Key=file_path)
+                return response['Body'].read()
+            
+            return await asyncio.to_thread(download)
         except Exception as e:
             logger.error(f"❌ S3下载失败: {e}")
             raise Exception(f"S3下载失败: {str(e)}")
@@ -97,7 +102,7 @@ class AWSS3Provider(CloudStorageProvider):
     async def delete_file(self, file_path: str) -> bool:
         """删除S3文件"""
         try:
-            self.s3_client.delete_object(Bucket=self.bucket_name, Key=file_path)
+            await asyncio.to_thread(self.s3_client.delete_object, Bucket=self.bucket_name, Key=file_path)
             logger.info(f"✅ S3文件删除成功: {file_path}")
             return True
         except Exception as e:
@@ -122,7 +127,7 @@ class AWSS3Provider(CloudStorageProvider):
     async def file_exists(self, file_path: str) -> bool:
         """检查S3文件是否存在"""
         try:
-            self.s3_client.head_object(Bucket=self.bucket_name, Key=file_path)
+            await asyncio.to_thread(self.s3_client.head_object, Bucket=self.bucket_name, Key=file_path)
             return True
         except ClientError as e:
             if e.response['Error']['Code'] == '404':
@@ -150,8 +155,8 @@ class AliyunOSSProvider(CloudStorageProvider):
             # 设置元数据
             headers = {'Content-Type': content_type}
             
-            # 上传文件
-            result = self.bucket.put_object(file_path, file_content, headers=headers)
+            # 上传文件（oss2 是阻塞调用，放到线程中执行，避免阻塞事件循环）
+            result = await asyncio.to_thread(self.bucket.put_object, file_path, file_content, headers=headers)
             
             if result.status == 200:
                 logger.info(f"✅ 文件上传到OSS成功: {file_path}")
@@ -166,8 +171,7 @@ class AliyunOSSProvider(CloudStorageProvider):
     async def download_file(self, file_path: str) -> bytes:
         """从OSS下载文件"""
         try:
-            result = self.bucket.get_object(file_path)
-            return result.read()
+            return await asyncio.to_thread(lambda: self.bucket.get_object(file_path).read())
         except Exception as e:
             logger.error(f"❌ OSS下载失败: {e}")
             raise Exception(f"OSS下载失败: {str(e)}")
@@ -175,7 +179,7 @@ class AliyunOSSProvider(CloudStorageProvider):
     async def delete_file(self, file_path: str) -> bool:
         """删除OSS文件"""
         try:
-            result = self.bucket.delete_object(file_path)
+            result = await asyncio.to_thread(self.bucket.delete_object, file_path)
             if result.status == 204:
                 logger.info(f"✅ OSS文件删除成功: {file_path}")
                 return True
@@ -200,13 +204,14 @@ class AliyunOSSProvider(CloudStorageProvider):
     async def file_exists(self, file_path: str) -> bool:
         """检查OSS文件是否存在"""
         try:
-            result = self.bucket.head_object(file_path)
+            result = await asyncio.to_thread(self.bucket.head_object, file_path)
             return result.status == 200
-        except oss2.exceptions.NoSuchKey:
+        except oss2.exceptions.NotFound:
+            # HEAD 请求没有响应体，不存在的对象抛出 NotFound 而不是 NoSuchKey
             return False
         except Exception as e:
             logger.error(f"❌ 检查OSS文件存在性失败: {e}")
-            return False
+            raise
 
 class CloudStorageService:
     """云存储服务管理器"""
@@ -280,8 +285,8 @@ class CloudStorageService:
     async def _save_to_local(self, file_content: bytes, file_path: str) -> str:
         """保存到本地"""
         try:
-            os.makedirs("static", exist_ok=True)
             full_path = os.path.join("static", file_path)
+            os.makedirs(os.path.dirname(full_path), exist_ok=True)
             
             with open(full_path, 'wb') as f:
                 f.write(file_content)
@@ -0,0 +1,216 @@
+import asyncio
+import logging
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+import edge_tts
+
+from app.core.config import settings
+from app.services.audio_cache import audio_cache
+from app.services.tts_worker_pool import tts_worker_pool
+from app.utils.text_splitter import split_text_into_chunks
+
+logger = logging.getLogger(__name__)
+
+
+class TTSChunkError(Exception):
+    """分块合成在重试后仍然失败"""
+
+
+class EdgeTTSService:
+    """Edge TTS 分块并行合成服务
+
+    每个分块作为一个可寻址的分段，按 (分段文本, 声音) 写入音频缓存。
+    文稿修改后重新合成时，未变化的分段直接复用缓存，只合成变化的分段。
+    """
+
+    SEGMENT_ENGINE = "edge-segment"
+
+    def __init__(self):
+        self.max_chunk_chars = settings.TTS_CHUNK_MAX_CHARS
+        self.concurrency = settings.TTS_CHUNK_CONCURRENCY
+        self.max_retries = settings.TTS_CHUNK_MAX_RETRIES
+        self.chunk_timeout = settings.TTS_CHUNK_TIMEOUT
+        self.retry_backoff = 0.5  # 重试退避基数（秒）
+        self.segment_cache_enabled = settings.TTS_SEGMENT_CACHE
+
+    async def _stream_audio(self, text: str, voice: str,
+                            on_data: Optional[Callable[[bytes], None]] = None) -> bytes:
+        """通过 Edge TTS websocket 合成一段文本，返回MP3字节；on_data 会收到每个到达的音频片段"""
+        communicate = edge_tts.Communicate(text, voice)
+        audio = bytearray()
+        async for chunk in communicate.stream():
+            if chunk["type"] == "audio":
+                audio.extend(chunk["data"])
+                if on_data is not None:
+                    on_data(chunk["data"])
+        if not audio:
+            raise TTSChunkError("Edge TTS 未返回音频数据")
+        return bytes(audio)
+
+    async def _synthesize_once(self, text: str, voice: str) -> bytes:
+        """在TTS工作池的常驻事件循环中合成单个分块（一次尝试）"""
+        return await tts_worker_pool.submit(lambda: self._stream_audio(text, voice))
+
+    async def synthesize_chunk(self, text: str, voice: str, index: int = 0) -> bytes:
+        """合成单个分块，失败时按指数退避重试"""
+        attempts = self.max_retries + 1
+        last_error = None
+        for attempt in range(attempts):
+            try:
+                return await asyncio.wait_for(
+                    self._synthesize_once(text, voice),
+                    timeout=self.chunk_timeout
+                )
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                last_error = e
+                logger.warning(f"⚠️ 分块 {index} 第 {attempt + 1}/{attempts} 次合成失败: {e}")
+                if attempt + 1 < attempts:
+                    await asyncio.sleep(self.retry_backoff * (2 ** attempt))
+        raise TTSChunkError(f"分块 {index} 合成失败: {last_error}")
+
+    def segments_cached(self, text: str, voice: str) -> bool:
+        """文本的所有分段是否都已在分段缓存中（此时整篇音频可以由分段拼出）"""
+        if not self.segment_cache_enabled:
+            return False
+        chunks = split_text_into_chunks(text, self.max_chunk_chars)
+        return audio_cache.contains_all(audio_cache.make_key(chunk, voice, self.SEGMENT_ENGINE) for chunk in chunks)
+
+    async def synthesize(self, text: str, voice: str) -> bytes:
+        """
+        按句切分文本，并行合成各分块后按原顺序拼接
+
+        Args:
+            text: 要合成的文本
+            voice: Edge TTS 声音名称
+
+        Returns:
+            拼接后的MP3字节
+        """
+        audio, _ = await self.synthesize_segments(text, voice)
+        return audio
+
+    async def synthesize_segments(self, text: str, voice: str) -> Tuple[bytes, Dict[str, Any]]:
+        """
+        分段合成并返回复用统计
+
+        Returns:
+            (拼接后的MP3字节, {"segments": 总分段数, "reused": 缓存复用数, "synthesized": 新合成数})
+        """
+        chunks = split_text_into_chunks(text, self.max_chunk_chars)
+        if not chunks:
+            raise TTSChunkError("没有可合成的文本")
+
+        logger.info(f"🔪 文本切分为 {len(chunks)} 个分块，并发数 {self.concurrency}")
+        semaphore = asyncio.Semaphore(self.concurrency)
+        stats = {"segments": len(chunks), "reused": 0, "synthesized": 0}
+
+        async def run(index: int, chunk: str) -> bytes:
+            cache_key = audio_cache.make_key(chunk, voice, self.SEGMENT_ENGINE)
+            if self.segment_cache_enabled:
+                cached = await audio_cache.get_audio(cache_key)
+                if cached is not None:
+                    stats["reused"] += 1
+                    return cached
+
+            async with semaphore:
+                audio = await self.synthesize_chunk(chunk, voice, index)
+            stats["synthesized"] += 1
+
+            if self.segment_cache_enabled:
+                audio_cache.put_nowait(cache_key, audio, engine=self.SEGMENT_ENGINE, voice=voice)
+            return audio
+
+        tasks = [asyncio.ensure_future(run(i, chunk)) for i, chunk in enumerate(chunks)]
+        try:
+            results: List[bytes] = await asyncio.gather(*tasks)
+        except BaseException:
+            # 任一分块最终失败时取消其余分块，避免浪费合成资源
+            for task in tasks:
+                task.cancel()
+            raise
+
+        logger.info(f"🧩 分段合成完成: 共 {stats['segments']} 段，复用 {stats['reused']} 段，新合成 {stats['synthesized']} 段")
+        # Edge TTS 输出为不带ID3头的MP3帧流，可以直接按顺序拼接
+        return b"".join(results), stats
+
+    async def stream(self, text: str, voice: str) -> AsyncIterator[bytes]:
+        """
+        边合成边输出音频
+
+        各分块仍然并行合成，但按原顺序输出；当前分块的音频片段一到达就立即输出，
+        后续分块在后台提前合成并缓冲，因此首个音频片段的延迟只取决于第一个分块。
+        已经输出过片段的分块无法重试（否则音频会重复），只有尚未输出任何数据的失败才会重试。
+
+        Yields:
+            MP3字节片段
+        """
+        chunks = split_text_into_chunks(text, self.max_chunk_chars)
+        if not chunks:
+            raise TTSChunkError("没有可合成的文本")
+
+        caller_loop = asyncio.get_running_loop()
+        queues = [asyncio.Queue() for _ in chunks]
+        semaphore = asyncio.Semaphore(self.concurrency)
+        done = object()
+
+        async def produce(index: int, chunk: str):
+            queue = queues[index]
+            cache_key = audio_cache.make_key(chunk, voice, self.SEGMENT_ENGINE)
+            try:
+                if self.segment_cache_enabled:
+                    cached = await audio_cache.get_audio(cache_key)
+                    if cached is not None:
+                        queue.put_nowait(cached)
+                        return
+
+                forwarded = False
+
+                def forward(data: bytes):
+                    nonlocal forwarded
+                    forwarded = True
+                    # 回调在TTS工作池的事件循环线程中执行，需要切回调用方的事件循环
+                    caller_loop.call_soon_threadsafe(queue.put_nowait, data)
+
+                attempts = self.max_retries + 1
+                async with semaphore:
+                    for attempt in range(attempts):
+                        try:
+                            audio = await asyncio.wait_for(
+                                tts_worker_pool.submit(lambda: self._stream_audio(chunk, voice, forward)),
+                                timeout=self.chunk_timeout
+                            )
+                            break
+                        except asyncio.CancelledError:
+                            raise
+                        except Exception as e:
+                            if forwarded or attempt + 1 >= attempts:
+                                raise TTSChunkError(f"分块 {index} 合成失败: {e}")
+                            logger.warning(f"⚠️ 分块 {index} 第 {attempt + 1}/{attempts} 次合成失败: {e}")
+                            await asyncio.sleep(self.retry_backoff * (2 ** attempt))
+
+                if self.segment_cache_enabled:
+                    audio_cache.put_nowait(cache_key, audio, engine=self.SEGMENT_ENGINE, voice=voice)
+            except Exception as e:
+                queue.put_nowait(e)
+            finally:
+                queue.put_nowait(done)
+
+        tasks = [asyncio.ensure_future(produce(i, chunk)) for i, chunk in enumerate(chunks)]
+        try:
+            for queue in queues:
+                while True:
+                    item = await queue.get()
+                    if item is done:
+                        break
+                    if isinstance(item, Exception):
+                        raise item
+                    yield item
+        finally:
+            for task in tasks:
+                task.cancel()
+
+
+# 全局Edge TTS服务实例
+edge_tts_service = EdgeTTSService()
@@ -1,16 +1,25 @@
 import os
+import re
+import shutil
+import asyncio
 import logging
 from typing import Tuple, Optional, Dict, Any
 from PIL import Image, ImageOps
 import io
 import mimetypes
 from pydub import AudioSegment
-import tempfile
 import subprocess
 from app.core.config import settings
+from app.services.scratch_space import scratch_space
+from app.utils.mp3_info import scan_mp3
 
 logger = logging.getLogger(__name__)
 
+_FFMPEG_OUT_TIME_RE = re.compile(r'out_time_us=(\d+)')
+_FFMPEG_DURATION_RE = re.compile(r'Duration: (\d+):(\d+):(\d+(?:\.\d+)?)')
+_FFMPEG_INPUT_RE = re.compile(r'Audio: \w+.*?, (\d+) Hz, (mono|stereo)')
+_FFMPEG_CHANNELS = {'mono': 1, 'stereo': 2}
+
 class FileOptimizer:
     """文件优化服务"""
     
@@ -24,13 +33,38 @@ class FileOptimizer:
             'thumbnail_sizes': [150, 300, 600]
         }
         
-        # 音频优化配置
-        self.audio_config = {
-            'target_bitrate': '128k',
-            'sample_rate': 44100,
-            'channels': 2,
-            'format': 'mp3'
+        # 音频优化配置：default 用于用户上传的任意音频（可能是音乐或立体声），
+        # speech 只用于生成的播客（单声道、24kHz，足以保证人声清晰且编码开销小）
+        self.audio_profiles = {
+            'default': {
+                'target_bitrate': '128k',
+                'sample_rate': 44100,
+                'channels': 2,
+                'format': 'mp3',
+                'loudnorm_filter': None
+            },
+            'speech': {
+                'target_bitrate': '64k',
+                'sample_rate': 24000,
+                'channels': 1,
+                'format': 'mp3',
+                # 单遍响度标准化（EBU R128），无需预先扫描整段音频
+                'loudnorm_filter': 'loudnorm=I=-16:TP=-1.5:LRA=11'
+            }
         }
+        
+        # 直通规格：MP3 输入满足以下条件时不再解码和重新编码（TTS 输出通常已满足）
+        self.passthrough_config = {
+            'max_bitrate': 128000,
+            'sample_rates': (16000, 22050, 24000, 32000, 44100, 48000),
+            'max_channels': 2
+        }
+        
+        # 直通/重新编码次数统计，用于评估直通节省的编码开销
+        self.audio_stats = {'passthrough': 0, 'reencoded': 0}
+        
+        # 可用时使用 ffmpeg 单遍流水线，否则回退到 pydub
+        self.ffmpeg_path = shutil.which('ffmpeg') if settings.AUDIO_SINGLE_PASS_PIPELINE else None
     
     async def optimize_image(self, image_content: bytes, filename: str) -> Tuple[bytes, Dict[str, Any]]:
         """优化图片文件"""
@@ -136,18 +170,30 @@ class FileOptimizer:
         
         return thumbnails
     
-    async def optimize_audio(self, audio_content: bytes, filename: str) -> Tuple[bytes, Dict[str, Any]]:
-        """优化音频文件"""
-        try:
-            # 创建临时文件
-            with tempfile.NamedTemporaryFile(suffix=os.path.splitext(filename)[1], delete=False) as temp_in:
-                temp_in.write(audio_content)
-                temp_in_path = temp_in.name
-            
-            with tempfile.NamedTemporaryFile(suffix='.mp3', delete=False) as temp_out:
-                temp_out_path = temp_out.name
-            
+    async def optimize_audio(self, audio_content: bytes, filename: str, profile: str = 'default') -> Tuple[bytes, Dict[str, Any]]:
+        """优化音频文件，profile 为 audio_profiles 中的规格名"""
+        audio_config = self.audio_profiles[profile]
+        if settings.AUDIO_PASSTHROUGH:
+            passthrough_info = self._check_passthrough(audio_content, filename)
+            if passthrough_info:
+                self.audio_stats['passthrough'] += 1
+                logger.info(f"⏩ 音频已符合目标规格，跳过重新编码: {filename}")
+                return audio_content, passthrough_info
+        
+        self.audio_stats['reencoded'] += 1
+        if self.ffmpeg_path:
             try:
+                return await self._optimize_audio_single_pass(audio_content, filename, audio_config)
+            except Exception as e:
+                logger.warning(f"⚠️ ffmpeg单遍优化失败，回退到pydub: {e}")
+        
+        try:
+            # pydub 通过 ffmpeg 读写文件路径，临时文件放在暂存目录中，退出时删除
+            with scratch_space.path(os.path.splitext(filename)[1]) as temp_in_path, \
+                    scratch_space.path('.mp3') as temp_out_path:
+                with open(temp_in_path, 'wb') as temp_in:
+                    temp_in.write(audio_content)
+                
                 # 使用pydub加载音频
                 audio = AudioSegment.from_file(temp_in_path)
                 
@@ -157,13 +203,13 @@ class FileOptimizer:
                 original_sample_rate = audio.frame_rate
                 
                 # 优化音频
-                optimized_audio = self._optimize_audio_quality(audio)
+                optimized_audio = self._optimize_audio_quality(audio, audio_config)
                 
                 # 导出优化后的音频
                 optimized_audio.export(
                     temp_out_path,
                     format='mp3',
-                    bitrate=self.audio_config['target_bitrate'],
+                    bitrate=audio_config['target_bitrate'],
                     parameters=['-q:a', '2']  # 高质量设置
                 )
                 
@@ -185,40 +231,160 @@ class FileOptimizer:
                     'original_sample_rate': original_sample_rate,
                     'optimized_duration': len(optimized_audio),
                     'optimized_channels': optimized_audio.channels,
-                    'optimized_sample_rate': optimized_audio.frame_rate
+                    'optimized_sample_rate': optimized_audio.frame_rate,
+                    'passthrough': False,
+                    'pipeline': 'pydub'
                 }
                 
                 logger.info(f"✅ 音频优化完成: {filename}, 压缩率: {compression_ratio:.2f}%")
                 return optimized_content, optimization_info
                 
-            finally:
-                # 清理临时文件
-                os.unlink(temp_in_path)
-                os.unlink(temp_out_path)
-                
         except Exception as e:
             logger.error(f"❌ 音频优化失败: {e}")
             raise Exception(f"音频优化失败: {str(e)}")
     
-    def _optimize_audio_quality(self, audio: AudioSegment) -> AudioSegment:
+    def _check_passthrough(self, audio_content: bytes, filename: str) -> Optional[Dict[str, Any]]:
+        """
+        只解析帧头检查MP3是否已符合直通规格
+        
+        Returns:
+            符合时返回 optimization_info，否则返回 None
+        """
+        if mimetypes.guess_type(filename)[0] != 'audio/mpeg':
+            return None
+        try:
+            mp3_info = scan_mp3(audio_content)
+        except ValueError:
+            return None
+        
+        profile = self.passthrough_config
+        if (mp3_info['layer'] != 3
+                or mp3_info['bitrate'] > profile['max_bitrate']
+                or mp3_info['sample_rate'] not in profile['sample_rates']
+                or mp3_info['channels'] > profile['max_channels']
+                or mp3_info['duration'] <= 0):
+            return None
+        
+        duration_ms = int(mp3_info['duration'] * 1000)
+        return {
+            'original_size': len(audio_content),
+            'optimized_size': len(audio_content),
+            'compression_ratio': 0,
+            'original_duration': duration_ms,
+            'original_channels': mp3_info['channels'],
+            'original_sample_rate': mp3_info['sample_rate'],
+            'optimized_duration': duration_ms,
+            'optimized_channels': mp3_info['channels'],
+            'optimized_sample_rate': mp3_info['sample_rate'],
+            'bitrate': mp3_info['bitrate'],
+            'passthrough': True,
+            'pipeline': 'passthrough'
+        }
+    
+    async def _optimize_audio_single_pass(self, audio_content: bytes, filename: str,
+                                          audio_config: Dict[str, Any]) -> Tuple[bytes, Dict[str, Any]]:
+        """
+        用一个 ffmpeg 进程完成响度标准化、重采样和编码
+        
+        音频通过管道流入流出，解码后的PCM只存在于 ffmpeg 的流式滤镜中，
+        不会在Python内存中整体展开；时长和大小也在同一遍中得到，无需再次解码。
+        """
+        filters = [f"aresample={audio_config['sample_rate']}"]
+        if audio_config['loudnorm_filter']:
+            filters.insert(0, audio_config['loudnorm_filter'])
+        cmd = [
+            self.ffmpeg_path, '-hide_banner', '-nostats',
+            '-i', 'pipe:0',
+            '-af', ','.join(filters),
+            '-ac', str(audio_config['channels']),
+            '-b:a', audio_config['target_bitrate'],
+            '-f', 'mp3',
+            '-progress', 'pipe:2',
+            'pipe:1'
+        ]
+        process = await asyncio.create_subprocess_exec(
+            *cmd,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE
+        )
+        try:
+            optimized_content, stderr = await process.communicate(audio_content)
+        except asyncio.CancelledError:
+            process.kill()
+            await process.wait()
+            raise
+        stderr_text = stderr.decode('utf-8', errors='ignore')
+        
+        if process.returncode != 0 or not optimized_content:
+            raise Exception(f"ffmpeg exited with {process.returncode}: {stderr_text[-500:]}")
+        
+        original_size_bytes = len(audio_content)
+        optimized_size_bytes = len(optimized_content)
+        compression_ratio = (1 - optimized_size_bytes / original_size_bytes) * 100
+        input_info = _FFMPEG_INPUT_RE.search(stderr_text)
+        
+        optimization_info = {
+            'original_size': original_size_bytes,
+            'optimized_size': optimized_size_bytes,
+            'compression_ratio': round(compression_ratio, 2),
+            'original_duration': self._parse_ffmpeg_duration(stderr_text) or self._mp3_duration_ms(audio_content),
+            'original_channels': _FFMPEG_CHANNELS.get(input_info.group(2)) if input_info else None,
+            'original_sample_rate': int(input_info.group(1)) if input_info else None,
+            'optimized_duration': self._parse_ffmpeg_out_time(stderr_text) or self._mp3_duration_ms(optimized_content),
+            'optimized_channels': audio_config['channels'],
+            'optimized_sample_rate': audio_config['sample_rate'],
+            'passthrough': False,
+            'pipeline': 'ffmpeg-single-pass'
+        }
+        
+        logger.info(f"✅ 音频单遍优化完成: {filename}, 压缩率: {compression_ratio:.2f}%")
+        return optimized_content, optimization_info
+    
+    @staticmethod
+    def _parse_ffmpeg_out_time(stderr_text: str) -> Optional[int]:
+        """从 -progress 输出中取最后一个 out_time_us，返回毫秒"""
+        matches = _FFMPEG_OUT_TIME_RE.findall(stderr_text)
+        if not matches:
+            return None
+        return int(matches[-1]) // 1000
+    
+    @staticmethod
+    def _mp3_duration_ms(content: bytes) -> Optional[int]:
+        """ffmpeg 输出中没有时长时，解析MP3帧头计算，返回毫秒"""
+        try:
+            return int(scan_mp3(content)['duration'] * 1000)
+        except ValueError:
+            return None
+    
+    @staticmethod
+    def _parse_ffmpeg_duration(stderr_text: str) -> Optional[int]:
+        """解析输入的 Duration 行，返回毫秒（管道输入可能没有该信息）"""
+        match = _FFMPEG_DURATION_RE.search(stderr_text)
+        if not match:
+            return None
+        hours, minutes, seconds = match.groups()
+        return int((int(hours) * 3600 + int(minutes) * 60 + float(seconds)) * 1000)
+    
+    def _optimize_audio_quality(self, audio: AudioSegment, audio_config: Dict[str, Any]) -> AudioSegment:
         """优化音频质量"""
         # 标准化音量
         audio = audio.normalize()
         
         # 调整采样率
-        if audio.frame_rate != self.audio_config['sample_rate']:
-            audio = audio.set_frame_rate(self.audio_config['sample_rate'])
+        if audio.frame_rate != audio_config['sample_rate']:
+            audio = audio.set_frame_rate(audio_config['sample_rate'])
         
         # 调整声道数
-        if audio.channels != self.audio_config['channels']:
-            if self.audio_config['channels'] == 1:
+        if audio.channels != audio_config['channels']:
+            if audio_config['channels'] == 1:
                 audio = audio.set_channels(1)
             else:
                 audio = audio.set_channels(2)
         
         return audio
     
-    async def optimize_file(self, file_content: bytes, filename: str) -> Tuple[bytes, Dict[str, Any]]:
+    async def optimize_file(self, file_content: bytes, filename: str, audio_profile: str = 'default') -> Tuple[bytes, Dict[str, Any]]:
         """通用文件优化"""
         try:
             # 检测文件类型
@@ -227,7 +393,7 @@ class FileOptimizer:
             if content_type and content_type.startswith('image/'):
                 return await self.optimize_image(file_content, filename)
             elif content_type and content_type.startswith('audio/'):
-                return await self.optimize_audio(file_content, filename)
+                return await self.optimize_audio(file_content, filename, audio_profile)
             else:
                 # 不支持的文件类型，返回原文件
                 logger.warning(f"⚠️ 不支持的文件类型: {content_type}")
@@ -271,6 +437,18 @@ class FileOptimizer:
                     'mode': image.mode
                 })
             
+            elif content_type == 'audio/mpeg':
+                # MP3 只解析帧头，不解码音频
+                mp3_info = scan_mp3(file_content)
+                info.update({
+                    'duration_ms': int(mp3_info['duration'] * 1000),
+                    'duration_seconds': round(mp3_info['duration'], 2),
+                    'channels': mp3_info['channels'],
+                    'sample_rate': mp3_info['sample_rate'],
+                    'bitrate': mp3_info['bitrate'],
+                    'vbr': mp3_info['vbr']
+                })
+            
             elif content_type and content_type.startswith('audio/'):
                 # 获取音频信息
                 audio = AudioSegment.from_file(io.BytesIO(file_content))
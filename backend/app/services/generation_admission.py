@@ -0,0 +1,306 @@
+import asyncio
+import logging
+import math
+import time
+import uuid
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException
+
+from app.core.config import settings
+from app.core.metrics import GENERATION_STAGE_SECONDS
+from app.services.cache_service import cache_service
+
+logger = logging.getLogger(__name__)
+
+class AdmissionTimeout(HTTPException):
+    """排队超过 ADMISSION_WAIT_TIMEOUT 仍未获得名额（HTTP 接口返回 503，批量任务稍后重试）"""
+
+    def __init__(self):
+        super().__init__(status_code=503, detail="当前生成请求较多，请稍后重试")
+
+
+# 各套餐的调度权重：权重越大，排队时每个任务推进的虚拟时间越少，获得的名额份额越大
+PLAN_WEIGHTS = {
+    "free": 1,
+    "pro": 3,
+    "enterprise": 6,
+}
+
+# 各套餐最多占用的全局名额比例，避免单个套餐在高峰时占满所有名额
+PLAN_CONCURRENCY_SHARE = {
+    "free": 0.6,
+    "pro": 0.9,
+    "enterprise": 1.0,
+}
+
+# 尝试获取名额：清理过期的持有者和等待者；新请求按加权公平排队计算虚拟完成时间入队；
+# 按虚拟完成时间顺序分配空闲名额，已达套餐并发上限的请求跳过，不占用名额
+# KEYS: holders, queue, heartbeats, clocks, arrivals, wait_stats
+# ARGV: ticket, plan, now, lease_expire_at, wait_expire_at, limit, service_seconds, weight, caps...(plan, cap 成对)
+# 返回 0 表示已获得名额，否则返回当前排队位置（从1开始）
+_ACQUIRE_SCRIPT = """
+local now = tonumber(ARGV[3])
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now)
+local stale = redis.call('ZRANGEBYSCORE', KEYS[3], '-inf', now)
+if #stale > 0 then
+    redis.call('ZREM', KEYS[2], unpack(stale))
+    redis.call('ZREM', KEYS[3], unpack(stale))
+    redis.call('HDEL', KEYS[5], unpack(stale))
+end
+
+local ticket = ARGV[1]
+local plan = ARGV[2]
+if not redis.call('ZSCORE', KEYS[2], ticket) then
+    local clock = tonumber(redis.call('HGET', KEYS[4], plan) or '0')
+    local tag = math.max(now, clock) + tonumber(ARGV[7]) / tonumber(ARGV[8])
+    redis.call('HSET', KEYS[4], plan, tostring(tag))
+    redis.call('ZADD', KEYS[2], tag, ticket)
+    redis.call('HSET', KEYS[5], ticket, ARGV[3])
+end
+
+local caps = {}
+for i = 9, #ARGV, 2 do
+    caps[ARGV[i]] = tonumber(ARGV[i + 1])
+end
+local running = {}
+for _, holder in ipairs(redis.call('ZRANGE', KEYS[1], 0, -1)) do
+    local holder_plan = string.match(holder, '^([^|]*)')
+    running[holder_plan] = (running[holder_plan] or 0) + 1
+end
+
+local free = tonumber(ARGV[6]) - redis.call('ZCARD', KEYS[1])
+local position = 0
+for _, waiter in ipairs(redis.call('ZRANGE', KEYS[2], 0, -1)) do
+    position = position + 1
+    local waiter_plan = string.match(waiter, '^([^|]*)')
+    local cap = caps[waiter_plan] or tonumber(ARGV[6])
+    if (running[waiter_plan] or 0) < cap then
+        if waiter == ticket then
+            if free > 0 then
+                local waited = now - tonumber(redis.call('HGET', KEYS[5], ticket) or ARGV[3])
+                redis.call('ZREM', KEYS[2], ticket)
+                redis.call('ZREM', KEYS[3], ticket)
+                redis.call('HDEL', KEYS[5], ticket)
+                redis.call('ZADD', KEYS[1], ARGV[4], ticket)
+                redis.call('HINCRBY', KEYS[6], plan .. ':admitted', 1)
+                redis.call('HINCRBYFLOAT', KEYS[6], plan .. ':wait_seconds', waited)
+                return 0
+            end
+            break
+        end
+        if free > 0 then
+            free = free - 1
+            running[waiter_plan] = (running[waiter_plan] or 0) + 1
+        end
+    elseif waiter == ticket then
+        break
+    end
+end
+redis.call('ZADD', KEYS[3], ARGV[5], ticket)
+return position
+"""
+
+
+class GenerationAdmission:
+    """集群范围的生成并发控制（Redis 分布式信号量 + 按套餐加权的公平队列）
+
+    所有 uvicorn worker 共用同一组名额：
+      generation_admission:holders     持有名额的请求（有序集合，分数为租约到期时间）
+      generation_admission:queue       排队中的请求（有序集合，分数为虚拟完成时间）
+      generation_admission:heartbeats  排队请求的心跳到期时间
+      generation_admission:clocks      各套餐的虚拟时钟
+      generation_admission:arrivals    排队请求的入队时间
+      generation_admission:wait_stats  各套餐累计的入场次数和排队时长
+    排队采用加权公平排队：请求入队时的虚拟完成时间为 max(当前时间, 套餐虚拟时钟) + 标称耗时 / 套餐权重。
+    虚拟时间跟随墙钟推进，已排队请求的分数不变而新请求的分数不小于其入队时间，
+    因此排队越久的请求越靠前（老化），免费用户的请求不会被付费用户的新请求无限推后。
+    每个套餐最多占用 PLAN_CONCURRENCY_SHARE 比例的名额。
+    持有者定期续约，进程崩溃后租约到期自动释放名额；排队者轮询时刷新心跳，
+    断开的请求心跳过期后移出队列。Redis 不可用时退回到进程内信号量。
+    HTTP 请求和 Celery worker 中的生成都经过同一组名额；轮询和续约的 Redis 调用在线程中执行，
+    大量请求排队时也不会阻塞事件循环。
+    """
+
+    HOLDERS_KEY = "generation_admission:holders"
+    QUEUE_KEY = "generation_admission:queue"
+    HEARTBEATS_KEY = "generation_admission:heartbeats"
+    CLOCKS_KEY = "generation_admission:clocks"
+    ARRIVALS_KEY = "generation_admission:arrivals"
+    WAIT_STATS_KEY = "generation_admission:wait_stats"
+
+    def __init__(self):
+        self.limit = settings.MAX_CONCURRENT_GENERATIONS
+        self.lease_seconds = settings.ADMISSION_LEASE_TTL
+        self.poll_interval = settings.ADMISSION_POLL_INTERVAL
+        self.wait_timeout = settings.ADMISSION_WAIT_TIMEOUT
+        self.service_seconds = settings.ADMISSION_SERVICE_SECONDS
+        self.plan_caps = {
+            plan: max(1, math.ceil(self.limit * share)) for plan, share in PLAN_CONCURRENCY_SHARE.items()
+        }
+        self._script = None
+        self._local_semaphore: Optional[asyncio.Semaphore] = None
+        self._local_loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @property
+    def redis(self):
+        return cache_service.redis_client
+
+    @staticmethod
+    def _normalize_plan(plan: Optional[str]) -> str:
+        return plan if plan in PLAN_WEIGHTS else "free"
+
+    @staticmethod
+    def _parse_ticket(ticket: str) -> Tuple[str, str]:
+        """票据格式为 套餐|调用方|随机ID，返回 (套餐, 调用方)"""
+        plan, caller, _ = ticket.split("|", 2)
+        return plan, caller
+
+    def _acquire_script(self):
+        if self._script is None:
+            self._script = self.redis.register_script(_ACQUIRE_SCRIPT)
+        return self._script
+
+    def _try_acquire(self, ticket: str, plan: str) -> int:
+        now = time.time()
+        caps = [item for plan_cap in self.plan_caps.items() for item in plan_cap]
+        return int(self._acquire_script()(
+            keys=[
+                self.HOLDERS_KEY, self.QUEUE_KEY, self.HEARTBEATS_KEY,
+                self.CLOCKS_KEY, self.ARRIVALS_KEY, self.WAIT_STATS_KEY,
+            ],
+            args=[
+                ticket, plan, now, now + self.lease_seconds, now + self.poll_interval * 10,
+                self.limit, self.service_seconds, PLAN_WEIGHTS[plan], *caps,
+            ]
+        ))
+
+    def _leave_queue(self, ticket: str):
+        try:
+            pipe = self.redis.pipeline()
+            pipe.zrem(self.QUEUE_KEY, ticket)
+            pipe.zrem(self.HEARTBEATS_KEY, ticket)
+            pipe.hdel(self.ARRIVALS_KEY, ticket)
+            pipe.zrem(self.HOLDERS_KEY, ticket)
+            pipe.execute()
+        except Exception as e:
+            logger.error(f"Generation admission release error: {e}")
+
+    async def _renew_lease(self, ticket: str):
+        """持有名额期间定期续约"""
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            try:
+                await asyncio.to_thread(
+                    self.redis.zadd, self.HOLDERS_KEY, {ticket: time.time() + self.lease_seconds}, xx=True
+                )
+            except Exception as e:
+                logger.error(f"Generation admission lease renewal error: {e}")
+
+    @asynccontextmanager
+    async def _local_slot(self) -> AsyncIterator[None]:
+        loop = asyncio.get_running_loop()
+        if self._local_semaphore is None or self._local_loop is not loop:
+            # 信号量绑定在事件循环上，Celery 任务每次在新的事件循环中执行
+            self._local_semaphore = asyncio.Semaphore(self.limit)
+            self._local_loop = loop
+        async with self._local_semaphore:
+            yield
+
+    @asynccontextmanager
+    async def slot(self, caller: str = "", plan: Optional[str] = None) -> AsyncIterator[str]:
+        """
+        等待并占用一个生成名额，退出时释放
+
+        Args:
+            caller: 调用方标识（用户邮箱），用于查询排队位置
+            plan: 调用方的订阅套餐，决定排队权重和并发上限
+
+        Yields:
+            本次请求的票据
+        """
+        plan = self._normalize_plan(plan)
+        ticket = f"{plan}|{caller.replace('|', '')}|{uuid.uuid4().hex}"
+        started = time.monotonic()
+        deadline = started + self.wait_timeout
+        try:
+            position = await asyncio.to_thread(self._try_acquire, ticket, plan)
+        except Exception as e:
+            logger.error(f"Generation admission unavailable, using local semaphore: {e}")
+            async with self._local_slot():
+                yield ticket
+            return
+
+        try:
+            while position > 0:
+                if time.monotonic() >= deadline:
+                    raise AdmissionTimeout()
+                await asyncio.sleep(self.poll_interval)
+                position = await asyncio.to_thread(self._try_acquire, ticket, plan)
+        except BaseException:
+            await asyncio.to_thread(self._leave_queue, ticket)
+            raise
+        GENERATION_STAGE_SECONDS.labels(stage="admission_wait").observe(time.monotonic() - started)
+
+        renewer = asyncio.ensure_future(self._renew_lease(ticket))
+        try:
+            yield ticket
+        finally:
+            renewer.cancel()
+            # 与续约一样放到线程中，Redis 变慢时不阻塞事件循环
+            await asyncio.to_thread(self._leave_queue, ticket)
+
+    def _waiting_tickets(self, now: float) -> List[str]:
+        """按调度顺序排列、心跳未过期的排队票据"""
+        alive = {raw.decode("utf-8") for raw in self.redis.zrangebyscore(self.HEARTBEATS_KEY, now, "+inf")}
+        queue = [raw.decode("utf-8") for raw in self.redis.zrange(self.QUEUE_KEY, 0, -1)]
+        return [ticket for ticket in queue if ticket in alive]
+
+    def stats(self, caller: Optional[str] = None) -> Dict[str, Any]:
+        """全局和各套餐的进行中生成数、排队长度和排队时长，以及调用方的排队位置"""
+        try:
+            now = time.time()
+            holders = [raw.decode("utf-8") for raw in self.redis.zrangebyscore(self.HOLDERS_KEY, now, "+inf")]
+            waiting = self._waiting_tickets(now)
+            arrivals = self.redis.hgetall(self.ARRIVALS_KEY)
+            wait_stats = {k.decode("utf-8"): float(v) for k, v in self.redis.hgetall(self.WAIT_STATS_KEY).items()}
+
+            per_plan = {}
+            for plan in PLAN_WEIGHTS:
+                queued = [ticket for ticket in waiting if self._parse_ticket(ticket)[0] == plan]
+                oldest = min(
+                    (float(arrivals[ticket.encode("utf-8")]) for ticket in queued if ticket.encode("utf-8") in arrivals),
+                    default=None
+                )
+                admitted = int(wait_stats.get(f"{plan}:admitted", 0))
+                per_plan[plan] = {
+                    "weight": PLAN_WEIGHTS[plan],
+                    "concurrency_cap": self.plan_caps[plan],
+                    "in_flight": sum(1 for ticket in holders if self._parse_ticket(ticket)[0] == plan),
+                    "queued": len(queued),
+                    "oldest_wait_seconds": round(now - oldest, 3) if oldest is not None else 0.0,
+                    "admitted": admitted,
+                    "avg_wait_seconds": round(wait_stats.get(f"{plan}:wait_seconds", 0.0) / admitted, 3) if admitted else 0.0,
+                }
+
+            stats = {
+                "max_concurrent_generations": self.limit,
+                "current_active_generations": len(holders),
+                "available_slots": max(self.limit - len(holders), 0),
+                "queue_depth": len(waiting),
+                "plans": per_plan,
+            }
+            if caller:
+                stats["queue_positions"] = [
+                    position for position, ticket in enumerate(waiting, 1)
+                    if self._parse_ticket(ticket)[1] == caller
+                ]
+            return stats
+        except Exception as e:
+            logger.error(f"Generation admission stats error: {e}")
+            return {"max_concurrent_generations": self.limit, "error": str(e)}
+
+
+# 全局生成准入控制实例
+generation_admission = GenerationAdmission()
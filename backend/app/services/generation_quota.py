@@ -0,0 +1,294 @@
+import asyncio
+import logging
+import time
+import uuid
+from datetime import datetime
+from typing import Dict, Optional
+
+from sqlalchemy import case, func
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.user import User
+from app.services.cache_service import cache_service
+
+logger = logging.getLogger(__name__)
+
+# 预占额度：清理过期预占，已用 + 预占未达上限时写入新的预占
+# 数据库计数（Redis 不可用期间直接写入数据库）大于 Redis 计数时以数据库为准
+# KEYS: used, reservations  ARGV: limit, seed, reservation_id, now, lease_expire_at, key_ttl
+_RESERVE_SCRIPT = """
+redis.call('SET', KEYS[1], ARGV[2], 'NX', 'EX', ARGV[6])
+if tonumber(redis.call('GET', KEYS[1])) < tonumber(ARGV[2]) then
+    redis.call('SET', KEYS[1], ARGV[2], 'EX', ARGV[6])
+end
+redis.call('ZREMRANGEBYSCORE', KEYS[2], '-inf', ARGV[4])
+local used = tonumber(redis.call('GET', KEYS[1]))
+local reserved = redis.call('ZCARD', KEYS[2])
+local limit = tonumber(ARGV[1])
+if limit >= 0 and used + reserved >= limit then
+    return -1
+end
+redis.call('ZADD', KEYS[2], ARGV[5], ARGV[3])
+redis.call('EXPIRE', KEYS[2], ARGV[6])
+return used + reserved + 1
+"""
+
+# 确认额度：移除预占并计入已用，标记为待写回数据库
+# KEYS: used, reservations, dirty  ARGV: reservation_id, member, seed, key_ttl
+_COMMIT_SCRIPT = """
+redis.call('SET', KEYS[1], ARGV[3], 'NX', 'EX', ARGV[4])
+if tonumber(redis.call('GET', KEYS[1])) < tonumber(ARGV[3]) then
+    redis.call('SET', KEYS[1], ARGV[3], 'EX', ARGV[4])
+end
+redis.call('ZREM', KEYS[2], ARGV[1])
+local used = redis.call('INCR', KEYS[1])
+redis.call('SADD', KEYS[3], ARGV[2])
+return used
+"""
+
+
+class QuotaReservation:
+    """一次生成预占的额度，生成成功后 commit，失败后 release"""
+
+    __slots__ = ("user_email", "month", "reservation_id", "seed")
+
+    def __init__(self, user_email: str, month: str, reservation_id: Optional[str], seed: int):
+        self.user_email = user_email
+        self.month = month
+        self.reservation_id = reservation_id  # Redis 不可用时为 None
+        self.seed = seed
+
+
+class GenerationQuota:
+    """按用户和月份计数的生成额度
+
+    额度计数保存在 Redis 中，检查和预占都是单个 Lua 脚本的原子操作，不访问数据库：
+      generation_quota:{月份}:{邮箱}:used          本月已确认的生成次数
+      generation_quota:{月份}:{邮箱}:reservations  进行中的预占（有序集合，分数为租约到期时间）
+      generation_quota:dirty                       已变化、等待写回 users 表的计数
+    计数不存在时用数据库中的 monthly_generation_count 初始化；预占租约到期后自动失效，
+    进程崩溃不会永久占用额度。后台任务定期把变化的计数批量写回数据库。
+    Redis 不可用时按数据库计数检查额度，确认时直接在数据库中原子加一，生成不会漏记。
+    """
+
+    KEY_PREFIX = "generation_quota"
+    DIRTY_KEY = "generation_quota:dirty"
+    KEY_TTL = 40 * 24 * 3600  # 计数保留到下个月之后再过期
+
+    def __init__(self):
+        self.lease_seconds = settings.QUOTA_RESERVATION_TTL
+        self.flush_batch_size = settings.QUOTA_FLUSH_BATCH_SIZE
+        self.flush_interval = settings.QUOTA_FLUSH_INTERVAL
+        self._reserve_script = None
+        self._commit_script = None
+        self._flush_task: Optional[asyncio.Task] = None
+
+    @property
+    def redis(self):
+        return cache_service.redis_client
+
+    @staticmethod
+    def current_month(now: Optional[datetime] = None) -> str:
+        return (now or datetime.utcnow()).strftime("%Y%m")
+
+    def _key(self, month: str, user_email: str, suffix: str) -> str:
+        return f"{self.KEY_PREFIX}:{month}:{user_email}:{suffix}"
+
+    def seed_for(self, user: User, month: str) -> int:
+        """数据库中本月已生成的次数，用于初始化 Redis 计数"""
+        reset = user.last_generation_reset
+        if reset is None or self.current_month(reset) != month:
+            return 0
+        return user.monthly_generation_count or 0
+
+    def _scripts(self):
+        if self._reserve_script is None:
+            self._reserve_script = self.redis.register_script(_RESERVE_SCRIPT)
+            self._commit_script = self.redis.register_script(_COMMIT_SCRIPT)
+        return self._reserve_script, self._commit_script
+
+    def usage(self, user: User) -> int:
+        """本月已用次数（含进行中的预占）"""
+        month = self.current_month()
+        seed = self.seed_for(user, month)
+        try:
+            pipe = self.redis.pipeline()
+            pipe.get(self._key(month, user.email, "used"))
+            pipe.zcount(self._key(month, user.email, "reservations"), time.time(), "+inf")
+            used, reserved = pipe.execute()
+            return (int(used) if used is not None else seed) + reserved
+        except Exception as e:
+            logger.error(f"Generation quota usage error: {e}")
+            return seed
+
+    def reserve(self, user: User, limit: int) -> Optional[QuotaReservation]:
+        """
+        原子地预占一次生成额度
+
+        Returns:
+            预占记录；额度已用完时返回 None
+        """
+        month = self.current_month()
+        seed = self.seed_for(user, month)
+        reservation_id = uuid.uuid4().hex
+        try:
+            reserve_script, _ = self._scripts()
+            now = time.time()
+            result = reserve_script(
+                keys=[self._key(month, user.email, "used"), self._key(month, user.email, "reservations")],
+                args=[limit, seed, reservation_id, now, now + self.lease_seconds, self.KEY_TTL]
+            )
+            if int(result) < 0:
+                return None
+        except Exception as e:
+            # Redis 不可用时退回到数据库中的计数判断，不阻断生成
+            logger.error(f"Generation quota reserve error: {e}")
+            if limit != -1 and seed >= limit:
+                return None
+            reservation_id = None
+        return QuotaReservation(user.email, month, reservation_id, seed)
+
+    def commit(self, reservation: QuotaReservation) -> int:
+        """
+        生成成功后确认预占，计入本月已用次数
+
+        Returns:
+            本月已用次数
+        """
+        if reservation.reservation_id is None:
+            # 预占时 Redis 不可用，计数直接写入数据库
+            return self._commit_to_db(reservation)
+        try:
+            _, commit_script = self._scripts()
+            used = commit_script(
+                keys=[
+                    self._key(reservation.month, reservation.user_email, "used"),
+                    self._key(reservation.month, reservation.user_email, "reservations"),
+                    self.DIRTY_KEY,
+                ],
+                args=[
+                    reservation.reservation_id,
+                    f"{reservation.month}:{reservation.user_email}",
+                    reservation.seed,
+                    self.KEY_TTL,
+                ]
+            )
+            return int(used)
+        except Exception as e:
+            logger.error(f"Generation quota commit error, falling back to database: {e}")
+            return self._commit_to_db(reservation)
+
+    def _commit_to_db(self, reservation: QuotaReservation) -> int:
+        """
+        Redis 不可用时在数据库中原子地把本月已用次数加一（上个月的计数从 1 重新开始）
+
+        Returns:
+            本月已用次数
+        """
+        month_start = datetime.strptime(reservation.month, "%Y%m")
+        db = SessionLocal()
+        try:
+            db.query(User).filter(User.email == reservation.user_email).update(
+                {
+                    User.monthly_generation_count: case(
+                        (User.last_generation_reset >= month_start,
+                         func.coalesce(User.monthly_generation_count, 0) + 1),
+                        else_=1
+                    ),
+                    User.last_generation_reset: datetime.utcnow(),
+                },
+                synchronize_session=False
+            )
+            db.commit()
+            used = db.query(User.monthly_generation_count).filter(User.email == reservation.user_email).scalar()
+            return used or reservation.seed + 1
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Generation quota database commit error: {e}")
+            return reservation.seed + 1
+        finally:
+            db.close()
+
+    def release(self, reservation: QuotaReservation):
+        """生成失败时释放预占的额度"""
+        if reservation.reservation_id is None:
+            return
+        try:
+            self.redis.zrem(
+                self._key(reservation.month, reservation.user_email, "reservations"),
+                reservation.reservation_id
+            )
+        except Exception as e:
+            logger.error(f"Generation quota release error: {e}")
+
+    def flush(self) -> int:
+        """
+        把变化的计数批量写回 users 表
+
+        Returns:
+            写回的用户数
+        """
+        members = self.redis.spop(self.DIRTY_KEY, self.flush_batch_size)
+        if not members:
+            return 0
+
+        month = self.current_month()
+        counts: Dict[str, int] = {}
+        for raw in members:
+            member_month, user_email = raw.decode("utf-8").split(":", 1)
+            if member_month != month:
+                continue  # 上个月的计数不再写回，数据库按月重置
+            used = self.redis.get(self._key(month, user_email, "used"))
+            if used is not None:
+                counts[user_email] = int(used)
+
+        if not counts:
+            return 0
+        now = datetime.utcnow()
+        db = SessionLocal()
+        try:
+            for user_email, used in counts.items():
+                db.query(User).filter(User.email == user_email).update(
+                    {User.monthly_generation_count: used, User.last_generation_reset: now},
+                    synchronize_session=False
+                )
+            db.commit()
+        except Exception:
+            db.rollback()
+            # 写回失败时重新标记，下次再试
+            self.redis.sadd(self.DIRTY_KEY, *[f"{month}:{user_email}" for user_email in counts])
+            raise
+        finally:
+            db.close()
+        return len(counts)
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                flushed = await asyncio.to_thread(self.flush)
+                if flushed:
+                    logger.info(f"💾 生成额度计数已写回数据库: {flushed} 个用户")
+            except Exception as e:
+                logger.error(f"Generation quota flush error: {e}")
+
+    def start(self):
+        """启动定期写回数据库的后台任务"""
+        if self._flush_task is None:
+            self._flush_task = asyncio.get_running_loop().create_task(self._flush_loop())
+
+    async def shutdown(self):
+        """停止后台任务，并把剩余的计数写回数据库"""
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            self._flush_task = None
+        try:
+            while self.redis.scard(self.DIRTY_KEY):
+                await asyncio.to_thread(self.flush)
+        except Exception as e:
+            logger.error(f"Generation quota final flush error: {e}")
+
+
+# 全局生成额度实例
+generation_quota = GenerationQuota()
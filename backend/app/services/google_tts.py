@@ -1,10 +1,14 @@
 import os
+import asyncio
 import tempfile
-from typing import Optional
+from typing import List, Optional, Tuple
 from google.cloud import texttospeech
-from google.cloud.texttospeech import SynthesisInput, VoiceSelectionParams, AudioConfig
+from google.cloud.texttospeech import SynthesisInput, VoiceSelectionParams, AudioConfig, TextToSpeechAsyncClient
 import logging
 
+from app.core.config import settings
+from app.utils.text_splitter import split_text_into_chunks
+
 logger = logging.getLogger(__name__)
 
 class GoogleTTSService:
@@ -28,6 +32,14 @@ class GoogleTTSService:
             logger.error(f"Failed to initialize Google TTS client: {e}")
             raise Exception(f"Google TTS client initialization failed: {str(e)}")
         
+        # 异步客户端绑定创建时的事件循环，按需在当前循环中创建
+        self._async_client = None
+        self._async_client_loop = None
+        
+        self.max_request_bytes = settings.GOOGLE_TTS_MAX_BYTES
+        self.concurrency = settings.GOOGLE_TTS_CONCURRENCY
+        self.request_timeout = settings.GOOGLE_TTS_TIMEOUT
+        
         # 语言和声音映射
         self.voice_mapping = {
             'cantonese': {
@@ -131,26 +143,8 @@ class GoogleTTSService:
             音频数据的字节
         """
         try:
-            # 获取语言配置
-            if language not in self.voice_mapping:
-                language = 'english'  # 默认使用英语
-            
-            voice_config = self.voice_mapping[language]
-            
-            # 设置合成输入
-            synthesis_input = SynthesisInput(text=text)
-            
-            # 设置声音参数
-            voice = VoiceSelectionParams(
-                language_code=voice_config['language_code'],
-                name=voice_name or voice_config['default_voice']
-            )
-            
-            # 设置音频配置
-            audio_config = AudioConfig(
-                audio_encoding=texttospeech.AudioEncoding.MP3,
-                speaking_rate=speaking_rate,
-                pitch=pitch
+            synthesis_input, voice, audio_config = self._build_request(
+                text, language, voice_name, speaking_rate, pitch
             )
             
             # 执行文本转语音
@@ -166,6 +160,109 @@ class GoogleTTSService:
             logger.error(f"Google TTS error: {e}")
             raise Exception(f"TTS conversion failed: {str(e)}")
     
+    def _build_request(self, text: str, language: str, voice_name: Optional[str],
+                       speaking_rate: float, pitch: float) -> Tuple[SynthesisInput, VoiceSelectionParams, AudioConfig]:
+        """构造合成请求的输入、声音和音频配置"""
+        # 获取语言配置
+        if language not in self.voice_mapping:
+            language = 'english'  # 默认使用英语
+        
+        voice_config = self.voice_mapping[language]
+        
+        # 设置合成输入
+        synthesis_input = SynthesisInput(text=text)
+        
+        # 设置声音参数
+        voice = VoiceSelectionParams(
+            language_code=voice_config['language_code'],
+            name=voice_name or voice_config['default_voice']
+        )
+        
+        # 设置音频配置
+        audio_config = AudioConfig(
+            audio_encoding=texttospeech.AudioEncoding.MP3,
+            speaking_rate=speaking_rate,
+            pitch=pitch
+        )
+        return synthesis_input, voice, audio_config
+    
+    @property
+    def async_client(self) -> TextToSpeechAsyncClient:
+        """当前事件循环的异步客户端（Celery 任务每次 asyncio.run 都是新循环，需要重新创建）"""
+        loop = asyncio.get_running_loop()
+        if self._async_client is None or self._async_client_loop is not loop:
+            self._async_client = TextToSpeechAsyncClient()
+            self._async_client_loop = loop
+        return self._async_client
+    
+    def split_text(self, text: str) -> List[str]:
+        """
+        把文本切分为不超过 Google TTS 单次请求字节上限的分块
+        
+        按句切分，中文每字占3字节，因此先按字符数切分，超出字节上限的分块再减半切分。
+        """
+        max_chars = max(self.max_request_bytes // 3, 1)
+        pending = split_text_into_chunks(text, max_chars)
+        chunks = []
+        while pending:
+            chunk = pending.pop(0)
+            if len(chunk.encode('utf-8')) <= self.max_request_bytes or len(chunk) <= 1:
+                chunks.append(chunk)
+            else:
+                pending[0:0] = split_text_into_chunks(chunk, max(len(chunk) // 2, 1))
+        return chunks
+    
+    async def text_to_speech_async(self, text: str, language: str = 'english',
+                                   voice_name: Optional[str] = None,
+                                   speaking_rate: float = 1.0,
+                                   pitch: float = 0.0) -> bytes:
+        """
+        异步将文本转换为语音，不阻塞事件循环
+        
+        超过单次请求字节上限的长文本会按句切分，在并发上限内同时合成后按顺序拼接。
+        
+        Args:
+            text: 要转换的文本（长度不受单次请求上限限制）
+            language: 语言代码 (cantonese, mandarin, english)
+            voice_name: 特定的声音名称
+            speaking_rate: 语速 (0.25-4.0)
+            pitch: 音调 (-20.0-20.0)
+            
+        Returns:
+            音频数据的字节
+        """
+        chunks = self.split_text(text)
+        if not chunks:
+            raise Exception("TTS conversion failed: empty text")
+        
+        client = self.async_client
+        semaphore = asyncio.Semaphore(self.concurrency)
+        
+        async def synthesize_chunk(chunk: str) -> bytes:
+            synthesis_input, voice, audio_config = self._build_request(
+                chunk, language, voice_name, speaking_rate, pitch
+            )
+            async with semaphore:
+                response = await client.synthesize_speech(
+                    input=synthesis_input,
+                    voice=voice,
+                    audio_config=audio_config,
+                    timeout=self.request_timeout
+                )
+            return response.audio_content
+        
+        if len(chunks) > 1:
+            logger.info(f"Google TTS: text split into {len(chunks)} chunks, concurrency {self.concurrency}")
+        
+        try:
+            results = await asyncio.gather(*(synthesize_chunk(chunk) for chunk in chunks))
+        except Exception as e:
+            logger.error(f"Google TTS error: {e}")
+            raise Exception(f"TTS conversion failed: {str(e)}")
+        
+        # Google TTS 的MP3输出为不带ID3头的帧流，可以直接按顺序拼接
+        return b"".join(results)
+    
     def get_available_voices(self, language_code: str = None) -> list:
         """
         获取可用的声音列表
@@ -191,6 +288,20 @@ class GoogleTTSService:
             logger.error(f"Error getting voices: {e}")
             return []
     
+    def get_saved_audio_url(self, file_path: str) -> Optional[str]:
+        """
+        查询已保存的音频文件
+        
+        Args:
+            file_path: 文件路径
+            
+        Returns:
+            文件存在时返回可访问的URL，否则返回 None
+        """
+        if os.path.exists(os.path.join("uploads/tts", file_path)):
+            return f"/uploads/tts/{file_path}"
+        return None
+    
     def save_audio_to_file(self, audio_content: bytes, file_path: str) -> str:
         """
         将音频内容保存到文件并返回可访问的URL
@@ -232,4 +343,7 @@ class GoogleTTSService:
         temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=suffix)
         temp_file.write(audio_content)
         temp_file.close()
-        return temp_file.name 
\ No newline at end of file
+        return temp_file.name
+
+# 全局Google TTS服务实例
+google_tts_service = GoogleTTSService()
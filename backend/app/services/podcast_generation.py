@@ -0,0 +1,744 @@
+import asyncio
+import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, AsyncIterator, Callable, Dict, Optional, Tuple
+
+from fastapi import HTTPException
+from pydantic import BaseModel
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.core.metrics import GENERATION_TOTAL, track_stage
+from app.models.podcast import Podcast
+from app.models.user import User
+from app.services.audio_cache import audio_cache
+from app.services.edge_tts_service import TTSChunkError, edge_tts_service
+from app.services.generation_quota import QuotaReservation, generation_quota
+from app.services.single_flight import single_flight
+from app.services.translation_engine import translation_engine
+from app.services.tts_engine_router import tts_engine_router
+from app.utils.cantonese import cantonese_converter
+from app.utils.mp3_info import scan_mp3
+from app.utils.text_analysis import analyze_text
+
+# Voice mapping - 所有选项都使用粤语TTS语音，因为最终都生成粤语播客
+VOICE_MAPPING = {
+    "young-lady": "zh-HK-HiuGaaiNeural",
+    "young-man": "zh-HK-WanLungNeural", 
+    "grandma": "zh-HK-HiuGaaiNeural",
+    "elderly-woman": "zh-HK-HiuGaaiNeural",
+}
+
+# Subscription limits
+SUBSCRIPTION_LIMITS = {
+    "free": 10,      # 免费用户每月10个
+    "pro": 50,       # 专业版每月50个
+    "enterprise": -1  # 企业版无限制 (-1表示无限制)
+}
+
+# 生成流程各阶段及对应的进度百分比
+GENERATION_STAGES = {
+    "validating": 5,
+    "translating": 15,
+    "synthesizing": 30,
+    "optimizing": 70,
+    "uploading": 80,
+    "saving": 95,
+    "completed": 100,
+}
+
+ProgressCallback = Callable[[str, int], None]
+
+class PodcastGenerateRequest(BaseModel):
+    """生成请求（HTTP 接口和 Celery 任务共用）"""
+    text: str
+    voice: str = "young-lady"
+    emotion: str = "normal"
+    speed: float = 1.0
+    user_email: str  # 添加用户邮箱字段
+    description: str = ""
+    cover_image_url: str = ""
+    tags: str = ""
+    is_public: bool = True
+    title: str = ""  # 添加标题字段
+    is_translated: bool = False  # 添加字段指示文本是否已经翻译过
+    language: str = "cantonese"  # 播客语言：cantonese, mandarin, english
+    async_mode: bool = False  # 为True时投递到任务队列，立即返回任务ID
+
+# 工具函数：格式化秒为HH:MM:SS
+def format_duration(seconds: float) -> str:
+    hours = int(seconds // 3600)
+    minutes = int((seconds % 3600) // 60)
+    secs = int(seconds % 60)
+    return f"{hours:02d}:{minutes:02d}:{secs:02d}"
+
+# Generate title from content if not provided
+def generate_title_from_content(content: str) -> str:
+    """根据内容生成标题"""
+    return analyze_text(content).title
+
+class PodcastGenerationService:
+    """播客生成流程：校验、翻译、TTS、优化、上传、入库
+
+    HTTP 同步接口和 Celery worker 共用同一套流程。
+    """
+    
+    def __init__(self):
+        self.executor = ThreadPoolExecutor(max_workers=settings.THREAD_POOL_WORKERS)  # 线程池
+    
+    def _report(self, on_progress: Optional[ProgressCallback], stage: str):
+        """上报当前阶段，回调失败不影响生成流程"""
+        if on_progress is None:
+            return
+        try:
+            on_progress(stage, GENERATION_STAGES[stage])
+        except Exception as e:
+            print(f"⚠️ Failed to report progress for stage {stage}: {e}")
+    
+    def validate_request(self, request, db: Session):
+        """
+        校验用户、配额、声音和文本长度
+        
+        Returns:
+            (user, user_limit, tts_voice)
+        """
+        user, user_limit = self.validate_user(request.user_email, db)
+        tts_voice = self.validate_content(request)
+        return user, user_limit, tts_voice
+    
+    @staticmethod
+    def subscription_plan_of(user_email: str, db: Session) -> str:
+        """用户的订阅套餐，用于生成排队的优先级"""
+        plan = db.query(User.subscription_plan).filter(User.email == user_email).scalar()
+        db.commit()  # 结束只读事务，排队等待期间不占用数据库事务
+        return plan or "free"
+    
+    def validate_user(self, user_email: str, db: Session, episodes: int = 1) -> Tuple[User, int]:
+        """
+        校验用户状态，以及本月剩余额度是否还够生成 episodes 集
+        
+        Returns:
+            (user, user_limit)
+        """
+        # Check user and their generation limits
+        user = db.query(User).filter(User.email == user_email).first()
+        if not user:
+            raise HTTPException(status_code=404, detail="用户不存在，请重新登录")
+        
+        if not user.is_verified:
+            raise HTTPException(status_code=403, detail="请先验证邮箱后再生成播客")
+        
+        # Check generation limits - 额度计数在 Redis 中，不读取也不修改用户行
+        user_limit = SUBSCRIPTION_LIMITS.get(user.subscription_plan, 10)
+        if user_limit != -1 and generation_quota.usage(user) + episodes > user_limit:
+            raise self._quota_exceeded(user_limit, episodes)
+        
+        return user, user_limit
+    
+    def validate_content(self, request) -> str:
+        """
+        校验声音和文本长度
+        
+        Returns:
+            TTS声音名称
+        """
+        # Validate voice - 所有语言选项都使用相同的粤语语音
+        valid_voices = ["young-lady", "young-man", "grandma", "elderly-woman"]
+        
+        if request.voice not in valid_voices:
+            print(f"❌ Invalid voice: {request.voice}")
+            raise HTTPException(status_code=400, detail="无效的声音选择")
+        
+        # Get TTS voice - 所有选项都使用粤语TTS语音
+        tts_voice = VOICE_MAPPING[request.voice]
+        
+        # Validate text length
+        if not request.text or len(request.text.strip()) == 0:
+            raise HTTPException(status_code=400, detail="请输入要转换的文本内容")
+        
+        if len(request.text) > 10000:  # 限制文本长度
+            raise HTTPException(status_code=400, detail="文本内容过长，请控制在10000字符以内")
+        
+        return tts_voice
+    
+    @staticmethod
+    def _quota_exceeded(user_limit: int, episodes: int = 1) -> HTTPException:
+        if episodes > 1:
+            return HTTPException(
+                status_code=429,
+                detail=f"本月剩余生成次数不足 {episodes} 个（每月限制 {user_limit} 个）。请减少集数或升级套餐。"
+            )
+        return HTTPException(
+            status_code=429, 
+            detail=f"已达到本月生成限制 ({user_limit} 个)。请升级到专业版获得更多生成次数。"
+        )
+    
+    def reserve_quota(self, user: User, user_limit: int) -> QuotaReservation:
+        """原子地预占一次生成额度，并发请求不会同时通过额度检查"""
+        reservation = generation_quota.reserve(user, user_limit)
+        if reservation is None:
+            raise self._quota_exceeded(user_limit)
+        return reservation
+    
+    def _needs_translation(self, request) -> bool:
+        """文本是否需要先从普通话翻译成粤语"""
+        analysis = analyze_text(request.text)
+        # 只有当文本未翻译过且是中文但不是粤语时，才进行翻译
+        if not request.is_translated and analysis.is_chinese and not analysis.is_cantonese:
+            # 当选择mandarin时，表示用户想要将普通话转换为粤语播客
+            if request.language == "mandarin":
+                print("🔄 用户选择普通话转粤语，开始翻译...")
+            else:
+                print("🔄 检测到普通话且未翻译，自动调用翻译服务...")
+            return True
+        
+        print(f"✅ 使用前端提供的文本（已翻译: {request.is_translated}, 语言: {request.language}）")
+        return False
+    
+    def _check_duration(self, request):
+        """校验预计音频时长"""
+        estimated_duration = len(request.text) * 0.1  # 粗略估算：每个字符0.1秒
+        if estimated_duration > settings.MAX_AUDIO_DURATION:
+            raise HTTPException(
+                status_code=400, 
+                detail=f"文本过长，预计音频时长 {estimated_duration:.1f} 秒，超过最大限制 {settings.MAX_AUDIO_DURATION} 秒"
+            )
+    
+    def _fast_convert(self, text: str) -> Optional[str]:
+        """
+        短文本先用短语表做规则转换，置信度足够时直接使用，跳过大模型翻译
+        
+        Returns:
+            转换后的文本；文本过长或置信度不足时返回 None
+        """
+        if len(text) > settings.CANTONESE_FASTPATH_MAX_CHARS:
+            return None
+        converted, confidence = cantonese_converter.convert(text)
+        if confidence < settings.CANTONESE_FASTPATH_MIN_CONFIDENCE:
+            print(f"🔁 规则转换置信度不足 ({confidence})，使用大模型翻译")
+            return None
+        print(f"⚡ 规则转换粤语成功 (置信度 {confidence})，跳过大模型翻译")
+        return converted
+    
+    async def _prepare_tts_text(self, request, needs_translation: Optional[bool] = None) -> str:
+        """按需把普通话翻译成粤语，并校验预计音频时长，返回用于TTS的文本"""
+        if needs_translation is None:
+            needs_translation = self._needs_translation(request)
+        
+        tts_text = request.text
+        fast_text = self._fast_convert(request.text) if needs_translation else None
+        if fast_text is not None:
+            tts_text = fast_text
+        elif needs_translation:
+            try:
+                tts_text = await translation_engine.translate(request.text, "cantonese")
+                print(f"✅ 普通话转粤语翻译成功: {tts_text}")
+            except Exception as e:
+                print(f"⚠️ 翻译异常，使用原文: {str(e)}")
+                tts_text = request.text
+        
+        # Validate text length and duration
+        self._check_duration(request)
+        return tts_text
+    
+    async def _translate_and_synthesize(
+        self,
+        request,
+        tts_voice: str,
+        on_progress: Optional[ProgressCallback] = None
+    ) -> Tuple[str, bytes]:
+        """
+        流水线翻译和合成：每个翻译分段完成后立即进入TTS阶段
+        
+        两个阶段之间是有界队列，TTS跟不上时翻译阶段会阻塞等待（背压），
+        总耗时接近 max(翻译, 合成) 而不是两者之和。翻译失败时回退到用原文合成。
+        
+        Returns:
+            (用于TTS的完整文本（粤语译文）, 音频字节)
+        """
+        queue: asyncio.Queue = asyncio.Queue(maxsize=settings.TRANSLATION_PIPELINE_QUEUE_SIZE)
+        done = object()
+        
+        async def produce():
+            try:
+                async for segment in translation_engine.translate_stream(request.text, "cantonese"):
+                    await queue.put(segment)  # 队列满时等待TTS阶段消费
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                await queue.put(done)
+                raise
+            await queue.put(done)
+        
+        producer = asyncio.ensure_future(produce())
+        translated_parts = []
+        audio = bytearray()
+        engines = set()
+        try:
+            while True:
+                segment = await queue.get()
+                if segment is done:
+                    break
+                translated_parts.append(segment)
+                if not segment.strip():
+                    continue
+                if len(translated_parts) == 1:
+                    self._report(on_progress, "synthesizing")
+                segment_audio, engine = await asyncio.wait_for(
+                    tts_engine_router.synthesize(segment.strip(), tts_voice),
+                    timeout=180.0
+                )
+                audio.extend(segment_audio)
+                engines.add(engine)
+            await producer  # 翻译阶段的异常在这里抛出
+        except asyncio.TimeoutError:
+            raise HTTPException(status_code=408, detail="生成超时，请稍后重试或减少文本长度")
+        except Exception as e:
+            if producer.done() and not producer.cancelled() and producer.exception() is not None:
+                print(f"⚠️ 流水线翻译异常，使用原文: {producer.exception()}")
+                return request.text, await self._synthesize(request.text, tts_voice)
+            print(f"❌ Pipelined synthesis failed: {e}")
+            raise HTTPException(status_code=500, detail="音频生成失败，请稍后重试")
+        finally:
+            producer.cancel()
+        
+        tts_text = "".join(translated_parts).strip()
+        print(f"✅ 流水线翻译和合成完成: {len(translated_parts)} 个分段")
+        audio = bytes(audio)
+        
+        # 只有整期音频来自同一个引擎时，才能作为该引擎的整篇缓存
+        if len(engines) == 1:
+            engine = engines.pop()
+            self._cache_full_audio(tts_text, engine.voice_for(tts_voice), engine.name, audio)
+        return tts_text, audio
+    
+    async def _synthesize(self, tts_text: str, tts_voice: str) -> bytes:
+        """通过TTS引擎路由合成音频（Edge 优先，熔断或超过延迟阈值时使用 Google），同时写入音频缓存"""
+        try:
+            print("🎵 Generating audio via TTS engine router...")
+            print(f"🔍 Debug: Text to synthesize: {tts_text[:100]}...")
+            print(f"🔍 Debug: Voice: {tts_voice}")
+            
+            audio_bytes, engine = await asyncio.wait_for(
+                tts_engine_router.synthesize(tts_text, tts_voice),
+                timeout=180.0
+            )
+        except asyncio.TimeoutError:
+            raise HTTPException(status_code=408, detail="生成超时，请稍后重试或减少文本长度")
+        except Exception as e:
+            print(f"❌ All TTS engines failed: {e}")
+            raise HTTPException(status_code=500, detail="音频生成失败，请稍后重试")
+        
+        print(f"✅ Audio generated successfully with {engine.name} TTS")
+        self._cache_full_audio(tts_text, engine.voice_for(tts_voice), engine.name, audio_bytes)
+        return audio_bytes
+    
+    @staticmethod
+    def _cache_full_audio(tts_text: str, engine_voice: str, engine_name: str, audio_content: bytes):
+        """在后台把整篇音频写入缓存；所有分段都已命中分段缓存时，整篇音频只是分段的拼接，不再重复写入"""
+        if engine_name == "edge" and edge_tts_service.segments_cached(tts_text, engine_voice):
+            return
+        audio_cache.put_nowait(
+            audio_cache.make_key(tts_text, engine_voice, engine_name), audio_content,
+            engine=engine_name, voice=engine_voice
+        )
+    
+    async def _publish_audio(
+        self,
+        audio_content: bytes,
+        filename: str,
+        on_progress: Optional[ProgressCallback] = None
+    ) -> Tuple[str, str, int]:
+        """
+        优化音频、上传到云存储并计算时长和大小
+        
+        Returns:
+            (audio_url, duration_str, file_size)
+        """
+        # 导入云存储、文件优化和CDN服务
+        from app.services.cloud_storage import cloud_storage_service
+        from app.services.file_optimizer import file_optimizer
+        from app.services.cdn_service import cdn_service
+        
+        # 文件优化、云存储上传和CDN URL生成
+        print("🔧 Starting file optimization and cloud storage upload...")
+        
+        duration_ms = None
+        file_size = None
+        try:
+            # 文件优化
+            self._report(on_progress, "optimizing")
+            print("🔧 Optimizing audio file...")
+            with track_stage("optimize"):
+                optimized_content, optimization_info = await file_optimizer.optimize_file(
+                    audio_content, 
+                    filename,
+                    audio_profile='speech'
+                )
+            print(f"✅ File optimization completed: {optimization_info}")
+            
+            # 上传到云存储
+            self._report(on_progress, "uploading")
+            print("☁️ Uploading to cloud storage...")
+            storage_path = f"podcasts/{datetime.now().strftime('%Y/%m/%d')}/{filename}"
+            with track_stage("upload"):
+                try:
+                    uploaded_path = await cloud_storage_service.upload_file(
+                        optimized_content,
+                        storage_path,
+                        "audio/mpeg"
+                    )
+                except asyncio.CancelledError:
+                    # 上传中途被取消时删除可能已部分写入的对象
+                    await asyncio.shield(cloud_storage_service.delete_file(storage_path))
+                    raise
+            print(f"✅ Cloud storage upload completed: {uploaded_path}")
+            
+            # 生成CDN URL
+            cdn_url = cdn_service.get_cdn_url(storage_path, "audio")
+            print(f"🚀 CDN URL generated: {cdn_url}")
+            
+            # 使用CDN URL作为最终音频URL
+            audio_url = cdn_url
+            
+            # 优化阶段已经得到最终文件的时长和大小，无需再次解码
+            duration_ms = optimization_info.get('optimized_duration')
+            file_size = len(optimized_content)
+            
+        except Exception as e:
+            print(f"⚠️ Cloud storage/optimization failed, using local URL: {e}")
+            # 如果云存储失败，保存原始音频到本地 static 目录并回退到本地URL
+            os.makedirs("static", exist_ok=True)
+            with open(os.path.join("static", filename), 'wb') as f:
+                f.write(audio_content)
+            audio_url = f"/static/{filename}"
+        
+        # Calculate audio duration
+        try:
+            if duration_ms is None:
+                # 只解析MP3帧头计算时长，不解码整个文件
+                duration_ms = int(scan_mp3(audio_content)["duration"] * 1000)
+            duration_seconds = duration_ms / 1000.0  # Convert milliseconds to seconds
+            duration_str = format_duration(duration_seconds)
+            print(f"⏱️ Audio duration: {duration_str}")
+        except Exception as e:
+            print(f"⚠️ Could not calculate duration: {e}")
+            duration_str = "00:00:00"
+        
+        # Get file size
+        if file_size is None:
+            file_size = len(audio_content)
+        print(f"📊 File size: {file_size} bytes")
+        
+        return audio_url, duration_str, file_size
+    
+    async def generate(
+        self,
+        request,
+        db: Session,
+        on_progress: Optional[ProgressCallback] = None
+    ) -> Dict[str, Any]:
+        """
+        执行完整的播客生成流程
+        
+        Args:
+            request: PodcastGenerateRequest
+            db: 数据库会话
+            on_progress: 可选的进度回调，参数为 (阶段, 进度百分比)
+            
+        Returns:
+            生成结果（播客ID、音频URL、标题、时长等）
+        """
+        self._report(on_progress, "validating")
+        user, user_limit, tts_voice = self.validate_request(request, db)
+        reservation = self.reserve_quota(user, user_limit)
+        # 校验只读取了用户记录，立即结束事务，合成期间不持有数据库事务
+        db.commit()
+        print(f"🎵 Using TTS voice: {tts_voice} for language: {request.language}")
+        
+        try:
+            with track_stage("total"):
+                podcast, duration_str = await self._create_podcast(request, db, tts_voice, on_progress)
+        except asyncio.CancelledError:
+            generation_quota.release(reservation)
+            GENERATION_TOTAL.labels(outcome="cancelled").inc()
+            print("🔌 Podcast generation cancelled, quota reservation released")
+            raise
+        except BaseException:
+            generation_quota.release(reservation)
+            GENERATION_TOTAL.labels(outcome="failed").inc()
+            raise
+        GENERATION_TOTAL.labels(outcome="completed").inc()
+        used = generation_quota.commit(reservation)
+        self._report(on_progress, "completed")
+        
+        return {
+            "id": podcast.id,
+            "audioUrl": podcast.audio_url,
+            "title": podcast.title,
+            "duration": duration_str,
+            "message": "播客生成成功",
+            "remainingGenerations": max(user_limit - used, 0) if user_limit != -1 else -1
+        }
+    
+    async def _create_podcast(
+        self,
+        request,
+        db: Session,
+        tts_voice: str,
+        on_progress: Optional[ProgressCallback] = None
+    ) -> Tuple[Podcast, str]:
+        """
+        生成（或共享相同请求的）音频并保存播客记录
+        
+        文本、声音、语言和语速都相同的请求同时进行时只合成一次，
+        其余请求等待并复用同一份音频，但各自保存自己的播客记录。
+        
+        Returns:
+            (podcast, duration_str)
+        """
+        key = single_flight.make_key(
+            request.text, tts_voice, request.language, f"{float(request.speed):.3f}", request.is_translated
+        )
+        audio, shared = await single_flight.run(key, lambda: self._produce_audio(request, tts_voice, on_progress))
+        if shared:
+            print("🔗 Identical generation already in flight, reusing its audio")
+        tts_text = audio["tts_text"]
+        audio_url = audio["audio_url"]
+        duration_str = audio["duration"]
+        file_size = audio["file_size"]
+        
+        # Generate title if not provided
+        podcast_title = request.title if request.title else generate_title_from_content(request.text)
+
+        # Create podcast record
+        podcast = Podcast(
+            title=podcast_title,  # 使用生成的标题
+            description=request.description,
+            content=tts_text,
+            voice=request.voice,
+            emotion=request.emotion,
+            speed=request.speed,
+            audio_url=audio_url,  # 使用优化后的CDN URL或本地URL
+            cover_image_url=request.cover_image_url,
+            duration=duration_str,
+            file_size=file_size,
+            user_email=request.user_email,
+            tags=request.tags,
+            is_public=request.is_public,
+            language=request.language # 设置播客语言
+        )
+        
+        self._report(on_progress, "saving")
+        print("💾 Saving podcast record to database...")
+        db.add(podcast)
+        
+        with track_stage("db_commit"):
+            db.commit()
+            db.refresh(podcast)
+        print(f"✅ Podcast saved with ID: {podcast.id}")
+        return podcast, duration_str
+    
+    async def _produce_audio(
+        self,
+        request,
+        tts_voice: str,
+        on_progress: Optional[ProgressCallback] = None
+    ) -> Dict[str, Any]:
+        """
+        翻译、合成并发布音频
+        
+        Returns:
+            tts_text、audio_url、duration、file_size
+        """
+        # Create unique filename
+        filename = f"podcast_{uuid.uuid4()}.mp3"
+        
+        # 启用云存储、文件优化和CDN功能
+        print(f"📁 Audio file path: {filename}")
+        
+        # 合成结果已经是完整的字节，直接交给优化和上传，不再经过临时文件
+        self._report(on_progress, "translating")
+        needs_translation = self._needs_translation(request)
+        if (settings.TRANSLATION_PIPELINE_ENABLED
+                and needs_translation
+                and len(request.text) > settings.CANTONESE_FASTPATH_MAX_CHARS
+                and not translation_engine.is_cached(request.text, "cantonese")):
+            # 较长的普通话输入：翻译和合成流水线并行进行
+            self._check_duration(request)
+            with track_stage("translate_synthesize"):
+                tts_text, audio_content = await self._translate_and_synthesize(request, tts_voice, on_progress)
+        else:
+            with track_stage("translation"):
+                tts_text = await self._prepare_tts_text(request, needs_translation)
+            
+            self._report(on_progress, "synthesizing")
+            with track_stage("tts"):
+                # 相同文本和声音的音频直接从缓存读取，不再调用TTS
+                audio_content = await audio_cache.get_audio(audio_cache.make_key(tts_text, tts_voice, "edge"))
+                if audio_content is not None:
+                    print("⚡ Audio cache hit, skipping TTS")
+                else:
+                    audio_content = await self._synthesize(tts_text, tts_voice)
+        
+        audio_url, duration_str, file_size = await self._publish_audio(audio_content, filename, on_progress)
+        return {
+            "tts_text": tts_text,
+            "audio_url": audio_url,
+            "duration": duration_str,
+            "file_size": file_size,
+        }
+    
+    async def resynthesize(self, podcast: Podcast, content: str) -> Dict[str, Any]:
+        """
+        文稿修改后重新生成播客音频
+        
+        文稿按与生成时相同的规则切分为分段，未变化的分段直接复用分段缓存，
+        只有变化的分段需要调用TTS，然后重新拼接整期音频。调用方负责提交数据库。
+        
+        Returns:
+            分段复用统计
+        """
+        if not content or len(content.strip()) == 0:
+            raise HTTPException(status_code=400, detail="请输入要转换的文本内容")
+        
+        if len(content) > 10000:  # 限制文本长度
+            raise HTTPException(status_code=400, detail="文本内容过长，请控制在10000字符以内")
+        
+        tts_voice = VOICE_MAPPING.get(podcast.voice, VOICE_MAPPING["young-lady"])
+        try:
+            audio_bytes, segment_stats = await asyncio.wait_for(
+                edge_tts_service.synthesize_segments(content, tts_voice),
+                timeout=180.0
+            )
+        except asyncio.TimeoutError:
+            raise HTTPException(status_code=408, detail="生成超时，请稍后重试或减少文本长度")
+        except TTSChunkError as e:
+            print(f"❌ Segment re-synthesis failed: {e}")
+            raise HTTPException(status_code=500, detail="音频生成失败，请稍后重试")
+        
+        filename = f"podcast_{uuid.uuid4()}.mp3"
+        audio_url, duration_str, file_size = await self._publish_audio(audio_bytes, filename)
+        
+        podcast.content = content
+        podcast.audio_url = audio_url
+        podcast.duration = duration_str
+        podcast.file_size = file_size
+        print(f"✅ Podcast {podcast.id} re-synthesized: {segment_stats}")
+        return segment_stats
+
+
+    async def start_stream(self, request, db: Session) -> Tuple[Podcast, str, str, QuotaReservation]:
+        """
+        流式生成的准备阶段：校验、预占额度、翻译，并预先创建播客记录
+        
+        记录先以私有、无音频的状态保存，流结束后由 finalize_stream 补全。
+        额度在 finalize_stream 中确认，abort_stream 中释放。
+        
+        Returns:
+            (podcast, tts_text, tts_voice, reservation)
+        """
+        user, user_limit, tts_voice = self.validate_request(request, db)
+        reservation = self.reserve_quota(user, user_limit)
+        try:
+            podcast, tts_text = await self._create_stream_record(request, db)
+        except BaseException:
+            generation_quota.release(reservation)
+            raise
+        return podcast, tts_text, tts_voice, reservation
+    
+    async def _create_stream_record(self, request, db: Session) -> Tuple[Podcast, str]:
+        """翻译文本并保存私有、无音频的播客记录"""
+        tts_text = await self._prepare_tts_text(request)
+        
+        podcast = Podcast(
+            title=request.title if request.title else generate_title_from_content(request.text),
+            description=request.description,
+            content=tts_text,
+            voice=request.voice,
+            emotion=request.emotion,
+            speed=request.speed,
+            audio_url=None,  # 流结束后再写入
+            cover_image_url=request.cover_image_url,
+            user_email=request.user_email,
+            tags=request.tags,
+            is_public=False,  # 完成前不出现在公开广场
+            language=request.language
+        )
+        db.add(podcast)
+        db.commit()
+        db.refresh(podcast)
+        print(f"📡 Streaming podcast record created with ID: {podcast.id}")
+        return podcast, tts_text
+    
+    async def stream_audio(self, tts_text: str, tts_voice: str, buffer: bytearray) -> AsyncIterator[bytes]:
+        """输出音频片段，同时把相同的字节写入 buffer 供流结束后上传"""
+        cached_audio = await audio_cache.get_audio(audio_cache.make_key(tts_text, tts_voice, "edge"))
+        if cached_audio is not None:
+            print("⚡ Audio cache hit, streaming cached audio")
+            buffer.extend(cached_audio)
+            for offset in range(0, len(cached_audio), 64 * 1024):
+                yield cached_audio[offset:offset + 64 * 1024]
+            return
+        
+        async for piece in edge_tts_service.stream(tts_text, tts_voice):
+            buffer.extend(piece)
+            yield piece
+    
+    async def finalize_stream(
+        self,
+        podcast_id: int,
+        request,
+        tts_text: str,
+        tts_voice: str,
+        audio_content: bytes,
+        reservation: QuotaReservation
+    ):
+        """流结束后上传音频、补全播客记录并确认额度（在响应结束后的后台任务中执行）"""
+        db = SessionLocal()
+        try:
+            podcast = db.query(Podcast).filter(Podcast.id == podcast_id).first()
+            if not podcast:
+                generation_quota.release(reservation)
+                return
+            
+            self._cache_full_audio(tts_text, tts_voice, "edge", audio_content)
+            
+            filename = f"podcast_{uuid.uuid4()}.mp3"
+            audio_url, duration_str, file_size = await self._publish_audio(audio_content, filename)
+            
+            podcast.audio_url = audio_url
+            podcast.duration = duration_str
+            podcast.file_size = file_size
+            podcast.is_public = request.is_public
+            db.commit()
+            generation_quota.commit(reservation)
+            print(f"✅ Streaming podcast {podcast_id} finalized: {audio_url}")
+        except Exception as e:
+            print(f"❌ Failed to finalize streaming podcast {podcast_id}: {e}")
+            db.rollback()
+            generation_quota.release(reservation)
+        finally:
+            db.close()
+    
+    async def abort_stream(self, podcast_id: int, reservation: Optional[QuotaReservation] = None):
+        """流式生成失败或客户端中断时删除未完成的播客记录，并释放预占的额度"""
+        if reservation is not None:
+            generation_quota.release(reservation)
+        db = SessionLocal()
+        try:
+            db.query(Podcast).filter(Podcast.id == podcast_id, Podcast.audio_url.is_(None)).delete()
+            db.commit()
+            print(f"🗑️ Unfinished streaming podcast {podcast_id} removed")
+        except Exception as e:
+            print(f"⚠️ Failed to remove unfinished podcast {podcast_id}: {e}")
+            db.rollback()
+        finally:
+            db.close()
+
+
+# 全局播客生成服务实例
+podcast_generation_service = PodcastGenerationService()
@@ -0,0 +1,86 @@
+import logging
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+from app.core.config import settings
+from app.core.metrics import SCRATCH_BYTES, SCRATCH_IN_USE
+
+logger = logging.getLogger(__name__)
+
+
+class ScratchSpace:
+    """生成过程中间文件的暂存空间
+
+    生成流水线直接传递内存中的字节，ffmpeg 单遍流水线通过管道读写，都不需要暂存文件；
+    只有 ffmpeg 不可用时的 pydub 回退路径需要文件路径，通过 path() 在 SCRATCH_DIR
+    （建议挂载 tmpfs）中创建。暂存文件都通过上下文管理器创建，退出（包括失败和取消）时删除，
+    不再写入公开的 static 目录；sweep() 在启动时清理进程崩溃遗留的文件。
+    """
+
+    PREFIX = "longan_scratch_"
+
+    def __init__(self):
+        self.directory = settings.SCRATCH_DIR or None
+        self.stale_seconds = settings.SCRATCH_STALE_SECONDS
+        self.in_use = 0
+
+    def _ensure_directory(self):
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+
+    def _opened(self):
+        self.in_use += 1
+        SCRATCH_IN_USE.inc()
+
+    def _closed(self, size: int):
+        self.in_use -= 1
+        SCRATCH_IN_USE.dec()
+        SCRATCH_BYTES.observe(size)
+
+    @contextmanager
+    def path(self, suffix: str = "") -> Iterator[str]:
+        """暂存目录中的文件路径（交给需要路径的外部程序），退出时删除"""
+        self._ensure_directory()
+        fd, scratch_path = tempfile.mkstemp(suffix=suffix, prefix=self.PREFIX, dir=self.directory)
+        os.close(fd)
+        self._opened()
+        size = 0
+        try:
+            yield scratch_path
+        finally:
+            try:
+                size = os.path.getsize(scratch_path)
+                os.remove(scratch_path)
+            except FileNotFoundError:
+                pass
+            self._closed(size)
+
+    def sweep(self) -> int:
+        """
+        删除进程崩溃遗留的过期暂存文件
+
+        Returns:
+            删除的文件数
+        """
+        directory = self.directory or tempfile.gettempdir()
+        if not os.path.isdir(directory):
+            return 0
+        cutoff = time.time() - self.stale_seconds
+        removed = 0
+        for entry in os.scandir(directory):
+            try:
+                if entry.name.startswith(self.PREFIX) and entry.is_file() and entry.stat().st_mtime < cutoff:
+                    os.remove(entry.path)
+                    removed += 1
+            except OSError as e:
+                logger.warning(f"⚠️ 清理暂存文件失败 {entry.path}: {e}")
+        if removed:
+            logger.info(f"🧹 已清理 {removed} 个遗留暂存文件")
+        return removed
+
+
+# 全局暂存空间实例
+scratch_space = ScratchSpace()
@@ -0,0 +1,188 @@
+import asyncio
+import hashlib
+import json
+import logging
+import uuid
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+from fastapi import HTTPException
+
+from app.core.config import settings
+from app.services.cache_service import cache_service
+
+logger = logging.getLogger(__name__)
+
+# 只有锁仍属于自己时才删除，避免误删租约过期后被其他 worker 获取的锁
+_RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class _Flight:
+    """进程内一个进行中的任务及其等待者数量"""
+
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """合并相同的进行中任务：同一个键同时只执行一次，其余调用等待并共享结果
+
+    同一进程内的重复调用等待同一个任务；不同 worker 之间通过 Redis 协调：
+      single_flight:lock:{key}    执行者持有的锁（带租约，执行期间续约）
+      single_flight:result:{key}  执行结果（JSON，短期保留）
+    等待者轮询结果；执行者崩溃导致锁过期而没有结果时，由等待者接手执行。
+    业务错误（HTTPException）同样写入结果，等待者收到相同的错误；其他异常不共享，等待者会重试。
+    任务在独立的 Task 中执行：某个调用方被取消（客户端断开）只会让它自己退出，
+    最后一个调用方离开时才取消任务。
+    """
+
+    LOCK_PREFIX = "single_flight:lock"
+    RESULT_PREFIX = "single_flight:result"
+
+    def __init__(self):
+        self.lock_ttl = settings.SINGLE_FLIGHT_LOCK_TTL
+        self.result_ttl = settings.SINGLE_FLIGHT_RESULT_TTL
+        self.poll_interval = settings.SINGLE_FLIGHT_POLL_INTERVAL
+        self._inflight: Dict[str, _Flight] = {}
+        self._release_script = None
+        self.leader_runs = 0
+        self.shared_results = 0
+        self.abandoned = 0
+
+    @property
+    def redis(self):
+        return cache_service.redis_client
+
+    @staticmethod
+    def make_key(*parts: Any) -> str:
+        """根据请求参数生成合并键"""
+        return hashlib.sha256("\x1f".join(str(part) for part in parts).encode("utf-8")).hexdigest()
+
+    async def run(self, key: str, func: Callable[[], Awaitable[Dict[str, Any]]]) -> Tuple[Dict[str, Any], bool]:
+        """
+        执行任务，或等待正在执行的相同任务
+
+        Args:
+            key: 合并键
+            func: 实际执行任务的协程函数，返回值需可 JSON 序列化
+
+        Returns:
+            (结果, 是否来自其他请求的执行)
+        """
+        loop = asyncio.get_running_loop()
+        flight = self._inflight.get(key)
+        if flight is not None and flight.task.get_loop() is loop:
+            self.shared_results += 1
+            joined = True
+        else:
+            flight = _Flight(loop.create_task(self._run_cluster(key, func)))
+            self._inflight[key] = flight
+            flight.task.add_done_callback(lambda _: self._forget(key, flight))
+            joined = False
+
+        flight.waiters += 1
+        try:
+            await asyncio.wait({flight.task})
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                # 所有调用方都已离开，没有人需要结果，停止执行
+                self.abandoned += 1
+                self._forget(key, flight)
+                flight.task.cancel()
+        result, shared = flight.task.result()
+        return result, joined or shared
+
+    def _forget(self, key: str, flight: _Flight):
+        if self._inflight.get(key) is flight:
+            del self._inflight[key]
+
+    def _lock_key(self, key: str) -> str:
+        return f"{self.LOCK_PREFIX}:{key}"
+
+    def _result_key(self, key: str) -> str:
+        return f"{self.RESULT_PREFIX}:{key}"
+
+    def _read_result(self, key: str):
+        raw = self.redis.get(self._result_key(key))
+        if raw is None:
+            return None
+        outcome = json.loads(raw)
+        if not outcome.get("ok"):
+            raise HTTPException(status_code=outcome["status_code"], detail=outcome["detail"])
+        return outcome["result"]
+
+    def _store(self, key: str, outcome: Dict[str, Any]):
+        try:
+            self.redis.setex(self._result_key(key), self.result_ttl, json.dumps(outcome, ensure_ascii=False))
+        except Exception as e:
+            logger.error(f"Single flight result store error: {e}")
+
+    async def _renew_lock(self, key: str, token: str):
+        while True:
+            await asyncio.sleep(self.lock_ttl / 3)
+            try:
+                if self.redis.get(self._lock_key(key)) == token.encode("utf-8"):
+                    self.redis.expire(self._lock_key(key), self.lock_ttl)
+            except Exception as e:
+                logger.error(f"Single flight lock renewal error: {e}")
+
+    def _release(self, key: str, token: str):
+        try:
+            if self._release_script is None:
+                self._release_script = self.redis.register_script(_RELEASE_SCRIPT)
+            self._release_script(keys=[self._lock_key(key)], args=[token])
+        except Exception as e:
+            logger.error(f"Single flight lock release error: {e}")
+
+    async def _run_cluster(self, key: str, func: Callable[[], Awaitable[Dict[str, Any]]]) -> Tuple[Dict[str, Any], bool]:
+        token = uuid.uuid4().hex
+        while True:
+            try:
+                result = self._read_result(key)
+                if result is not None:
+                    self.shared_results += 1
+                    return result, True
+                if self.redis.set(self._lock_key(key), token, nx=True, ex=self.lock_ttl):
+                    break
+            except HTTPException:
+                self.shared_results += 1
+                raise
+            except Exception as e:
+                # Redis 不可用时只在进程内合并
+                logger.error(f"Single flight unavailable, running locally: {e}")
+                self.leader_runs += 1
+                return await func(), False
+            await asyncio.sleep(self.poll_interval)
+
+        self.leader_runs += 1
+        renewer = asyncio.ensure_future(self._renew_lock(key, token))
+        try:
+            result = await func()
+            self._store(key, {"ok": True, "result": result})
+            return result, False
+        except HTTPException as e:
+            self._store(key, {"ok": False, "status_code": e.status_code, "detail": e.detail})
+            raise
+        finally:
+            renewer.cancel()
+            self._release(key, token)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "in_flight": len(self._inflight),
+            "leader_runs": self.leader_runs,
+            "shared_results": self.shared_results,
+            "abandoned": self.abandoned,
+        }
+
+
+# 全局请求合并实例
+single_flight = SingleFlight()
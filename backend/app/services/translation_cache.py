@@ -0,0 +1,140 @@
+import hashlib
+import logging
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from app.core.config import settings
+from app.core.metrics import record_cache
+from app.services.cache_service import cache_service
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+class TranslationCache:
+    """翻译结果缓存
+
+    两级缓存：进程内 LRU 在前，Redis 在后，均设置过期时间。
+    缓存键是规范化原文、目标语言、模型和提示词版本的哈希，
+    修改提示词时提升提示词版本即可让旧结果失效。
+    """
+
+    KEY_PREFIX = "translation_cache"
+
+    def __init__(self):
+        self.enabled = settings.TRANSLATION_CACHE_ENABLED
+        self.ttl = settings.TRANSLATION_CACHE_TTL
+        self.local_size = settings.TRANSLATION_CACHE_LOCAL_SIZE
+        self._local: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (译文, 过期时间)
+        self._lock = threading.Lock()
+        self.local_hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+
+    @property
+    def redis(self):
+        return cache_service.redis_client
+
+    @staticmethod
+    def normalize_text(text: str) -> str:
+        """规范化文本：统一Unicode形式，合并空白"""
+        text = unicodedata.normalize("NFC", text or "")
+        return _WHITESPACE_RE.sub(" ", text).strip()
+
+    def make_key(self, text: str, target_language: str, model: str, prompt_version: str) -> str:
+        """根据原文和翻译参数生成缓存键"""
+        parts = [self.normalize_text(text), target_language, model, prompt_version]
+        return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+    def _redis_key(self, key: str) -> str:
+        return f"{self.KEY_PREFIX}:{key}"
+
+    def _get_local(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._local.get(key)
+            if entry is None:
+                return None
+            if entry[1] <= time.monotonic():
+                del self._local[key]
+                return None
+            self._local.move_to_end(key)
+            return entry[0]
+
+    def _set_local(self, key: str, value: str, ttl: float):
+        with self._lock:
+            self._local[key] = (value, time.monotonic() + ttl)
+            self._local.move_to_end(key)
+            while len(self._local) > self.local_size:
+                self._local.popitem(last=False)
+
+    def get(self, key: str) -> Optional[str]:
+        """读取译文，先查进程内缓存，再查 Redis（命中后回填进程内缓存）"""
+        if not self.enabled:
+            return None
+
+        value = self._get_local(key)
+        if value is not None:
+            self.local_hits += 1
+            record_cache("translation", True)
+            return value
+
+        try:
+            raw = self.redis.get(self._redis_key(key))
+            if raw is not None:
+                value = raw.decode("utf-8")
+                # 进程内条目不应比 Redis 条目活得更久
+                remaining = self.redis.ttl(self._redis_key(key))
+                self._set_local(key, value, remaining if remaining and remaining > 0 else self.ttl)
+                self.redis_hits += 1
+                record_cache("translation", True)
+                return value
+        except Exception as e:
+            logger.error(f"Translation cache get error: {e}")
+
+        self.misses += 1
+        record_cache("translation", False)
+        return None
+
+    def exists(self, key: str) -> bool:
+        """译文是否已缓存（只用于选择处理路径，不计入命中率，随后的 get 才计入）"""
+        if not self.enabled:
+            return False
+        if self._get_local(key) is not None:
+            return True
+        try:
+            return bool(self.redis.exists(self._redis_key(key)))
+        except Exception as e:
+            logger.error(f"Translation cache exists error: {e}")
+            return False
+
+    def set(self, key: str, value: str):
+        """写入译文"""
+        if not self.enabled or not value:
+            return
+        self._set_local(key, value, self.ttl)
+        try:
+            self.redis.setex(self._redis_key(key), self.ttl, value.encode("utf-8"))
+        except Exception as e:
+            logger.error(f"Translation cache set error: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        """命中率统计"""
+        lookups = self.local_hits + self.redis_hits + self.misses
+        hits = self.local_hits + self.redis_hits
+        return {
+            "enabled": self.enabled,
+            "local_entries": len(self._local),
+            "local_hits": self.local_hits,
+            "redis_hits": self.redis_hits,
+            "misses": self.misses,
+            "hit_ratio": round(hits / lookups, 3) if lookups else 0,
+        }
+
+
+# 全局翻译缓存实例
+translation_cache = TranslationCache()
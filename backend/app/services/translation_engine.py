@@ -0,0 +1,241 @@
+import asyncio
+import logging
+import os
+from collections import deque
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import openai
+
+from app.core.config import settings
+from app.services.translation_cache import translation_cache
+from app.utils.cantonese import has_cantonese_indicators
+from app.utils.text_splitter import split_text_by_tokens
+
+logger = logging.getLogger(__name__)
+
+TRANSLATION_MODEL = "gpt-4"
+# 修改提示词时提升版本号，使旧的缓存译文失效
+PROMPT_VERSION = "v1"
+
+SYSTEM_PROMPT = "你是一个专业的粤语翻译专家，精通粤语口语表达。你的任务是准确地将各种语言翻译成地道的粤语口语，保持原文的意思和情感，同时符合粤语的表达习惯。"
+
+
+class TranslationError(Exception):
+    """翻译失败"""
+
+
+def build_prompt(text: str) -> str:
+    """粤语口语翻译提示词"""
+    return f"""请将以下内容【强制翻译成粤语口语】，适合朗读：
+
+原文：{text}
+
+要求：
+1. 只输出粤语翻译结果，不能输出英文或普通话原文。
+2. 必须使用粤语口语表达，不能夹杂英文或普通话。
+3. 保持原文意思和情感。
+4. 适合朗读，语言流畅自然。
+5. 只输出翻译后的粤语内容，不要任何解释或其它语言。
+
+【粤语翻译】：
+"""
+
+
+class TranslationEngine:
+    """异步分段并行翻译引擎
+
+    按 token 预算把长文本切成分段，在全局并发上限内同时调用 GPT，
+    再按原顺序拼接。分段和整篇译文都写入翻译缓存，重试时只翻译未缓存的分段。
+    """
+
+    def __init__(self):
+        self.segment_tokens = settings.TRANSLATION_SEGMENT_TOKENS
+        self.concurrency = settings.TRANSLATION_CONCURRENCY
+        self.request_timeout = settings.TRANSLATION_TIMEOUT
+        self.max_retries = settings.TRANSLATION_MAX_RETRIES
+        self.retry_backoff = 1.0  # 重试退避基数（秒）
+        # 信号量绑定事件循环，Celery 任务每次 asyncio.run 都是新循环，需要按循环创建
+        self._semaphore = None
+        self._semaphore_loop = None
+
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._semaphore_loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+            self._semaphore_loop = loop
+        return self._semaphore
+
+    @staticmethod
+    def _api_key() -> Optional[str]:
+        return os.getenv("OPENAI_API_KEY") or settings.OPENAI_API_KEY
+
+    async def _complete(self, text: str) -> str:
+        """调用一次 GPT 翻译单个分段"""
+        kwargs = {}
+        if settings.OPENAI_API_BASE:
+            kwargs["api_base"] = settings.OPENAI_API_BASE
+        response = await asyncio.wait_for(
+            openai.ChatCompletion.acreate(
+                model=TRANSLATION_MODEL,
+                messages=[
+                    {"role": "system", "content": SYSTEM_PROMPT},
+                    {"role": "user", "content": build_prompt(text)}
+                ],
+                # 译文长度与原文相近，按分段预算的两倍留出输出空间，避免截断
+                max_tokens=self.segment_tokens * 2,
+                temperature=0.3,
+                top_p=0.9,
+                api_key=self._api_key(),
+                request_timeout=self.request_timeout,
+                **kwargs
+            ),
+            timeout=self.request_timeout
+        )
+        return response.choices[0].message.content.strip()
+
+    async def translate_segment(self, segment: str, target_language: str = "cantonese", index: int = 0) -> str:
+        """翻译单个分段（先查缓存，失败时按指数退避重试），保留分段末尾的换行"""
+        body = segment.strip()
+        if not body:
+            return segment
+        trailing = segment[len(segment.rstrip()):]
+
+        cache_key = translation_cache.make_key(body, target_language, TRANSLATION_MODEL, PROMPT_VERSION)
+        cached = translation_cache.get(cache_key)
+        if cached is not None:
+            return cached + trailing
+
+        attempts = self.max_retries + 1
+        last_error = None
+        for attempt in range(attempts):
+            try:
+                async with self.semaphore:
+                    translated = await self._complete(body)
+                if not translated:
+                    raise TranslationError("GPT 返回空译文")
+                translation_cache.set(cache_key, translated)
+                return translated + trailing
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                last_error = e
+                logger.warning(f"⚠️ 翻译分段 {index} 第 {attempt + 1}/{attempts} 次失败: {e}")
+                if attempt + 1 < attempts:
+                    await asyncio.sleep(self.retry_backoff * (2 ** attempt))
+        raise TranslationError(f"翻译分段 {index} 失败: {last_error}")
+
+    async def translate(self, text: str, target_language: str = "cantonese") -> str:
+        """
+        翻译文本
+
+        Args:
+            text: 原文（长度不受单次请求输出上限限制）
+            target_language: 目标语言
+
+        Returns:
+            按原顺序拼接的译文
+        """
+        if not self._api_key() and not settings.OPENAI_API_BASE:
+            raise TranslationError("OpenAI API key not configured")
+
+        cache_key = translation_cache.make_key(text, target_language, TRANSLATION_MODEL, PROMPT_VERSION)
+        cached = translation_cache.get(cache_key)
+        if cached is not None:
+            logger.info("📦 使用缓存的翻译结果")
+            return cached
+
+        segments = split_text_by_tokens(text, self.segment_tokens)
+        if not segments:
+            raise TranslationError("没有可翻译的文本")
+        if len(segments) > 1:
+            logger.info(f"🔪 翻译文本切分为 {len(segments)} 个分段，并发数 {self.concurrency}")
+
+        tasks = [
+            asyncio.ensure_future(self.translate_segment(segment, target_language, i))
+            for i, segment in enumerate(segments)
+        ]
+        try:
+            results: List[str] = await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
+
+        translated_text = "".join(results).strip()
+        if not has_cantonese_indicators(translated_text):
+            logger.warning(f"⚠️ 翻译结果可能不是粤语: {translated_text[:100]}")
+
+        translation_cache.set(cache_key, translated_text)
+        return translated_text
+
+    def is_cached(self, text: str, target_language: str = "cantonese") -> bool:
+        """整篇译文是否已在缓存中"""
+        cache_key = translation_cache.make_key(text, target_language, TRANSLATION_MODEL, PROMPT_VERSION)
+        return translation_cache.exists(cache_key)
+
+    async def translate_stream(self, text: str, target_language: str = "cantonese") -> AsyncIterator[str]:
+        """
+        按原顺序逐段输出译文
+
+        最多提前翻译 concurrency 个分段；调用方暂停消费时不会再启动新的分段，
+        从而把下游的背压传递到翻译请求。全部完成后写入整篇缓存。
+
+        Yields:
+            译文分段（段落末尾的换行保留在分段末尾）
+        """
+        if not self._api_key() and not settings.OPENAI_API_BASE:
+            raise TranslationError("OpenAI API key not configured")
+
+        cache_key = translation_cache.make_key(text, target_language, TRANSLATION_MODEL, PROMPT_VERSION)
+        cached = translation_cache.get(cache_key)
+        if cached is not None:
+            yield cached
+            return
+
+        segments = split_text_by_tokens(text, self.segment_tokens)
+        if not segments:
+            raise TranslationError("没有可翻译的文本")
+
+        pending = deque()
+        results = []
+        next_index = 0
+        try:
+            while next_index < len(segments) or pending:
+                while next_index < len(segments) and len(pending) < self.concurrency:
+                    pending.append(asyncio.ensure_future(
+                        self.translate_segment(segments[next_index], target_language, next_index)
+                    ))
+                    next_index += 1
+                translated = await pending.popleft()
+                results.append(translated)
+                yield translated
+        finally:
+            for task in pending:
+                task.cancel()
+
+        translation_cache.set(cache_key, "".join(results).strip())
+
+    async def translate_batch(self, texts: List[str], target_language: str = "cantonese") -> List[Dict[str, Any]]:
+        """
+        批量翻译，所有文本的分段共享同一个并发上限
+
+        Returns:
+            与输入顺序一致的结果列表，单条失败不影响其它条目：
+            [{"originalText", "translatedText", "error"}]
+        """
+        results = await asyncio.gather(
+            *(self.translate(text, target_language) for text in texts),
+            return_exceptions=True
+        )
+        items = []
+        for text, result in zip(texts, results):
+            if isinstance(result, BaseException):
+                items.append({"originalText": text, "translatedText": None, "error": str(result)})
+            else:
+                items.append({"originalText": text, "translatedText": result, "error": None})
+        return items
+
+
+# 全局翻译引擎实例
+translation_engine = TranslationEngine()
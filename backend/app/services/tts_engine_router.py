@@ -0,0 +1,313 @@
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.core.metrics import TTS_ENGINE_REQUESTS, TTS_ENGINE_SECONDS
+from app.services.edge_tts_service import edge_tts_service
+
+logger = logging.getLogger(__name__)
+
+# Edge TTS 声音对应的 Google TTS 粤语声音
+GOOGLE_VOICE_MAPPING = {
+    "zh-HK-HiuGaaiNeural": "yue-HK-Standard-A",
+    "zh-HK-WanLungNeural": "yue-HK-Standard-B",
+}
+DEFAULT_GOOGLE_VOICE = "yue-HK-Standard-A"
+
+
+class EngineStats:
+    """单个引擎的延迟、错误率统计和熔断器
+
+    熔断器状态：
+      closed     正常放行
+      open       连续失败或错误率过高，拒绝请求，直到超过重置时间
+      half_open  放行一个试探请求，成功则恢复 closed，失败则重新 open
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    # 样本少于该数量时不计算错误率和延迟百分位
+    MIN_SAMPLES = 10
+
+    def __init__(self, name: str):
+        self.name = name
+        self.window = settings.TTS_ENGINE_STATS_WINDOW
+        self.failure_threshold = settings.TTS_BREAKER_FAILURE_THRESHOLD
+        self.error_rate_threshold = settings.TTS_BREAKER_ERROR_RATE
+        self.reset_timeout = settings.TTS_BREAKER_RESET_TIMEOUT
+
+        self._lock = threading.Lock()
+        self.latencies = deque(maxlen=self.window)  # 每千字耗时（秒）
+        self.outcomes = deque(maxlen=self.window)  # True 为成功
+        self.state = self.CLOSED
+        self.opened_at = 0.0
+        self.trial_in_flight = False
+        self.consecutive_failures = 0
+        self.requests = 0
+        self.failures = 0
+
+    def available(self) -> bool:
+        """熔断器是否放行请求（half_open 状态只放行一个试探请求）"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN:
+                return time.monotonic() - self.opened_at >= self.reset_timeout
+            return not self.trial_in_flight
+
+    def acquire(self, force: bool = False) -> Optional[str]:
+        """
+        请求开始前在同一把锁内检查并占用放行名额，避免并发请求同时成为试探请求
+
+        Args:
+            force: 所有引擎都熔断时仍然发出请求
+
+        Returns:
+            "normal" 正常放行，"trial" 作为试探请求放行，None 不放行
+        """
+        with self._lock:
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+            if self.state == self.CLOSED:
+                return "normal"
+            if self.state == self.HALF_OPEN and not self.trial_in_flight:
+                self.trial_in_flight = True
+                return "trial"
+            return "normal" if force else None
+
+    def record_success(self, latency: float, text_length: int):
+        with self._lock:
+            self.requests += 1
+            self.consecutive_failures = 0
+            self.outcomes.append(True)
+            self.latencies.append(latency * 1000 / max(text_length, 100))
+            if self.state != self.CLOSED:
+                logger.info(f"✅ TTS引擎 {self.name} 恢复，关闭熔断器")
+            self.state = self.CLOSED
+            self.trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.requests += 1
+            self.failures += 1
+            self.consecutive_failures += 1
+            self.outcomes.append(False)
+            if self.state == self.HALF_OPEN or self._should_trip():
+                if self.state != self.OPEN:
+                    logger.warning(f"🔌 TTS引擎 {self.name} 熔断: 连续失败 {self.consecutive_failures} 次，错误率 {self._error_rate():.0%}")
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+            self.trial_in_flight = False
+
+    def release_trial(self):
+        """试探请求被取消（未得出结果）时释放试探名额"""
+        with self._lock:
+            self.trial_in_flight = False
+
+    def _should_trip(self) -> bool:
+        if self.consecutive_failures >= self.failure_threshold:
+            return True
+        return len(self.outcomes) >= self.MIN_SAMPLES and self._error_rate() > self.error_rate_threshold
+
+    def _error_rate(self) -> float:
+        if not self.outcomes:
+            return 0.0
+        return self.outcomes.count(False) / len(self.outcomes)
+
+    def latency_percentile(self, percentile: float) -> Optional[float]:
+        """每千字耗时的百分位，样本不足时返回 None"""
+        with self._lock:
+            samples = sorted(self.latencies)
+        if len(samples) < self.MIN_SAMPLES:
+            return None
+        index = min(int(len(samples) * percentile / 100), len(samples) - 1)
+        return samples[index]
+
+    def snapshot(self) -> Dict[str, Any]:
+        p50 = self.latency_percentile(50)
+        p95 = self.latency_percentile(95)
+        return {
+            "state": self.state,
+            "requests": self.requests,
+            "failures": self.failures,
+            "consecutive_failures": self.consecutive_failures,
+            "error_rate": round(self._error_rate(), 3),
+            "p50_seconds_per_1k_chars": round(p50, 3) if p50 is not None else None,
+            "p95_seconds_per_1k_chars": round(p95, 3) if p95 is not None else None,
+        }
+
+
+class EngineUnavailable(Exception):
+    """熔断器不放行（另一个请求正在试探）时抛出，不计入引擎失败"""
+
+
+class EdgeEngine:
+    """Edge TTS 引擎（在TTS工作池的常驻事件循环中合成）"""
+
+    name = "edge"
+
+    def voice_for(self, voice: str) -> str:
+        return voice
+
+    async def synthesize(self, text: str, voice: str) -> bytes:
+        if settings.TTS_CHUNKED_SYNTHESIS:
+            # 按句分块并行合成，耗时接近最长分块而不是所有分块之和
+            return await edge_tts_service.synthesize(text, voice)
+        return await edge_tts_service._synthesize_once(text, voice)
+
+
+class GoogleEngine:
+    """Google Cloud TTS 引擎（复用全局服务实例，异步请求，长文本自动分块）"""
+
+    name = "google"
+
+    @property
+    def service(self):
+        # 延迟导入：客户端初始化需要 Google Cloud 凭证，未使用 Google 时不初始化
+        from app.services.google_tts import google_tts_service
+        return google_tts_service
+
+    def voice_for(self, voice: str) -> str:
+        return GOOGLE_VOICE_MAPPING.get(voice, DEFAULT_GOOGLE_VOICE)
+
+    async def synthesize(self, text: str, voice: str) -> bytes:
+        return await self.service.text_to_speech_async(
+            text=text,
+            language="cantonese",
+            voice_name=self.voice_for(voice),
+            speaking_rate=1.0,
+            pitch=0.0
+        )
+
+
+class TTSEngineRouter:
+    """TTS 引擎路由
+
+    按优先级选择熔断器放行的引擎。主引擎在延迟阈值（历史延迟百分位乘以系数，
+    按文本长度换算，长文本的阈值随之变长）内未返回时，向备用引擎发起对冲请求，
+    采用先成功的结果并取消另一个。主引擎直接失败时立即切换到备用引擎，不再等待超时。
+    """
+
+    def __init__(self, engines: List[Any]):
+        self.engines = engines
+        self.stats = {engine.name: EngineStats(engine.name) for engine in engines}
+        self.hedge_enabled = settings.TTS_HEDGE_ENABLED
+        self.hedge_percentile = settings.TTS_HEDGE_PERCENTILE
+        self.hedge_factor = settings.TTS_HEDGE_DELAY_FACTOR
+        self.hedge_min_delay = settings.TTS_HEDGE_MIN_DELAY
+        self.hedge_default_delay = settings.TTS_HEDGE_DEFAULT_DELAY
+        self.hedges_fired = 0
+        self.hedges_won = 0
+
+    def hedge_delay(self, engine_name: str, text_length: int) -> float:
+        """主引擎的对冲等待时间（秒）"""
+        per_1k = self.stats[engine_name].latency_percentile(self.hedge_percentile)
+        if per_1k is None:
+            per_1k = self.hedge_default_delay
+        else:
+            per_1k *= self.hedge_factor
+        # 不设绝对上限：长文本的正常延迟本来就长，固定上限会让每个长文本都触发对冲
+        return max(per_1k * max(text_length, 100) / 1000, self.hedge_min_delay)
+
+    def _candidates(self) -> Tuple[List[Any], bool]:
+        """
+        熔断器放行的引擎；全部熔断时仍按优先级尝试，避免直接拒绝请求
+
+        Returns:
+            (引擎列表, 是否强制发出请求)
+        """
+        allowed = [engine for engine in self.engines if self.stats[engine.name].available()]
+        if allowed:
+            return allowed, False
+        return list(self.engines), True
+
+    async def _run(self, engine, text: str, voice: str, force: bool = False) -> bytes:
+        stats = self.stats[engine.name]
+        admitted = stats.acquire(force)
+        if admitted is None:
+            raise EngineUnavailable(f"TTS引擎 {engine.name} 熔断中")
+        started = time.monotonic()
+        try:
+            audio = await engine.synthesize(text, voice)
+        except asyncio.CancelledError:
+            if admitted == "trial":
+                stats.release_trial()
+            raise
+        except Exception as e:
+            stats.record_failure()
+            TTS_ENGINE_REQUESTS.labels(engine=engine.name, outcome="error").inc()
+            logger.warning(f"⚠️ TTS引擎 {engine.name} 合成失败: {e}")
+            raise
+        latency = time.monotonic() - started
+        stats.record_success(latency, len(text))
+        TTS_ENGINE_REQUESTS.labels(engine=engine.name, outcome="success").inc()
+        TTS_ENGINE_SECONDS.labels(engine=engine.name).observe(latency)
+        return audio
+
+    async def synthesize(self, text: str, voice: str) -> Tuple[bytes, Any]:
+        """
+        合成音频
+
+        Args:
+            text: 要合成的文本
+            voice: Edge TTS 声音名称（其他引擎会映射到对应声音）
+
+        Returns:
+            (MP3字节, 实际使用的引擎)
+        """
+        candidates, force = self._candidates()
+        primary, fallbacks = candidates[0], candidates[1:]
+        primary_task = asyncio.ensure_future(self._run(primary, text, voice, force))
+        tasks = {primary_task: primary}
+        hedge = None
+        last_error = None
+
+        try:
+            if fallbacks and self.hedge_enabled:
+                delay = self.hedge_delay(primary.name, len(text))
+                done, _ = await asyncio.wait({primary_task}, timeout=delay)
+                if not done:
+                    # 主引擎超过延迟阈值，发起对冲请求
+                    hedge = fallbacks.pop(0)
+                    self.hedges_fired += 1
+                    logger.info(f"🏁 {primary.name} 超过 {delay:.1f}s 未返回，向 {hedge.name} 发起对冲请求")
+                    tasks[asyncio.ensure_future(self._run(hedge, text, voice, force))] = hedge
+
+            while True:
+                pending = set(tasks)
+                while pending:
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        if task.exception() is None:
+                            engine = tasks[task]
+                            if engine is hedge:
+                                self.hedges_won += 1
+                            return task.result(), engine
+                        last_error = task.exception()
+                # 已发起的请求全部失败，依次尝试剩余引擎
+                if not fallbacks:
+                    raise last_error
+                engine = fallbacks.pop(0)
+                logger.info(f"🔄 切换到TTS引擎 {engine.name}")
+                tasks = {asyncio.ensure_future(self._run(engine, text, voice, force)): engine}
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def engine_stats(self) -> Dict[str, Any]:
+        """各引擎的熔断状态、错误率、延迟和对冲统计"""
+        return {
+            "engines": {name: stats.snapshot() for name, stats in self.stats.items()},
+            "hedges_fired": self.hedges_fired,
+            "hedges_won": self.hedges_won,
+        }
+
+
+# 全局TTS引擎路由实例（引擎客户端为长期存活的单例）
+tts_engine_router = TTSEngineRouter([EdgeEngine(), GoogleEngine()])
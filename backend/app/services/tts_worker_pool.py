@@ -0,0 +1,136 @@
+import asyncio
+import logging
+import os
+import threading
+from typing import Any, Awaitable, Callable, Dict, List
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class _LoopWorker:
+    """一个常驻线程及其事件循环"""
+
+    def __init__(self, index: int, sessions_per_loop: int):
+        self.index = index
+        self.loop = asyncio.new_event_loop()
+        self.semaphore = asyncio.Semaphore(sessions_per_loop)
+        self.pending = 0  # 已分配到该循环、尚未完成的任务数（含排队）
+        self.active = 0  # 正在运行的 TTS 会话数
+        self.thread = threading.Thread(
+            target=self._run,
+            name=f"tts-loop-{index}",
+            daemon=True
+        )
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def stop(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(timeout=5)
+
+
+class TTSWorkerPool:
+    """常驻事件循环的 TTS 工作池
+
+    每个循环运行在独立线程中，可同时承载多个 Edge TTS websocket 会话，
+    避免每次合成都新建线程和事件循环（asyncio.run）。
+    """
+
+    def __init__(self):
+        self.num_loops = settings.TTS_WORKER_LOOPS
+        self.sessions_per_loop = settings.TTS_SESSIONS_PER_LOOP
+        self._workers: List[_LoopWorker] = []
+        self._lock = threading.Lock()
+        self._pid = None
+        self.completed = 0
+        self.failed = 0
+
+    def start(self):
+        """启动工作循环（重复调用或 fork 后调用都是安全的）"""
+        with self._lock:
+            # fork 出来的子进程（如 Celery worker）不会继承线程，需要重新启动
+            if self._workers and self._pid == os.getpid():
+                return
+            self._workers = [_LoopWorker(i, self.sessions_per_loop) for i in range(self.num_loops)]
+            for worker in self._workers:
+                worker.thread.start()
+            self._pid = os.getpid()
+        logger.info(f"✅ TTS工作池已启动: {self.num_loops} 个事件循环，每个最多 {self.sessions_per_loop} 个会话")
+
+    def shutdown(self):
+        """停止所有工作循环"""
+        with self._lock:
+            workers, self._workers = self._workers, []
+        for worker in workers:
+            worker.stop()
+
+    def _pick_worker(self) -> _LoopWorker:
+        """选择负载最低的事件循环"""
+        with self._lock:
+            worker = min(self._workers, key=lambda w: w.pending)
+            worker.pending += 1
+            return worker
+
+    async def _run_on_worker(self, worker: _LoopWorker, coro_factory: Callable[[], Awaitable[Any]]) -> Any:
+        async with worker.semaphore:
+            worker.active += 1
+            try:
+                return await coro_factory()
+            finally:
+                worker.active -= 1
+
+    async def submit(self, coro_factory: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        在工作池中运行一个合成协程并等待结果
+
+        Args:
+            coro_factory: 返回协程的无参函数，协程在工作循环中创建和执行
+
+        Returns:
+            协程的返回值；调用方被取消时，工作循环中的协程也会被取消
+        """
+        if not self._workers or self._pid != os.getpid():
+            self.start()
+
+        worker = self._pick_worker()
+        future = asyncio.run_coroutine_threadsafe(self._run_on_worker(worker, coro_factory), worker.loop)
+        try:
+            result = await asyncio.wrap_future(future)
+            self.completed += 1
+            return result
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            with self._lock:
+                worker.pending -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        """工作池利用率"""
+        workers = list(self._workers)
+        capacity = self.num_loops * self.sessions_per_loop
+        active = sum(w.active for w in workers)
+        pending = sum(w.pending for w in workers)
+        return {
+            "loops": self.num_loops,
+            "sessions_per_loop": self.sessions_per_loop,
+            "capacity": capacity,
+            "active_sessions": active,
+            "queued_sessions": max(pending - active, 0),
+            "utilization": round(active / capacity, 3) if capacity else 0,
+            "completed": self.completed,
+            "failed": self.failed,
+            "per_loop": [{"loop": w.index, "active": w.active, "pending": w.pending} for w in workers],
+            "running": bool(workers) and self._pid == os.getpid(),
+        }
+
+
+# 全局TTS工作池实例
+tts_worker_pool = TTSWorkerPool()
@@ -0,0 +1,221 @@
+import json
+import logging
+import uuid
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from fastapi import HTTPException
+from sqlalchemy.orm import Session
+
+from app.core.celery_app import celery_app
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.podcast import Podcast
+from app.models.series import PodcastSeries
+from app.services.cache_service import cache_service
+from app.services.generation_admission import AdmissionTimeout
+from app.services.podcast_generation import PodcastGenerateRequest
+from app.tasks.podcast_tasks import run_generation
+
+logger = logging.getLogger(__name__)
+
+BATCH_KEY_PREFIX = "podcast_batch"
+
+
+def _batch_key(batch_id: str, suffix: str = "") -> str:
+    return f"{BATCH_KEY_PREFIX}:{batch_id}:{suffix}" if suffix else f"{BATCH_KEY_PREFIX}:{batch_id}"
+
+
+def _update_item(batch_id: str, index: int, **fields):
+    """更新单集的状态（每集只由自己的任务写入，不会相互覆盖）"""
+    key = _batch_key(batch_id, "items")
+    try:
+        raw = cache_service.redis_client.hget(key, index)
+        item = json.loads(raw) if raw else {}
+        item.update(fields)
+        cache_service.redis_client.hset(key, index, json.dumps(item, ensure_ascii=False))
+    except Exception as e:
+        logger.error(f"Batch item update error: {e}")
+
+
+def renumber_series(db: Session, batch_id: str, series_id: int) -> int:
+    """
+    按原始顺序为已完成的集重新编号，并把系列集数更新为已完成的集数
+
+    失败的集不占编号，编号始终连续。锁住系列行后再读取各集状态，
+    并发完成的任务依次编号，后提交的一定看到先完成的集。
+
+    Returns:
+        系列当前的集数
+    """
+    series = db.query(PodcastSeries).filter(PodcastSeries.id == series_id).with_for_update().first()
+    if series is None:
+        return 0
+
+    raw_items = cache_service.redis_client.hgetall(_batch_key(batch_id, "items"))
+    completed = sorted(
+        (int(index), item["podcastId"])
+        for index, item in ((index, json.loads(raw)) for index, raw in raw_items.items())
+        if item.get("status") == "completed"
+    )
+    for number, (_, podcast_id) in enumerate(completed, start=1):
+        db.query(Podcast).filter(Podcast.id == podcast_id).update(
+            {Podcast.series_id: series_id, Podcast.episode_number: number},
+            synchronize_session=False
+        )
+    series.episode_count = len(completed)
+    db.commit()
+    return len(completed)
+
+
+def dispatch_next(batch_id: str) -> bool:
+    """
+    从批量任务的待生成队列中取出下一集投递到 worker 池
+
+    Returns:
+        是否投递了任务（队列为空时返回 False）
+    """
+    raw = cache_service.redis_client.lpop(_batch_key(batch_id, "pending"))
+    if raw is None:
+        return False
+    generate_batch_item_task.apply_async(args=[batch_id, json.loads(raw)])
+    return True
+
+
+@celery_app.task(bind=True, name="podcast.generate_batch_item")
+def generate_batch_item_task(self, batch_id: str, item: Dict[str, Any]) -> Dict[str, Any]:
+    """生成批量任务中的一集，完成后投递下一集，使每个批量任务同时占用的 worker 数保持不变"""
+    index = item["index"]
+    request = PodcastGenerateRequest(**item["request"])
+
+    def on_progress(stage: str, progress: int):
+        _update_item(batch_id, index, status="running", stage=stage, progress=progress)
+
+    _update_item(batch_id, index, status="running", stage="started", progress=0)
+    db = SessionLocal()
+    retrying = False
+    try:
+        result = run_generation(request, db, on_progress)
+        _update_item(
+            batch_id, index,
+            status="completed", stage="completed", progress=100,
+            podcastId=result["id"], title=result["title"], audioUrl=result["audioUrl"], duration=result["duration"]
+        )
+        if item.get("series_id"):
+            try:
+                renumber_series(db, batch_id, item["series_id"])
+            except Exception as e:
+                db.rollback()
+                logger.error(f"Batch series update error: {e}")
+        return {"success": True, "result": result}
+    except HTTPException as e:
+        if isinstance(e, AdmissionTimeout) and self.request.retries < settings.BATCH_ADMISSION_RETRIES:
+            # 系统繁忙只是暂时没有名额，稍后重新投递这一集，不判为失败；
+            # 重试的任务继续占用本批次的并行名额，因此不投递下一集
+            retrying = True
+            logger.info(f"⏳ 批量任务 {batch_id} 第 {index + 1} 集排队超时，{settings.BATCH_ADMISSION_RETRY_DELAY} 秒后重试")
+            _update_item(batch_id, index, status="queued", stage="waiting", progress=0)
+            raise self.retry(countdown=settings.BATCH_ADMISSION_RETRY_DELAY, max_retries=settings.BATCH_ADMISSION_RETRIES)
+        # 业务错误（配额、参数等）只影响这一集，不重试
+        logger.warning(f"⚠️ 批量任务 {batch_id} 第 {index + 1} 集失败: {e.detail}")
+        _update_item(
+            batch_id, index,
+            status="failed", stage="failed", error={"status_code": e.status_code, "detail": e.detail}
+        )
+        return {"success": False, "status_code": e.status_code, "detail": e.detail}
+    except Exception:
+        logger.exception(f"❌ 批量任务 {batch_id} 第 {index + 1} 集异常")
+        _update_item(
+            batch_id, index,
+            status="failed", stage="failed", error={"status_code": 500, "detail": "播客生成失败，请稍后重试"}
+        )
+        raise
+    finally:
+        db.close()
+        if not retrying:
+            try:
+                dispatch_next(batch_id)
+            except Exception as e:
+                logger.error(f"Batch dispatch error: {e}")
+
+
+def enqueue_batch_job(user_email: str, payloads: List[Dict[str, Any]], series_id: Optional[int] = None) -> str:
+    """
+    创建批量任务：各集进入待生成队列，先投递 BATCH_PARALLELISM 集，其余在前面的完成后依次投递
+
+    Args:
+        user_email: 提交者
+        payloads: 每一集的 PodcastGenerateRequest 参数
+        series_id: 所属系列，为 None 时不归入系列
+
+    Returns:
+        批量任务ID
+    """
+    batch_id = uuid.uuid4().hex
+    ttl = settings.PODCAST_JOB_TTL
+    items = [{"index": index, "request": payload, "series_id": series_id} for index, payload in enumerate(payloads)]
+
+    redis = cache_service.redis_client
+    pipe = redis.pipeline()
+    pipe.hset(_batch_key(batch_id, "items"), mapping={
+        item["index"]: json.dumps(
+            {"status": "queued", "stage": "queued", "progress": 0, "title": item["request"].get("title", "")},
+            ensure_ascii=False
+        )
+        for item in items
+    })
+    pipe.rpush(_batch_key(batch_id, "pending"), *[json.dumps(item, ensure_ascii=False) for item in items])
+    pipe.expire(_batch_key(batch_id, "items"), ttl)
+    pipe.expire(_batch_key(batch_id, "pending"), ttl)
+    pipe.execute()
+    cache_service.set(
+        _batch_key(batch_id),
+        {
+            "user_email": user_email,
+            "series_id": series_id,
+            "total": len(items),
+            "created_at": datetime.utcnow().isoformat(),
+        },
+        ttl
+    )
+
+    for _ in range(min(settings.BATCH_PARALLELISM, len(items))):
+        dispatch_next(batch_id)
+    return batch_id
+
+
+def get_batch_status(batch_id: str) -> Optional[Dict[str, Any]]:
+    """查询批量任务的整体进度和每一集的状态，任务不存在时返回 None"""
+    batch = cache_service.get(_batch_key(batch_id))
+    if batch is None:
+        return None
+
+    raw_items = cache_service.redis_client.hgetall(_batch_key(batch_id, "items"))
+    items = []
+    for index in range(batch["total"]):
+        raw = raw_items.get(str(index).encode("utf-8"))
+        item = json.loads(raw) if raw else {"status": "queued", "stage": "queued", "progress": 0}
+        items.append({"index": index, **item})
+
+    counts = {"queued": 0, "running": 0, "completed": 0, "failed": 0}
+    for item in items:
+        counts[item["status"]] = counts.get(item["status"], 0) + 1
+    finished = counts["completed"] + counts["failed"]
+    if finished == len(items):
+        status = "completed" if counts["failed"] == 0 else ("failed" if counts["completed"] == 0 else "partial")
+    else:
+        status = "running" if counts["running"] or finished else "queued"
+
+    return {
+        "batchId": batch_id,
+        "userEmail": batch.get("user_email"),
+        "seriesId": batch.get("series_id"),
+        "createdAt": batch.get("created_at"),
+        "status": status,
+        "total": len(items),
+        **counts,
+        # 已结束的集按 100% 计入整体进度
+        "progress": round(sum(100 if item["status"] in ("completed", "failed") else item.get("progress", 0)
+                              for item in items) / max(len(items), 1)),
+        "items": items,
+    }
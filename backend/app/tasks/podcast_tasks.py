@@ -0,0 +1,122 @@
+import asyncio
+import logging
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from celery.result import AsyncResult
+from fastapi import HTTPException
+
+from app.core.celery_app import celery_app
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.services.audio_cache import audio_cache
+from app.services.cache_service import cache_service
+from app.services.generation_admission import generation_admission
+from app.services.podcast_generation import PodcastGenerateRequest, podcast_generation_service
+
+logger = logging.getLogger(__name__)
+
+JOB_KEY_PREFIX = "podcast_job"
+
+
+def _job_key(job_id: str) -> str:
+    return f"{JOB_KEY_PREFIX}:{job_id}"
+
+
+def run_generation(request, db, on_progress) -> Dict[str, Any]:
+    """
+    在新的事件循环中执行生成
+
+    与 HTTP 请求共用集群范围的生成名额（按套餐排队）；
+    返回前等待后台的缓存写入（asyncio.run 退出时会取消未完成的任务）。
+    """
+    plan = podcast_generation_service.subscription_plan_of(request.user_email, db)
+
+    async def generate():
+        try:
+            async with generation_admission.slot(request.user_email, plan):
+                return await podcast_generation_service.generate(request, db, on_progress)
+        finally:
+            await audio_cache.drain()
+
+    return asyncio.run(generate())
+
+
+@celery_app.task(bind=True, name="podcast.generate")
+def generate_podcast_task(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+    """在 worker 中执行与 /api/podcast/generate 相同的生成流程"""
+    request = PodcastGenerateRequest(**payload)
+
+    def on_progress(stage: str, progress: int):
+        self.update_state(state="PROGRESS", meta={"stage": stage, "progress": progress})
+
+    db = SessionLocal()
+    try:
+        result = run_generation(request, db, on_progress)
+        return {"success": True, "result": result}
+    except HTTPException as e:
+        # 业务错误（配额、参数等）不重试，作为任务结果返回给查询接口
+        logger.warning(f"⚠️ 生成任务 {self.request.id} 失败: {e.detail}")
+        return {"success": False, "status_code": e.status_code, "detail": e.detail}
+    finally:
+        db.close()
+
+
+def enqueue_generation_job(payload: Dict[str, Any]) -> str:
+    """投递生成任务并记录任务归属，返回任务ID"""
+    async_result = generate_podcast_task.apply_async(args=[payload])
+    cache_service.set(
+        _job_key(async_result.id),
+        {
+            "user_email": payload.get("user_email"),
+            "created_at": datetime.utcnow().isoformat(),
+        },
+        settings.PODCAST_JOB_TTL
+    )
+    return async_result.id
+
+
+def get_job_status(job_id: str) -> Optional[Dict[str, Any]]:
+    """查询任务状态，任务不存在时返回 None"""
+    job = cache_service.get(_job_key(job_id))
+    if job is None:
+        return None
+
+    async_result = AsyncResult(job_id, app=celery_app)
+    state = async_result.state
+    status = {
+        "jobId": job_id,
+        "userEmail": job.get("user_email"),
+        "createdAt": job.get("created_at"),
+        "status": "queued",
+        "stage": "queued",
+        "progress": 0,
+        "result": None,
+        "error": None,
+    }
+
+    if state == "STARTED":
+        status.update(status="running", stage="started")
+    elif state == "PROGRESS":
+        info = async_result.info or {}
+        status.update(status="running", stage=info.get("stage"), progress=info.get("progress", 0))
+    elif state == "SUCCESS":
+        outcome = async_result.result or {}
+        if outcome.get("success"):
+            status.update(status="completed", stage="completed", progress=100, result=outcome.get("result"))
+        else:
+            status.update(
+                status="failed",
+                stage="failed",
+                error={"status_code": outcome.get("status_code"), "detail": outcome.get("detail")}
+            )
+    elif state in ("FAILURE", "REVOKED"):
+        status.update(
+            status="failed",
+            stage="failed",
+            error={"status_code": 500, "detail": "播客生成失败，请稍后重试"}
+        )
+    elif state == "RETRY":
+        status.update(status="queued", stage="retrying")
+
+    return status
@@ -0,0 +1,166 @@
+from typing import Dict, Tuple
+
+# 粤语特征字：用于判断输入文本是否已经是粤语
+CANTONESE_KEYWORDS = frozenset([
+    '咗', '冇', '啱', '嘅', '咩', '啦', '喺', '嚟', '咁', '佢', '乜', '唔', '嘢', '呢', '噉', '啲', '嗰', '喂', '哋'
+])
+
+# 粤语译文特征字：用于校验翻译结果是否为粤语
+CANTONESE_INDICATORS = frozenset(['嘅', '咗', '咁', '唔', '係', '喺', '喇', '嘢', '咩', '點', '邊', '乜'])
+
+# 转换后仍然残留即说明是普通话语法或用词、规则转换无法处理的字
+MANDARIN_MARKERS = frozenset(['们', '吗', '这', '那', '哪', '么', '没', '谁', '把', '被', '给', '很', '也', '还', '着', '吧', '了'])
+
+# 分句标点：置信度按分句统计覆盖率
+CLAUSE_BREAKS = frozenset('，。！？；：、,.!?;:\n')
+
+# 普通话→粤语短语表，按最长匹配替换；译文与原文相同的条目用于保护固定词语不被拆开替换
+PHRASE_TABLE: Dict[str, str] = {
+    # 代词
+    '我们': '我哋', '你们': '你哋', '他们': '佢哋', '她们': '佢哋', '它们': '佢哋', '咱们': '我哋',
+    '他': '佢', '她': '佢', '它': '佢',
+    '其他': '其他', '他人': '他人', '其它': '其它', '吉他': '吉他', '他乡': '他乡', '排他': '排他',
+    # 指示和疑问
+    '这': '呢', '这个': '呢個', '这些': '呢啲', '这里': '呢度', '这儿': '呢度', '这样': '噉樣', '这么': '咁',
+    '那个': '嗰個', '那些': '嗰啲', '那里': '嗰度', '那儿': '嗰度', '那样': '噉樣', '那么': '咁',
+    '哪里': '邊度', '哪儿': '邊度', '哪个': '邊個', '谁': '邊個',
+    '什么': '乜嘢', '为什么': '點解', '怎么': '點', '怎么样': '點樣', '怎样': '點樣', '怎么办': '點算',
+    '多少': '幾多',
+    # 判断和否定
+    '是': '係', '不是': '唔係', '是不是': '係唔係', '是否': '係咪', '就是': '就係', '但是': '但係', '可是': '但係',
+    '于是': '于是', '是非': '是非', '凡是': '凡是',
+    '不': '唔', '不要': '唔好', '要不要': '要唔要', '别': '咪', '不过': '不过', '不起': '不起', '不断': '不断',
+    '不了': '不了', '不仅': '不仅', '不但': '不但', '不然': '不然', '不足': '不足', '不久': '不久',
+    '别人': '别人', '特别': '特别', '区别': '区别', '分别': '分别', '告别': '告别', '级别': '级别',
+    '没有': '冇', '没': '冇', '没关系': '唔緊要', '没收': '没收', '淹没': '淹没', '出没': '出没',
+    # 助词
+    '的': '嘅', '的确': '的确', '目的': '目的', '的士': '的士',
+    # “了”单独出现时可能是句末语气词（知道了、好了），只替换动词后表示完成的用法
+    '为了': '为咗', '除了': '除咗', '了解': '了解', '了不起': '了不起', '算了': '算啦', '知道了': '知道喇',
+    '去了': '去咗', '来了': '嚟咗', '吃了': '食咗', '做了': '做咗', '买了': '买咗', '看了': '睇咗', '说了': '讲咗',
+    '在': '喺', '正在': '喺度', '现在': '而家', '存在': '存在', '实在': '实在', '自在': '自在', '在于': '在于',
+    '在线': '在线', '在场': '在场', '在乎': '在乎', '在意': '在意', '在内': '在内', '所在': '所在',
+    '内在': '内在', '潜在': '潜在',
+    # 常用词
+    '看': '睇', '看看': '睇睇', '好看': '好睇', '难看': '难睇', '好吃': '好食', '说': '讲', '说话': '讲嘢', '吃': '食', '喝': '饮', '给': '畀',
+    '看法': '看法', '看待': '看待', '看护': '看护', '小说': '小说', '说明': '说明', '传说': '传说', '学说': '学说',
+    '说服': '说服', '口吃': '口吃', '吃惊': '吃惊', '吃力': '吃力', '喝彩': '喝彩', '供给': '供给', '给予': '给予',
+    '东西': '嘢', '今天': '今日', '明天': '听日', '昨天': '琴日', '刚才': '头先', '马上': '即刻',
+    '一些': '一啲', '一点': '少少', '很': '好', '非常': '好', '也': '都', '还': '仲', '还是': '定係',
+    '也许': '也许', '还原': '还原', '归还': '归还', '偿还': '偿还', '还款': '还款',
+    '漂亮': '靓', '喜欢': '钟意', '睡觉': '瞓觉', '聊天': '倾偈', '回家': '返屋企', '一起': '一齐',
+    '工作': '做嘢', '知道': '知',
+    '来': '嚟', '回来': '返嚟', '过来': '过嚟', '出来': '出嚟', '起来': '起嚟',
+    '未来': '未来', '原来': '原来', '将来': '将来', '后来': '后来', '本来': '本来', '以来': '以来', '来自': '来自',
+}
+
+
+def _is_han(ch: str) -> bool:
+    return '\u4e00' <= ch <= '\u9fff'
+
+
+def is_cantonese(text: str) -> bool:
+    """文本中是否含有粤语特征字"""
+    return any(ch in CANTONESE_KEYWORDS for ch in text or "")
+
+
+def has_cantonese_indicators(text: str) -> bool:
+    """译文中是否含有粤语特征字"""
+    return any(ch in CANTONESE_INDICATORS for ch in text or "")
+
+
+class CantoneseConverter:
+    """基于短语表的普通话→粤语快速转换
+
+    短语表构建为字典树，从左到右按最长匹配替换。
+    置信度 = 覆盖率 × 可靠度：
+    覆盖率是已转换分句（含有替换或粤语特征字）中的汉字占全部汉字的比例，没有任何替换的分句
+    （如“我爱北京天安门”）无法确认已经转换；整段没有替换时置信度为 0。
+    可靠度根据替换次数和未匹配部分残留的普通话特征字计算，残留越多越需要交给大模型翻译。
+    单字替换两侧都是未匹配的汉字时，可能是拆开了短语表没有收录的复合词（如“的士”），
+    这类替换只按半次计入可靠度。
+    """
+
+    _END = ""
+
+    def __init__(self, table: Dict[str, str] = PHRASE_TABLE):
+        self.trie: dict = {}
+        for source, target in table.items():
+            node = self.trie
+            for ch in source:
+                node = node.setdefault(ch, {})
+            node[self._END] = target
+
+    def convert(self, text: str) -> Tuple[str, float]:
+        """
+        转换文本
+
+        Returns:
+            (转换后的文本, 置信度 0~1)
+        """
+        segments = []  # (原文, 译文, 是否匹配短语表)
+        i = 0
+        length = len(text)
+        while i < length:
+            node = self.trie
+            match_end = -1
+            match_target = None
+            j = i
+            while j < length and text[j] in node:
+                node = node[text[j]]
+                j += 1
+                if self._END in node:
+                    match_end = j
+                    match_target = node[self._END]
+            if match_target is None:
+                segments.append((text[i], text[i], False))
+                i += 1
+                continue
+            segments.append((text[i:match_end], match_target, True))
+            i = match_end
+
+        replacements = 0
+        ambiguous = 0
+        residual = 0
+        clause_han = 0
+        clause_replaced = False  # 当前分句是否已转换
+        covered = 0
+        total_han = 0
+        for index, (source, target, matched) in enumerate(segments):
+            if not matched and source in CLAUSE_BREAKS:
+                if clause_replaced:
+                    covered += clause_han
+                clause_han = 0
+                clause_replaced = False
+                continue
+            han = sum(1 for ch in source if _is_han(ch))
+            clause_han += han
+            total_han += han
+            if not matched:
+                residual += source in MANDARIN_MARKERS
+                clause_replaced = clause_replaced or source in CANTONESE_KEYWORDS
+                continue
+            if target == source:
+                continue
+            replacements += 1
+            clause_replaced = True
+            if len(source) == 1 and all(
+                0 <= k < len(segments) and not segments[k][2] and _is_han(segments[k][0])
+                for k in (index - 1, index + 1)
+            ):
+                ambiguous += 1
+        if clause_replaced:
+            covered += clause_han
+
+        converted = "".join(target for _, target, _ in segments)
+        if replacements == 0:
+            confidence = 0.0
+        else:
+            # 每个残留的普通话特征字按两次替换计，残留即明显降低置信度
+            reliability = (replacements - ambiguous * 0.5) / (replacements + residual * 2)
+            confidence = covered / total_han * reliability
+        return converted, round(confidence, 3)
+
+
+# 全局转换器实例
+cantonese_converter = CantoneseConverter()
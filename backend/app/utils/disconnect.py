@@ -0,0 +1,60 @@
+import asyncio
+import logging
+from typing import Awaitable, Optional, TypeVar
+
+from fastapi import HTTPException, Request
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# nginx 约定的“客户端已关闭请求”状态码，只用于日志和指标，客户端收不到
+CLIENT_CLOSED_REQUEST = 499
+
+
+async def wait_for_disconnect(request: Request):
+    """等待客户端断开连接
+
+    请求体已被读取后，ASGI 服务器的下一条消息只会是 http.disconnect，
+    因此直接等待 receive()，不需要轮询。
+    """
+    while True:
+        message = await request.receive()
+        if message["type"] == "http.disconnect":
+            return
+
+
+async def run_until_disconnected(request: Optional[Request], awaitable: Awaitable[T]) -> T:
+    """
+    执行协程，客户端断开连接时立即取消
+
+    取消会传递到协程内的每个阶段（排队、翻译、合成、优化、上传），
+    各阶段在退出时释放名额、额度和临时文件。
+
+    Args:
+        request: 当前HTTP请求；为 None 时（脚本或测试直接调用）只执行协程
+        awaitable: 要执行的协程
+
+    Returns:
+        协程的返回值
+
+    Raises:
+        HTTPException: 客户端已断开连接（499）
+    """
+    if request is None:
+        return await awaitable
+
+    task = asyncio.ensure_future(awaitable)
+    watcher = asyncio.ensure_future(wait_for_disconnect(request))
+    try:
+        await asyncio.wait({task, watcher}, return_when=asyncio.FIRST_COMPLETED)
+        if not task.done():
+            logger.info(f"🔌 客户端已断开连接，取消请求: {request.method} {request.url.path}")
+            task.cancel()
+            # 等待各阶段的清理完成后再返回，确保名额已经释放
+            await asyncio.gather(task, return_exceptions=True)
+            raise HTTPException(status_code=CLIENT_CLOSED_REQUEST, detail="客户端已断开连接")
+        return task.result()
+    finally:
+        watcher.cancel()
+        task.cancel()
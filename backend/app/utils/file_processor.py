@@ -1,8 +1,14 @@
 import io
 import os
+import re
 from typing import Optional
 from fastapi import HTTPException
 
+from app.utils.text_analysis import analyze_text
+
+_WHITESPACE_RE = re.compile(r'\s+')
+_DISALLOWED_CHARS_RE = re.compile(r'[^\u4e00-\u9fa5a-zA-Z0-9\s.,!?;:()（）]')
+
 def extract_text_from_file(content: bytes, filename: str) -> Optional[str]:
     """从文件中提取文本内容"""
     try:
@@ -69,24 +75,20 @@ def validate_extracted_text(text: str) -> bool:
         return False
     
     # 检查是否包含可读字符
-    import re
-    readable_chars = re.findall(r'[\u4e00-\u9fa5a-zA-Z0-9]', text)
-    if len(readable_chars) < 5:
+    if analyze_text(text).readable_chars < 5:
         return False
     
     return True
 
 def clean_extracted_text(text: str) -> str:
     """清理提取的文本内容"""
-    import re
-    
     # 移除多余的空白字符
-    text = re.sub(r'\s+', ' ', text)
+    text = _WHITESPACE_RE.sub(' ', text)
     
     # 移除特殊字符（保留中文、英文、数字、标点）
-    text = re.sub(r'[^\u4e00-\u9fa5a-zA-Z0-9\s.,!?;:()（）]', '', text)
+    text = _DISALLOWED_CHARS_RE.sub('', text)
     
     # 移除行首行尾空白
     text = text.strip()
     
-    return text 
\ No newline at end of file
+    return text
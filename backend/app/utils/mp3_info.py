@@ -0,0 +1,219 @@
+import mmap
+import os
+import struct
+from typing import Any, Dict, Optional, Union
+
+# 比特率表（kbps），按 (MPEG版本, 层) 索引；MPEG2 和 MPEG2.5 共用同一张表
+_BITRATES = {
+    (1, 1): [0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448],
+    (1, 2): [0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384],
+    (1, 3): [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    (2, 1): [0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256],
+    (2, 2): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+    (2, 3): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+_SAMPLE_RATES = {1: [44100, 48000, 32000], 2: [22050, 24000, 16000], 2.5: [11025, 12000, 8000]}
+_VERSIONS = {0: 2.5, 2: 2, 3: 1}  # 1 为保留值
+_LAYERS = {1: 3, 2: 2, 3: 1}  # 0 为保留值
+
+# 校验前若干帧的比特率，全部一致时按CBR估算时长，不再逐帧遍历
+_CBR_PROBE_FRAMES = 8
+
+BytesLike = Union[bytes, bytearray, memoryview, mmap.mmap]
+
+
+def _parse_header(data: BytesLike, offset: int) -> Optional[Dict[str, Any]]:
+    """解析 offset 处的帧头，不是合法帧头时返回 None"""
+    if offset + 4 > len(data):
+        return None
+    b0, b1, b2, b3 = data[offset], data[offset + 1], data[offset + 2], data[offset + 3]
+    if b0 != 0xFF or (b1 & 0xE0) != 0xE0:
+        return None
+
+    version = _VERSIONS.get((b1 >> 3) & 0x03)
+    layer = _LAYERS.get((b1 >> 1) & 0x03)
+    bitrate_index = (b2 >> 4) & 0x0F
+    sample_rate_index = (b2 >> 2) & 0x03
+    if version is None or layer is None or bitrate_index in (0, 15) or sample_rate_index == 3:
+        return None
+
+    table_version = 1 if version == 1 else 2
+    bitrate = _BITRATES[(table_version, layer)][bitrate_index] * 1000
+    sample_rate = _SAMPLE_RATES[version][sample_rate_index]
+    padding = (b2 >> 1) & 0x01
+    channel_mode = (b3 >> 6) & 0x03
+
+    if layer == 1:
+        samples = 384
+        frame_length = (12 * bitrate // sample_rate + padding) * 4
+    elif layer == 3 and version != 1:
+        samples = 576
+        frame_length = 72 * bitrate // sample_rate + padding
+    else:
+        samples = 1152
+        frame_length = 144 * bitrate // sample_rate + padding
+
+    return {
+        "version": version,
+        "layer": layer,
+        "bitrate": bitrate,
+        "sample_rate": sample_rate,
+        "channels": 1 if channel_mode == 3 else 2,
+        "samples": samples,
+        "frame_length": frame_length,
+    }
+
+
+def _skip_id3v2(data: BytesLike) -> int:
+    """跳过文件开头的 ID3v2 标签，返回音频数据起始位置"""
+    if len(data) >= 10 and data[0:3] == b"ID3":
+        size = ((data[6] & 0x7F) << 21) | ((data[7] & 0x7F) << 14) | ((data[8] & 0x7F) << 7) | (data[9] & 0x7F)
+        footer = 10 if data[5] & 0x10 else 0
+        return 10 + size + footer
+    return 0
+
+
+def _find_first_frame(data: BytesLike, start: int) -> Optional[Dict[str, Any]]:
+    """查找第一个合法帧；要求下一帧也合法，避免把音频数据中的伪同步字当作帧头"""
+    offset = data.find(b"\xff", start) if hasattr(data, "find") else start
+    end = len(data) - 4
+    while 0 <= offset <= end:
+        header = _parse_header(data, offset)
+        if header:
+            next_offset = offset + header["frame_length"]
+            if next_offset >= len(data) or _parse_header(data, next_offset):
+                header["offset"] = offset
+                return header
+        offset = data.find(b"\xff", offset + 1) if hasattr(data, "find") else offset + 1
+    return None
+
+
+def _read_vbr_header(data: BytesLike, header: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """读取 Xing/Info 或 VBRI 头中的总帧数和字节数"""
+    offset = header["offset"]
+    # Xing/Info 位于帧头和 side info 之后
+    if header["version"] == 1:
+        side_info = 17 if header["channels"] == 1 else 32
+    else:
+        side_info = 9 if header["channels"] == 1 else 17
+    xing = offset + 4 + side_info
+    tag = bytes(data[xing:xing + 4])
+    if tag in (b"Xing", b"Info"):
+        flags = struct.unpack(">I", bytes(data[xing + 4:xing + 8]))[0]
+        position = xing + 8
+        frames = total_bytes = None
+        if flags & 0x01:
+            frames = struct.unpack(">I", bytes(data[position:position + 4]))[0]
+            position += 4
+        if flags & 0x02:
+            total_bytes = struct.unpack(">I", bytes(data[position:position + 4]))[0]
+        if frames:
+            return {"frames": frames, "bytes": total_bytes, "vbr": tag == b"Xing", "tag": tag.decode()}
+
+    # VBRI 固定位于帧头后32字节
+    vbri = offset + 36
+    if bytes(data[vbri:vbri + 4]) == b"VBRI":
+        total_bytes, frames = struct.unpack(">II", bytes(data[vbri + 10:vbri + 18]))
+        if frames:
+            return {"frames": frames, "bytes": total_bytes, "vbr": True, "tag": "VBRI"}
+    return None
+
+
+def scan_mp3(data: BytesLike, exact: bool = False) -> Dict[str, Any]:
+    """
+    只读取帧头获取MP3的时长、比特率、采样率和声道数，不解码音频
+
+    优先使用 Xing/Info/VBRI 头中的总帧数；没有时检查前几帧，
+    比特率一致则按CBR根据数据大小估算，否则逐帧遍历。
+
+    Args:
+        data: MP3字节（bytes、memoryview 或 mmap）
+        exact: 为True时总是逐帧遍历，忽略CBR估算
+
+    Returns:
+        {"duration", "bitrate", "sample_rate", "channels", "frames", "vbr", "version", "layer", "audio_bytes", "method"}
+
+    Raises:
+        ValueError: 找不到合法的MP3帧
+    """
+    start = _skip_id3v2(data)
+    first = _find_first_frame(data, start)
+    if first is None:
+        raise ValueError("不是有效的MP3数据")
+
+    end = len(data)
+    if end - first["offset"] >= 128 and bytes(data[end - 128:end - 125]) == b"TAG":
+        end -= 128  # 排除 ID3v1 标签
+    audio_bytes = end - first["offset"]
+    sample_rate = first["sample_rate"]
+    samples = first["samples"]
+
+    result = {
+        "sample_rate": sample_rate,
+        "channels": first["channels"],
+        "version": first["version"],
+        "layer": first["layer"],
+        "audio_bytes": audio_bytes,
+    }
+
+    vbr_header = None if exact else _read_vbr_header(data, first)
+    if vbr_header:
+        frames = vbr_header["frames"]
+        duration = frames * samples / sample_rate
+        stream_bytes = vbr_header["bytes"] or audio_bytes
+        result.update(
+            frames=frames,
+            duration=duration,
+            bitrate=int(stream_bytes * 8 / duration) if duration else first["bitrate"],
+            vbr=vbr_header["vbr"],
+            method=vbr_header["tag"].lower(),
+        )
+        return result
+
+    # 没有VBR头时，检查前几帧的比特率是否一致
+    offset = first["offset"]
+    frames = 0
+    total_bits = 0
+    constant = True
+    while offset < end:
+        header = _parse_header(data, offset)
+        if header is None or offset + header["frame_length"] > end:
+            break
+        if header["bitrate"] != first["bitrate"]:
+            constant = False
+        frames += 1
+        total_bits += header["bitrate"] * header["samples"] / header["sample_rate"]
+        offset += header["frame_length"]
+        if not exact and constant and frames >= _CBR_PROBE_FRAMES:
+            # CBR：按数据大小直接估算，无需遍历剩余帧
+            duration = audio_bytes * 8 / first["bitrate"]
+            result.update(
+                frames=int(duration * sample_rate / samples),
+                duration=duration,
+                bitrate=first["bitrate"],
+                vbr=False,
+                method="cbr-estimate",
+            )
+            return result
+
+    duration = frames * samples / sample_rate
+    result.update(
+        frames=frames,
+        duration=duration,
+        bitrate=int(total_bits / duration) if duration else first["bitrate"],
+        vbr=not constant,
+        method="frame-scan",
+    )
+    return result
+
+
+def scan_mp3_file(path: str, exact: bool = False) -> Dict[str, Any]:
+    """通过内存映射读取MP3文件元数据，文件不会被整体读入内存"""
+    with open(path, "rb") as f:
+        file_size = os.fstat(f.fileno()).st_size
+        if file_size == 0:
+            raise ValueError("不是有效的MP3数据")
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            info = scan_mp3(data, exact=exact)
+    info["file_size"] = file_size
+    return info
@@ -0,0 +1,88 @@
+import re
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+from app.utils.cantonese import CANTONESE_KEYWORDS
+from app.utils.text_splitter import split_sentences
+
+# 各字符类别按连续片段匹配，片段数远少于字符数，统计时只需累加片段长度
+_CHAR_CLASS_RES = {
+    "han": re.compile(r'[\u4e00-\u9fff]+'),
+    "latin": re.compile(r'[A-Za-z]+'),
+    "digit": re.compile(r'[0-9]+'),
+    "space": re.compile(r'\s+'),
+}
+_CANTONESE_MARKER_RE = re.compile('[' + ''.join(sorted(CANTONESE_KEYWORDS)) + ']')
+# 标题只保留中文、英文、数字和空白
+_TITLE_STRIP_RE = re.compile(r'[^\u4e00-\u9fa5a-zA-Z0-9\s]')
+_WHITESPACE_RE = re.compile(r'\s+')
+
+TITLE_MAX_CHARS = 50
+DEFAULT_TITLE = '我的播客'
+
+
+class TextAnalysis:
+    """
+    一段文本的分析结果：字符类别统计、粤语特征字得分、句子切分和标题
+
+    由 analyze_text 创建，生成流程各阶段共用同一个结果，不再重复扫描文本。
+    句子切分和标题在第一次访问时计算并保存，只做语言检测的调用方无需为其付出开销。
+    """
+
+    __slots__ = ("text", "counts", "cantonese_markers", "_sentences", "_title")
+
+    def __init__(self, text: str):
+        self.text = text
+        counts = {name: sum(map(len, pattern.findall(text))) for name, pattern in _CHAR_CLASS_RES.items()}
+        counts["other"] = len(text) - sum(counts.values())
+        self.counts: Dict[str, int] = counts
+        self.cantonese_markers = len(_CANTONESE_MARKER_RE.findall(text))
+        self._sentences: Optional[List[str]] = None
+        self._title: Optional[str] = None
+
+    @property
+    def sentences(self) -> List[str]:
+        """按句末标点切分的句子"""
+        if self._sentences is None:
+            self._sentences = split_sentences(self.text)
+        return self._sentences
+
+    @property
+    def title(self) -> str:
+        """取第一个有内容的句子作为标题，超过50字截断"""
+        if self._title is None:
+            self._title = DEFAULT_TITLE
+            for sentence in self.sentences:
+                title = _WHITESPACE_RE.sub(' ', _TITLE_STRIP_RE.sub('', sentence)).strip()
+                if title:
+                    self._title = title[:TITLE_MAX_CHARS] + '...' if len(title) > TITLE_MAX_CHARS else title
+                    break
+        return self._title
+
+    @property
+    def is_chinese(self) -> bool:
+        """是否包含中文字符"""
+        return self.counts["han"] > 0
+
+    @property
+    def is_cantonese(self) -> bool:
+        """是否包含粤语特征字"""
+        return self.cantonese_markers > 0
+
+    @property
+    def cantonese_score(self) -> float:
+        """粤语特征字占中文字符的比例"""
+        if not self.counts["han"]:
+            return 0.0
+        return self.cantonese_markers / self.counts["han"]
+
+    @property
+    def readable_chars(self) -> int:
+        """中文、英文和数字字符总数"""
+        return self.counts["han"] + self.counts["latin"] + self.counts["digit"]
+
+
+@lru_cache(maxsize=128)
+def analyze_text(text: str) -> TextAnalysis:
+    """分析文本，相同文本在各阶段重复调用时直接返回缓存的结果"""
+    return TextAnalysis(text or "")
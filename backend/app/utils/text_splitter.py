@@ -0,0 +1,202 @@
+import math
+import re
+from typing import List, Optional, Tuple
+
+# 句末标点（中英文），英文句号只有后面跟空白或结尾时才算句末，避免切开 3.14 之类的小数
+_SENTENCE_RE = re.compile(r'.+?(?:[。！？!?；;…]+[”’"\'）)」』]*|\.(?=\s|$)|$)', re.S)
+# 句内可断开的位置（逗号、顿号等），用于超长句子的二次切分
+_CLAUSE_RE = re.compile(r'.+?(?:[，,、：:]+|$)', re.S)
+_PARAGRAPH_RE = re.compile(r'\n+')
+# Markdown 标题（# 到 ######）
+_MARKDOWN_HEADING_RE = re.compile(r'^\s{0,3}(#{1,6})\s+(.+?)\s*#*\s*$')
+# 中文章节标题，如“第一章 开始”“第3课：发音”
+_CHAPTER_HEADING_RE = re.compile(r'^\s*第[一二三四五六七八九十百千零〇两\d]+([部卷篇章课讲集回节])(?:[\s:：、.．]+.*)?$')
+# 中文章节标题的层级：部/卷/篇 > 章/课/讲/集/回 > 节
+_CHAPTER_LEVELS = {"部": 1, "卷": 1, "篇": 1, "章": 2, "课": 2, "讲": 2, "集": 2, "回": 2, "节": 3}
+
+
+def split_sentences(text: str) -> List[str]:
+    """按句末标点切分文本，段落（换行）总是作为句子边界"""
+    sentences = []
+    for paragraph in _PARAGRAPH_RE.split(text or ""):
+        for sentence in _SENTENCE_RE.findall(paragraph):
+            sentence = sentence.strip()
+            if sentence:
+                sentences.append(sentence)
+    return sentences
+
+
+def _split_long_sentence(sentence: str, max_chars: int) -> List[str]:
+    """超长句子先按逗号等切分，仍然超长时按字符数硬切"""
+    pieces = []
+    current = ""
+    for clause in _CLAUSE_RE.findall(sentence):
+        if not clause:
+            continue
+        while len(clause) > max_chars:
+            if current:
+                pieces.append(current)
+                current = ""
+            # 英文尽量在空格处断开，避免切开单词
+            cut = clause.rfind(" ", 1, max_chars + 1)
+            if cut <= 0:
+                cut = max_chars
+            pieces.append(clause[:cut])
+            clause = clause[cut:]
+        if len(current) + len(clause) > max_chars:
+            pieces.append(current)
+            current = clause
+        else:
+            current += clause
+    if current:
+        pieces.append(current)
+    return [piece.strip() for piece in pieces if piece.strip()]
+
+
+def split_text_into_chunks(text: str, max_chars: int = 300) -> List[str]:
+    """
+    把长文本切成适合单次TTS调用的分块
+
+    在句子边界处切分，并把相邻的短句合并到不超过 max_chars 的分块中。
+    每个段落单独打包，这样修改某一段只会影响该段的分块。
+
+    Args:
+        text: 要切分的文本
+        max_chars: 每个分块的最大字符数
+
+    Returns:
+        按原文顺序排列的分块列表
+    """
+    chunks = []
+    for paragraph in _PARAGRAPH_RE.split(text or ""):
+        current = ""
+        for sentence in split_sentences(paragraph):
+            pieces = [sentence] if len(sentence) <= max_chars else _split_long_sentence(sentence, max_chars)
+            for piece in pieces:
+                if current and len(current) + len(piece) > max_chars:
+                    chunks.append(current)
+                    current = piece
+                elif current and current[-1].isascii() and piece[0].isascii():
+                    # 英文句子之间保留空格
+                    current += " " + piece
+                else:
+                    current += piece
+        if current:
+            chunks.append(current)
+    return chunks
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    粗略估算文本的 token 数（不依赖分词器）
+
+    中文等非ASCII字符按每字1.5个token、ASCII按每4个字符1个token估算，偏保守。
+    """
+    non_ascii = sum(1 for ch in text if not ch.isascii())
+    ascii_count = len(text) - non_ascii
+    return math.ceil(non_ascii * 1.5 + ascii_count / 4)
+
+
+def split_text_by_tokens(text: str, max_tokens: int = 600) -> List[str]:
+    """
+    按 token 预算切分待翻译的文本
+
+    相邻段落合并到不超过预算的分块中，超长段落在句子边界处切开。
+    段落末尾的换行保留在分块末尾，因此按顺序拼接各分块的译文即可还原段落结构。
+
+    Args:
+        text: 要切分的文本
+        max_tokens: 每个分块的最大估算 token 数
+
+    Returns:
+        按原文顺序排列的分块列表
+    """
+    # 每字最多1.5个token，按字符数切分超长段落可保证不超出预算
+    max_chars = max(int(max_tokens / 1.5), 1)
+    segments = []
+    current = ""
+    paragraphs = (text or "").split("\n")
+    for index, paragraph in enumerate(paragraphs):
+        line_end = "\n" if index < len(paragraphs) - 1 else ""
+        if not paragraph.strip():
+            current += line_end
+            continue
+        if estimate_tokens(paragraph) <= max_tokens:
+            units = [paragraph + line_end]
+        else:
+            units = split_text_into_chunks(paragraph, max_chars)
+            units[-1] += line_end
+        for unit in units:
+            if current.strip() and estimate_tokens(current + unit) > max_tokens:
+                segments.append(current)
+                current = unit
+            else:
+                current += unit
+    if current.strip():
+        segments.append(current)
+    elif current and segments:
+        segments[-1] += current
+    return segments
+
+
+def _heading(line: str) -> Optional[Tuple[int, str]]:
+    """识别标题行，返回 (层级, 标题文字)，不是标题时返回 None"""
+    match = _MARKDOWN_HEADING_RE.match(line)
+    if match:
+        return len(match.group(1)), match.group(2).strip()
+    match = _CHAPTER_HEADING_RE.match(line)
+    if match and len(line.strip()) <= 50:
+        return _CHAPTER_LEVELS[match.group(1)], line.strip()
+    return None
+
+
+def split_by_headings(document: str) -> List[Tuple[str, str]]:
+    """
+    按标题把长文档切分为多集
+
+    在出现至少两次的最高层级标题处切分（例如书名是唯一的一级标题时按二级标题的章节切分），
+    更低层级的标题保留在正文中，只去掉 Markdown 标记。第一个标题之前的内容单独作为一集，
+    没有正文的标题会被跳过。
+
+    Args:
+        document: Markdown 或带“第X章”标题的纯文本
+
+    Returns:
+        按原文顺序排列的 (标题, 正文) 列表；没有标题时整篇作为一集，标题为空
+    """
+    lines = (document or "").split("\n")
+    headings = {}
+    for index, line in enumerate(lines):
+        heading = _heading(line)
+        if heading:
+            headings[index] = heading
+    if not headings:
+        body = (document or "").strip()
+        return [("", body)] if body else []
+
+    level_counts = {}
+    for level, _ in headings.values():
+        level_counts[level] = level_counts.get(level, 0) + 1
+    repeated = [level for level, count in level_counts.items() if count >= 2]
+    split_level = min(repeated or level_counts)
+
+    episodes = []
+    title = ""
+    body: List[str] = []
+
+    def flush():
+        text = "\n".join(body).strip()
+        if text:
+            episodes.append((title, text))
+
+    for index, line in enumerate(lines):
+        heading = headings.get(index)
+        if heading and heading[0] <= split_level:
+            flush()
+            title, body = heading[1], []
+        elif heading:
+            body.append(heading[1])
+        else:
+            body.append(line)
+    flush()
+    return episodes
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+播客音频元数据回填脚本
+解析已有播客音频的MP3帧头，修正数据库中的时长和文件大小
+"""
+
+import os
+import sys
+import asyncio
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Optional, Tuple
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.podcast import Podcast
+from app.utils.mp3_info import scan_mp3, scan_mp3_file
+
+# 配置日志
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def format_duration(seconds: float) -> str:
+    """格式化时长为 HH:MM:SS"""
+    hours = int(seconds // 3600)
+    minutes = int((seconds % 3600) // 60)
+    secs = int(seconds % 60)
+    return f"{hours:02d}:{minutes:02d}:{secs:02d}"
+
+
+def resolve_audio_location(audio_url: str) -> Tuple[Optional[str], Optional[str]]:
+    """
+    把 audio_url 解析为本地文件路径或云存储路径
+
+    Returns:
+        (本地路径, 云存储路径)，无法识别时都为 None
+    """
+    if audio_url.startswith("/static/"):
+        return os.path.join("static", audio_url[len("/static/"):]), None
+    base_url = (settings.CDN_BASE_URL or "").rstrip("/")
+    if base_url and audio_url.startswith(base_url + "/"):
+        return None, audio_url[len(base_url) + 1:].split("?", 1)[0]
+    return None, None
+
+
+def scan_podcast_audio(item: Tuple[int, str]) -> Dict[str, Any]:
+    """在子进程中扫描单个播客的音频文件"""
+    podcast_id, audio_url = item
+    local_path, storage_path = resolve_audio_location(audio_url)
+    try:
+        if local_path:
+            info = scan_mp3_file(local_path)
+        elif storage_path:
+            from app.services.cloud_storage import cloud_storage_service
+            content = asyncio.run(cloud_storage_service.download_file(storage_path))
+            info = scan_mp3(content)
+            info["file_size"] = len(content)
+        else:
+            return {"id": podcast_id, "error": f"无法识别的音频地址: {audio_url}"}
+        return {
+            "id": podcast_id,
+            "duration": format_duration(info["duration"]),
+            "file_size": info["file_size"],
+        }
+    except Exception as e:
+        return {"id": podcast_id, "error": str(e)}
+
+
+def backfill_audio_metadata(workers: int, batch_size: int, only_missing: bool, dry_run: bool) -> bool:
+    """并行扫描音频并批量更新数据库"""
+    db = SessionLocal()
+    try:
+        query = db.query(Podcast.id, Podcast.audio_url).filter(Podcast.audio_url.isnot(None))
+        if only_missing:
+            query = query.filter(
+                (Podcast.duration.is_(None)) | (Podcast.duration == "00:00:00") | (Podcast.file_size.is_(None))
+            )
+        items = [(row.id, row.audio_url) for row in query.order_by(Podcast.id).all()]
+    finally:
+        db.close()
+
+    logger.info(f"📊 共 {len(items)} 个播客需要扫描，使用 {workers} 个进程")
+    updated = failed = 0
+    pending = []
+
+    def flush():
+        nonlocal pending
+        if not pending or dry_run:
+            pending = []
+            return
+        session = SessionLocal()
+        try:
+            session.bulk_update_mappings(Podcast, pending)
+            session.commit()
+        finally:
+            session.close()
+        pending = []
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for result in executor.map(scan_podcast_audio, items, chunksize=16):
+            if "error" in result:
+                failed += 1
+                logger.warning(f"⚠️ 播客 {result['id']} 扫描失败: {result['error']}")
+                continue
+            updated += 1
+            pending.append(result)
+            logger.info(f"⏱️ 播客 {result['id']}: {result['duration']}, {result['file_size']} bytes")
+            if len(pending) >= batch_size:
+                flush()
+    flush()
+
+    action = "将更新" if dry_run else "已更新"
+    logger.info(f"🎉 回填完成: {action} {updated} 个播客，失败 {failed} 个")
+    return failed == 0
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="播客音频元数据回填工具")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2, help="扫描进程数")
+    parser.add_argument("--batch-size", type=int, default=200, help="每批更新的记录数")
+    parser.add_argument("--all", action="store_true", help="扫描所有播客（默认只扫描缺少时长或大小的）")
+    parser.add_argument("--dry-run", action="store_true", help="只扫描，不写入数据库")
+
+    args = parser.parse_args()
+
+    ok = backfill_audio_metadata(args.workers, args.batch_size, not args.all, args.dry_run)
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+"""
+生成流程离线压测
+用可配置延迟和错误率的桩 TTS 引擎和翻译引擎替换 Edge/Google/OpenAI，
+在 SQLite 和进程内 Redis（fakeredis）上以 N 个并发用户调用 generate_podcast，
+报告吞吐量、p50/p95/p99 延迟、错误数和峰值 RSS。不访问任何外部服务。
+
+延迟分布格式（单位：秒，@ 后为错误率，可省略）:
+    fixed:0.5               固定延迟
+    uniform:0.2:1.5         均匀分布
+    lognormal:0.8:0.4       对数正态分布（中位数, sigma）
+    lognormal:0.8:0.4@0.05  5% 的请求失败
+
+用法:
+    pip install "fakeredis[lua]"
+    python scripts/bench_generation.py --users 50 --requests 4
+    python scripts/bench_generation.py --users 20 --tts edge=lognormal:1.0:0.5@0.1 --tts google=uniform:1:2
+    python scripts/bench_generation.py --users 20 --shared-texts 5   # 相同文本并发，测试请求合并
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import math
+import os
+import random
+import resource
+import shutil
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional, Tuple
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Edge TTS 的输出格式：MPEG-2 Layer III，48kbps，24kHz，单声道，每帧 144 字节、24 毫秒
+MP3_FRAME = bytes([0xFF, 0xF3, 0x64, 0xC4]) + bytes(140)
+MP3_FRAME_SECONDS = 0.024
+SECONDS_PER_CHAR = 0.2  # 粤语朗读大约每秒5个字
+
+SAMPLE_TEXT = (
+    "今天我们来聊一聊城市里的生活。很多人每天早上很早就要起床，坐地铁去上班，"
+    "晚上回到家已经很累了，但是他们还是会找时间看看书，和家人说说话。"
+    "这个城市的节奏虽然很快，但是大家都在努力地生活，没有人想放弃自己的梦想。\n"
+)
+
+
+class StubError(Exception):
+    """桩引擎按错误率注入的失败"""
+
+
+class LatencyModel:
+    """延迟分布和错误率"""
+
+    def __init__(self, kind: str, params: Tuple[float, ...], error_rate: float = 0.0, seed: Optional[int] = None):
+        if kind not in ("fixed", "uniform", "lognormal"):
+            raise ValueError(f"未知的延迟分布: {kind}")
+        self.kind = kind
+        self.params = params
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+
+    @classmethod
+    def parse(cls, spec: str, seed: Optional[int] = None) -> "LatencyModel":
+        """解析 'lognormal:0.8:0.4@0.05' 形式的描述"""
+        spec, _, error_rate = spec.partition("@")
+        kind, *params = spec.split(":")
+        expected = {"fixed": 1, "uniform": 2, "lognormal": 2}.get(kind)
+        if expected is None or len(params) != expected:
+            raise ValueError(f"无效的延迟分布: {spec}")
+        return cls(kind, tuple(float(p) for p in params), float(error_rate or 0), seed)
+
+    def sample(self) -> float:
+        if self.kind == "fixed":
+            return self.params[0]
+        if self.kind == "uniform":
+            return self.random.uniform(*self.params)
+        median, sigma = self.params
+        return self.random.lognormvariate(math.log(median), sigma) if median > 0 else 0.0
+
+    def fails(self) -> bool:
+        return self.random.random() < self.error_rate
+
+    async def wait(self, name: str):
+        """等待一次采样的延迟，按错误率抛出异常"""
+        await asyncio.sleep(self.sample())
+        if self.fails():
+            raise StubError(f"{name}: injected failure")
+
+
+class StubTTSEngine:
+    """桩 TTS 引擎：与 EdgeEngine/GoogleEngine 接口相同，按文本长度返回有效的 MP3 帧"""
+
+    def __init__(self, name: str, latency: LatencyModel):
+        self.name = name
+        self.latency = latency
+        self.calls = 0
+
+    def voice_for(self, voice: str) -> str:
+        return voice
+
+    async def synthesize(self, text: str, voice: str) -> bytes:
+        self.calls += 1
+        await self.latency.wait(f"tts:{self.name}")
+        frames = max(1, int(len(text) * SECONDS_PER_CHAR / MP3_FRAME_SECONDS))
+        return MP3_FRAME * frames
+
+
+class StubTranslator:
+    """桩翻译：替换 TranslationEngine._complete，做简单的普通话→粤语字词替换"""
+
+    REPLACEMENTS = [("我们", "我哋"), ("他们", "佢哋"), ("没有", "冇"), ("这个", "呢个"), ("的", "嘅"), ("是", "係")]
+
+    def __init__(self, latency: LatencyModel):
+        self.latency = latency
+        self.calls = 0
+
+    async def __call__(self, text: str) -> str:
+        self.calls += 1
+        await self.latency.wait("translation")
+        for mandarin, cantonese in self.REPLACEMENTS:
+            text = text.replace(mandarin, cantonese)
+        return text
+
+
+def percentile(values: List[float], p: float) -> float:
+    """最近秩法百分位"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(p / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def peak_rss_mb() -> float:
+    """进程峰值常驻内存（Linux 上 ru_maxrss 单位为 KB，macOS 上为字节）"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def make_text(chars: int, variant: int) -> str:
+    """构造指定长度的普通话文本，variant 不同时文本不同（避免命中缓存）"""
+    prefix = f"第{variant}期节目。"
+    body = SAMPLE_TEXT * (chars // len(SAMPLE_TEXT) + 1)
+    return (prefix + body)[:max(chars, len(prefix))]
+
+
+def setup_environment(workdir: str):
+    """在导入应用之前把数据库、存储和 API key 指向本地"""
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    os.environ["STORAGE_TYPE"] = "local"
+    os.environ["LOCAL_STORAGE_PATH"] = os.path.join(workdir, "static")
+    os.environ.setdefault("OPENAI_API_KEY", "bench")
+    os.environ.pop("PROMETHEUS_MULTIPROC_DIR", None)
+    os.chdir(workdir)  # 临时音频和本地存储写入 static/
+
+
+def install_stubs(tts_engines: List[StubTTSEngine], translator: StubTranslator):
+    """把 Redis、TTS 引擎和翻译调用替换为进程内的桩实现"""
+    import fakeredis
+
+    from app.services.cache_service import cache_service
+    from app.services.translation_engine import translation_engine
+    from app.services.tts_engine_router import EngineStats, tts_engine_router
+
+    names = [engine.name for engine in tts_engines]
+    if len(set(names)) != len(names):
+        raise ValueError(f"TTS 引擎名称重复: {names}")
+
+    cache_service.redis_client = fakeredis.FakeRedis()
+    tts_engine_router.engines = list(tts_engines)
+    tts_engine_router.stats = {engine.name: EngineStats(engine.name) for engine in tts_engines}
+    translation_engine._complete = translator
+
+
+def create_users(count: int, plan: str) -> List[str]:
+    from app.core.database import SessionLocal, init_db
+    from app.models.user import User
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        init_db()
+    emails = [f"bench-user-{i}@example.com" for i in range(count)]
+    db = SessionLocal()
+    try:
+        db.add_all([User(email=email, is_verified=True, subscription_plan=plan) for email in emails])
+        db.commit()
+    finally:
+        db.close()
+    return emails
+
+
+async def run_user(email: str, texts: List[str], voice: str, latencies: List[float], errors: Dict[str, int]):
+    """单个用户依次提交生成请求（与路由相同：每个请求一个数据库会话）"""
+    from fastapi import HTTPException
+
+    from app.core.database import SessionLocal
+    from app.routers.podcast import PodcastGenerateRequest, generate_podcast
+
+    for text in texts:
+        request = PodcastGenerateRequest(text=text, voice=voice, user_email=email, language="cantonese")
+        db = SessionLocal()
+        started = time.perf_counter()
+        try:
+            await generate_podcast(request, db)
+            latencies.append(time.perf_counter() - started)
+        except HTTPException as e:
+            key = f"HTTP {e.status_code}"
+            errors[key] = errors.get(key, 0) + 1
+        except Exception as e:
+            key = type(e).__name__
+            errors[key] = errors.get(key, 0) + 1
+        finally:
+            db.close()
+
+
+def stage_summary() -> Dict[str, Tuple[int, float]]:
+    """从 Prometheus 指标中读取各阶段的次数和平均耗时"""
+    from app.core.metrics import GENERATION_STAGE_SECONDS
+
+    sums: Dict[str, float] = {}
+    counts: Dict[str, int] = {}
+    for metric in GENERATION_STAGE_SECONDS.collect():
+        for sample in metric.samples:
+            stage = sample.labels.get("stage")
+            if sample.name.endswith("_sum"):
+                sums[stage] = sample.value
+            elif sample.name.endswith("_count"):
+                counts[stage] = int(sample.value)
+    return {stage: (count, sums.get(stage, 0.0) / count) for stage, count in counts.items() if count}
+
+
+async def run_benchmark(args, tts_engines: List[StubTTSEngine], translator: StubTranslator) -> Dict:
+    from app.routers.podcast import VOICE_MAPPING
+    from app.services.single_flight import single_flight
+
+    emails = create_users(args.users, args.plan)
+    voice = next(iter(VOICE_MAPPING))
+    variants = args.shared_texts or args.users * args.requests
+    plans = [
+        [make_text(args.chars, (u * args.requests + r) % variants) for r in range(args.requests)]
+        for u in range(args.users)
+    ]
+
+    latencies: List[float] = []
+    errors: Dict[str, int] = {}
+    rss_before = peak_rss_mb()
+    output = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+    started = time.perf_counter()
+    with output:
+        await asyncio.gather(*[
+            run_user(email, texts, voice, latencies, errors) for email, texts in zip(emails, plans)
+        ])
+    elapsed = time.perf_counter() - started
+
+    return {
+        "requests": args.users * args.requests,
+        "succeeded": len(latencies),
+        "errors": errors,
+        "elapsed": elapsed,
+        "throughput": len(latencies) / elapsed if elapsed > 0 else 0.0,
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+        "p99": percentile(latencies, 99),
+        "max": max(latencies, default=0.0),
+        "rss_before_mb": rss_before,
+        "peak_rss_mb": peak_rss_mb(),
+        "tts_calls": {engine.name: engine.calls for engine in tts_engines},
+        "translation_calls": translator.calls,
+        "single_flight": single_flight.stats(),
+        "stages": stage_summary(),
+    }
+
+
+def print_report(args, result: Dict):
+    print(f"users: {args.users} x {args.requests} requests, {args.chars} chars, plan={args.plan}")
+    print(f"succeeded: {result['succeeded']}/{result['requests']} in {result['elapsed']:.2f}s")
+    if result["errors"]:
+        print(f"errors: {', '.join(f'{k}={v}' for k, v in sorted(result['errors'].items()))}")
+    print(f"throughput: {result['throughput']:.2f} req/s")
+    print(f"latency p50/p95/p99/max: {result['p50']:.3f} / {result['p95']:.3f} / "
+          f"{result['p99']:.3f} / {result['max']:.3f} s")
+    print(f"peak RSS: {result['peak_rss_mb']:.1f} MB (before run {result['rss_before_mb']:.1f} MB)")
+    print(f"tts calls: {result['tts_calls']}, translation calls: {result['translation_calls']}")
+    print(f"single flight: {result['single_flight']}")
+    for stage, (count, mean) in sorted(result["stages"].items()):
+        print(f"  stage {stage:<22} n={count:<5} mean={mean * 1000:.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline load benchmark for podcast generation")
+    parser.add_argument("--users", type=int, default=20, help="并发用户数")
+    parser.add_argument("--requests", type=int, default=3, help="每个用户依次提交的请求数")
+    parser.add_argument("--chars", type=int, default=800, help="每个请求的文本长度（超过粤语规则转换上限时走 GPT 翻译）")
+    parser.add_argument("--shared-texts", type=int, default=0, help="不同文本的数量（0 表示每个请求的文本都不同）")
+    parser.add_argument("--plan", default="enterprise", choices=["free", "pro", "enterprise"], help="用户的订阅套餐")
+    parser.add_argument("--tts", action="append", metavar="NAME=DIST",
+                        help="桩 TTS 引擎（按优先级，可重复），默认 edge=lognormal:0.8:0.4@0.02 和 google=lognormal:1.5:0.3")
+    parser.add_argument("--translation", default="lognormal:0.5:0.3@0.01", help="桩翻译单个分段的延迟分布")
+    parser.add_argument("--seed", type=int, default=42, help="随机种子")
+    parser.add_argument("--verbose", action="store_true", help="显示生成流程的日志输出")
+    args = parser.parse_args()
+
+    tts_specs = args.tts or ["edge=lognormal:0.8:0.4@0.02", "google=lognormal:1.5:0.3"]
+    tts_engines = []
+    for i, spec in enumerate(tts_specs):
+        name, _, dist = spec.partition("=")
+        tts_engines.append(StubTTSEngine(name, LatencyModel.parse(dist, args.seed + i)))
+    translator = StubTranslator(LatencyModel.parse(args.translation, args.seed + len(tts_specs)))
+
+    workdir = tempfile.mkdtemp(prefix="longan-bench-")
+    try:
+        setup_environment(workdir)
+        install_stubs(tts_engines, translator)
+        result = asyncio.run(run_benchmark(args, tts_engines, translator))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    print_report(args, result)
+
+
+if __name__ == "__main__":
+    main()
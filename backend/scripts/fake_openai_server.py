@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+本地 OpenAI 模拟服务
+实现 /v1/chat/completions 接口，把提示词中的原文做简单的普通话→粤语替换后返回，
+用于在没有网络和 API key 的情况下测试翻译引擎。
+
+用法:
+    python scripts/fake_openai_server.py --port 8765 --latency 0.5
+    OPENAI_API_BASE=http://127.0.0.1:8765/v1 OPENAI_API_KEY=fake uvicorn main:app
+"""
+
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# 常见普通话→粤语字词替换
+REPLACEMENTS = [
+    ("我们", "我哋"), ("你们", "你哋"), ("他们", "佢哋"), ("什么", "乜嘢"),
+    ("没有", "冇"), ("这个", "呢个"), ("那个", "嗰个"), ("的", "嘅"),
+    ("是", "係"), ("不", "唔"), ("在", "喺"), ("了", "咗"), ("他", "佢"), ("她", "佢"),
+]
+
+_SOURCE_RE = re.compile(r"原文：(.*?)\n\n要求：", re.S)
+
+
+def fake_translate(prompt: str) -> str:
+    """取出提示词中的原文并做字词替换"""
+    match = _SOURCE_RE.search(prompt)
+    text = match.group(1) if match else prompt
+    for mandarin, cantonese in REPLACEMENTS:
+        text = text.replace(mandarin, cantonese)
+    return text
+
+
+class FakeOpenAIHandler(BaseHTTPRequestHandler):
+    latency = 0.0
+    fail_rate = 0.0
+    requests_served = 0
+    _lock = threading.Lock()
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status: int, payload: dict):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": "not found", "type": "invalid_request_error"}})
+            return
+
+        length = int(self.headers.get("Content-Length", 0))
+        payload = json.loads(self.rfile.read(length) or b"{}")
+        with self._lock:
+            FakeOpenAIHandler.requests_served += 1
+
+        if self.latency:
+            time.sleep(self.latency)
+        if self.fail_rate and random.random() < self.fail_rate:
+            self._send_json(500, {"error": {"message": "simulated failure", "type": "server_error"}})
+            return
+
+        prompt = payload.get("messages", [{}])[-1].get("content", "")
+        content = fake_translate(prompt)
+        self._send_json(200, {
+            "id": f"chatcmpl-{uuid.uuid4().hex}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": payload.get("model", "gpt-4"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop"
+            }],
+            "usage": {"prompt_tokens": len(prompt), "completion_tokens": len(content), "total_tokens": len(prompt) + len(content)}
+        })
+
+
+def start_server(host: str = "127.0.0.1", port: int = 0, latency: float = 0.0, fail_rate: float = 0.0) -> ThreadingHTTPServer:
+    """在后台线程启动模拟服务，port 为0时自动分配端口（server.server_address[1]）"""
+    handler = type("Handler", (FakeOpenAIHandler,), {"latency": latency, "fail_rate": fail_rate})
+    server = ThreadingHTTPServer((host, port), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="本地 OpenAI 模拟服务")
+    parser.add_argument("--host", default="127.0.0.1", help="监听地址")
+    parser.add_argument("--port", type=int, default=8765, help="监听端口")
+    parser.add_argument("--latency", type=float, default=0.0, help="每个请求的模拟延迟（秒）")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="模拟失败的请求比例")
+
+    args = parser.parse_args()
+
+    handler = type("Handler", (FakeOpenAIHandler,), {"latency": args.latency, "fail_rate": args.fail_rate})
+    server = ThreadingHTTPServer((args.host, args.port), handler)
+    print(f"🤖 Fake OpenAI server listening on http://{args.host}:{args.port}/v1")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,48 @@
+import asyncio
+
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+
+from app.services.audio_cache import audio_cache
+from app.services.cache_service import cache_service
+from app.services.edge_tts_service import edge_tts_service
+
+
+@pytest.fixture(autouse=True)
+def local_cache(monkeypatch, tmp_path):
+    """Run the cache against an in-memory Redis and local storage in a temp directory"""
+    monkeypatch.setattr(cache_service, "redis_client", fakeredis.FakeRedis())
+    monkeypatch.setattr(audio_cache, "enabled", True)
+    monkeypatch.setattr(edge_tts_service, "segment_cache_enabled", True)
+    monkeypatch.chdir(tmp_path)
+
+
+def test_put_nowait_writes_in_background():
+    """Test put_nowait returns immediately and drain waits for the write"""
+    key = audio_cache.make_key("你好", "voice", "edge")
+
+    async def run():
+        audio_cache.put_nowait(key, b"audio", engine="edge")
+        assert audio_cache.lookup(key) is None
+        await audio_cache.drain()
+        return await audio_cache.get_audio(key)
+
+    assert asyncio.run(run()) == b"audio"
+
+
+def test_segments_cached_requires_every_segment(monkeypatch):
+    """Test the full-audio put is skipped only when every segment is already cached"""
+    monkeypatch.setattr(edge_tts_service, "max_chunk_chars", 4)
+    voice = "zh-HK-HiuGaaiNeural"
+    chunks = ["第一句。", "第二句。"]
+    text = "".join(chunks)
+    keys = [audio_cache.make_key(chunk, voice, edge_tts_service.SEGMENT_ENGINE) for chunk in chunks]
+
+    async def put(key):
+        await audio_cache.put(key, b"audio")
+
+    asyncio.run(put(keys[0]))
+    assert not edge_tts_service.segments_cached(text, voice)
+    asyncio.run(put(keys[1]))
+    assert edge_tts_service.segments_cached(text, voice)
@@ -0,0 +1,193 @@
+import json
+
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import app.models.notification  # noqa: F401  register models Podcast relates to
+import app.models.social  # noqa: F401
+import app.models.user  # noqa: F401
+from app.core.config import settings
+from app.models.podcast import Podcast
+from app.models.series import PodcastSeries
+from app.services.cache_service import cache_service
+from app.services.generation_admission import AdmissionTimeout
+from app.tasks import batch_tasks
+from app.tasks.batch_tasks import (
+    _batch_key,
+    _update_item,
+    dispatch_next,
+    enqueue_batch_job,
+    generate_batch_item_task,
+    get_batch_status,
+    renumber_series,
+)
+
+
+class FakeSession:
+    """Stands in for a database session when the episode has no series"""
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def redis(monkeypatch):
+    client = fakeredis.FakeRedis()
+    monkeypatch.setattr(cache_service, "redis_client", client)
+    return client
+
+
+@pytest.fixture
+def dispatched(monkeypatch, redis):
+    """Record the items sent to the worker pool instead of publishing them"""
+    calls = []
+    monkeypatch.setattr(
+        generate_batch_item_task, "apply_async", lambda args: calls.append(args[1]["index"])
+    )
+    return calls
+
+
+def payloads(count: int):
+    return [{"text": f"第{i + 1}集内容", "title": f"第{i + 1}集", "user_email": "user@example.com"}
+            for i in range(count)]
+
+
+def test_enqueue_caps_parallelism(monkeypatch, dispatched, redis):
+    """Test only BATCH_PARALLELISM episodes are dispatched up front and the rest wait"""
+    monkeypatch.setattr(settings, "BATCH_PARALLELISM", 2)
+    batch_id = enqueue_batch_job("user@example.com", payloads(5))
+    assert dispatched == [0, 1]
+    assert redis.llen(_batch_key(batch_id, "pending")) == 3
+
+
+def test_enqueue_small_batch(monkeypatch, dispatched):
+    """Test a batch smaller than the parallelism dispatches every episode once"""
+    monkeypatch.setattr(settings, "BATCH_PARALLELISM", 4)
+    enqueue_batch_job("user@example.com", payloads(2))
+    assert dispatched == [0, 1]
+
+
+def test_dispatch_next_in_order_until_empty(monkeypatch, dispatched):
+    """Test waiting episodes are dispatched in order and an empty queue dispatches nothing"""
+    monkeypatch.setattr(settings, "BATCH_PARALLELISM", 1)
+    batch_id = enqueue_batch_job("user@example.com", payloads(3))
+    assert dispatch_next(batch_id) is True
+    assert dispatch_next(batch_id) is True
+    assert dispatch_next(batch_id) is False
+    assert dispatched == [0, 1, 2]
+
+
+def test_batch_status_aggregation(monkeypatch, dispatched):
+    """Test overall status, counts and progress follow the episodes"""
+    monkeypatch.setattr(settings, "BATCH_PARALLELISM", 1)
+    batch_id = enqueue_batch_job("user@example.com", payloads(4), series_id=7)
+
+    status = get_batch_status(batch_id)
+    assert (status["status"], status["queued"], status["progress"]) == ("queued", 4, 0)
+    assert status["seriesId"] == 7
+    assert [item["title"] for item in status["items"]] == ["第1集", "第2集", "第3集", "第4集"]
+
+    _update_item(batch_id, 0, status="running", stage="synthesizing", progress=50)
+    status = get_batch_status(batch_id)
+    assert (status["status"], status["running"], status["queued"]) == ("running", 1, 3)
+    assert status["progress"] == 12
+
+    _update_item(batch_id, 0, status="completed", progress=100)
+    _update_item(batch_id, 1, status="failed", error={"status_code": 500})
+    status = get_batch_status(batch_id)
+    # Failed episodes count as finished for overall progress
+    assert (status["status"], status["completed"], status["failed"]) == ("running", 1, 1)
+    assert status["progress"] == 50
+
+    _update_item(batch_id, 2, status="completed", progress=100)
+    _update_item(batch_id, 3, status="completed", progress=100)
+    status = get_batch_status(batch_id)
+    assert (status["status"], status["progress"]) == ("partial", 100)
+
+
+def test_batch_status_all_failed_and_missing(monkeypatch, dispatched):
+    """Test a batch where every episode failed is failed and unknown batches return None"""
+    batch_id = enqueue_batch_job("user@example.com", payloads(2))
+    for index in range(2):
+        _update_item(batch_id, index, status="failed")
+    assert get_batch_status(batch_id)["status"] == "failed"
+    assert get_batch_status("missing") is None
+
+
+def test_renumber_series_skips_failed_episodes(monkeypatch, dispatched, redis, tmp_path):
+    """Test episode numbers follow the original order without gaps for failed episodes"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'batch.db'}")
+    PodcastSeries.__table__.create(engine)
+    Podcast.__table__.create(engine)
+    db = sessionmaker(bind=engine)()
+    series = PodcastSeries(title="系列", user_email="user@example.com", episode_count=0)
+    db.add(series)
+    db.commit()
+    podcasts = [Podcast(title=f"第{i + 1}集", content="内容", voice="young-lady", user_email="user@example.com")
+                for i in range(3)]
+    db.add_all(podcasts)
+    db.commit()
+
+    batch_id = enqueue_batch_job("user@example.com", payloads(4), series_id=series.id)
+    # Episodes finish out of order and the second one fails
+    _update_item(batch_id, 3, status="completed", podcastId=podcasts[2].id)
+    assert renumber_series(db, batch_id, series.id) == 1
+    _update_item(batch_id, 1, status="failed")
+    _update_item(batch_id, 0, status="completed", podcastId=podcasts[0].id)
+    _update_item(batch_id, 2, status="completed", podcastId=podcasts[1].id)
+    assert renumber_series(db, batch_id, series.id) == 3
+
+    db.expire_all()
+    numbers = {podcast.id: (podcast.series_id, podcast.episode_number) for podcast in db.query(Podcast)}
+    assert numbers == {
+        podcasts[0].id: (series.id, 1),
+        podcasts[1].id: (series.id, 2),
+        podcasts[2].id: (series.id, 3),
+    }
+    assert db.get(PodcastSeries, series.id).episode_count == 3
+    db.close()
+
+
+def test_admission_timeout_retries_instead_of_failing(monkeypatch, dispatched, redis):
+    """Test an episode that times out waiting for a slot is retried and does not dispatch the next one"""
+    monkeypatch.setattr(settings, "BATCH_PARALLELISM", 1)
+    monkeypatch.setattr(batch_tasks, "SessionLocal", lambda: FakeSession())
+    attempts = []
+
+    def run_generation(request, db, on_progress):
+        attempts.append(request.title)
+        if len(attempts) < 3:
+            raise AdmissionTimeout()
+        return {"id": 1, "title": request.title, "audioUrl": "/static/a.mp3", "duration": "00:00:01"}
+
+    monkeypatch.setattr(batch_tasks, "run_generation", run_generation)
+    batch_id = enqueue_batch_job("user@example.com", payloads(2))
+    item = json.loads(redis.lpop(_batch_key(batch_id, "pending")))
+    dispatched.clear()
+
+    generate_batch_item_task.apply(args=[batch_id, item])
+    assert attempts == ["第2集"] * 3
+    assert get_batch_status(batch_id)["items"][1]["status"] == "completed"
+    # Only the attempt that finished dispatches the next episode
+    assert dispatched == []
+    assert redis.llen(_batch_key(batch_id, "pending")) == 0
+
+
+def test_admission_timeout_fails_after_retries(monkeypatch, dispatched, redis):
+    """Test an episode that never gets a slot is failed once the retries run out"""
+    monkeypatch.setattr(settings, "BATCH_ADMISSION_RETRIES", 1)
+    monkeypatch.setattr(batch_tasks, "SessionLocal", lambda: FakeSession())
+
+    def run_generation(request, db, on_progress):
+        raise AdmissionTimeout()
+
+    monkeypatch.setattr(batch_tasks, "run_generation", run_generation)
+    batch_id = enqueue_batch_job("user@example.com", payloads(1))
+    generate_batch_item_task.apply(args=[batch_id, {"index": 0, "request": payloads(1)[0], "series_id": None}])
+    item = get_batch_status(batch_id)["items"][0]
+    assert item["status"] == "failed"
+    assert item["error"]["status_code"] == 503
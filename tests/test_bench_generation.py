@@ -0,0 +1,39 @@
+import asyncio
+
+import pytest
+
+from app.utils.mp3_info import scan_mp3
+from scripts.bench_generation import LatencyModel, StubError, StubTTSEngine, percentile
+
+def test_latency_spec_parsing():
+    """Test latency distribution specs with optional error rates"""
+    model = LatencyModel.parse("lognormal:0.8:0.4@0.05", seed=1)
+    assert model.kind == "lognormal"
+    assert model.params == (0.8, 0.4)
+    assert model.error_rate == 0.05
+    assert LatencyModel.parse("fixed:0.5").sample() == 0.5
+    assert 1.0 <= LatencyModel.parse("uniform:1:2").sample() <= 2.0
+    with pytest.raises(ValueError):
+        LatencyModel.parse("uniform:1")
+
+def test_percentile_nearest_rank():
+    """Test percentiles use the nearest-rank method"""
+    values = [float(i) for i in range(1, 101)]
+    assert percentile(values, 50) == 50.0
+    assert percentile(values, 99) == 99.0
+    assert percentile([], 95) == 0.0
+
+def test_stub_engine_returns_passthrough_mp3():
+    """Test the stub TTS engine returns valid MP3 frames sized by text length"""
+    engine = StubTTSEngine("edge", LatencyModel.parse("fixed:0"))
+    audio = asyncio.run(engine.synthesize("一" * 100, "zh-HK-HiuGaaiNeural"))
+    info = scan_mp3(audio)
+    assert info["sample_rate"] == 24000
+    assert info["channels"] == 1
+    assert abs(info["duration"] - 20.0) < 0.1
+
+def test_stub_engine_injects_failures():
+    """Test the stub TTS engine fails at the configured error rate"""
+    engine = StubTTSEngine("edge", LatencyModel.parse("fixed:0@1"))
+    with pytest.raises(StubError):
+        asyncio.run(engine.synthesize("你好", "zh-HK-HiuGaaiNeural"))
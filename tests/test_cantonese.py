@@ -0,0 +1,68 @@
+import pytest
+
+from app.services.podcast_generation import podcast_generation_service
+from app.utils.cantonese import CantoneseConverter, cantonese_converter, has_cantonese_indicators, is_cantonese
+
+def test_common_substitutions():
+    """Test common Mandarin words are replaced with high confidence"""
+    converted, confidence = cantonese_converter.convert("我们今天没有时间，这是他的东西。")
+    assert converted == "我哋今日冇时间，呢係佢嘅嘢。"
+    assert confidence == 1.0
+
+def test_longest_match_wins():
+    """Test longer phrases take priority and protected words are kept"""
+    assert cantonese_converter.convert("为什么")[0] == "點解"
+    assert cantonese_converter.convert("未来")[0] == "未来"
+    assert cantonese_converter.convert("不是")[0] == "唔係"
+
+def test_residual_mandarin_lowers_confidence():
+    """Test Mandarin markers left after conversion lower the confidence"""
+    _, confidence = cantonese_converter.convert("你把书放在桌子上吗")
+    assert confidence < 0.8
+
+def test_custom_table():
+    """Test a converter can be built from a custom phrase table"""
+    converter = CantoneseConverter({"甲": "乙"})
+    assert converter.convert("甲，") == ("乙，", 1.0)
+
+def test_cantonese_markers():
+    """Test marker helpers detect Cantonese text"""
+    assert is_cantonese("佢去咗邊度")
+    assert not is_cantonese("他去了哪里")
+    assert has_cantonese_indicators("唔該")
+    assert not has_cantonese_indicators("")
+
+def test_compounds_are_not_split():
+    """Test single-character rules do not rewrite the inside of common compounds"""
+    assert cantonese_converter.convert("我在线上弹吉他。")[0] == "我在线上弹吉他。"
+    assert cantonese_converter.convert("坐的士")[0] == "坐的士"
+    assert cantonese_converter.convert("我对这件事的看法")[0] == "我对呢件事嘅看法"
+    assert cantonese_converter.convert("别人")[0] == "别人"
+
+def test_single_char_next_to_unmatched_han_lowers_confidence():
+    """Test a single-character replacement between unmatched Han characters is not trusted"""
+    converter = CantoneseConverter({"他": "佢", "的": "嘅"})
+    assert converter.convert("他。") == ("佢。", 1.0)
+    assert converter.convert("吉他手")[1] < 0.8
+    assert converter.convert("坐的士")[1] < 0.8
+
+@pytest.mark.parametrize("text", ["我爱北京天安门。", "今年经济增长速度放缓，市场前景堪忧。", "我在线上弹吉他。"])
+def test_text_without_replacements_has_no_confidence(text):
+    """Test text the table cannot convert scores zero and is left to the LLM"""
+    assert cantonese_converter.convert(text)[1] == 0.0
+    assert podcast_generation_service._fast_convert(text) is None
+
+def test_unconverted_clauses_lower_confidence():
+    """Test confidence is the share of Han characters in converted clauses"""
+    _, confidence = cantonese_converter.convert("他在家，我爱北京天安门。")
+    assert confidence < 0.8
+
+def test_short_converted_sentence_takes_fast_path():
+    """Test a fully converted short sentence skips the LLM"""
+    assert podcast_generation_service._fast_convert("他是我的朋友。") == "佢係我嘅朋友。"
+
+def test_sentence_final_le_is_not_replaced():
+    """Test the completion rule does not turn a sentence-final particle into 咗"""
+    assert cantonese_converter.convert("我知道了")[0] == "我知道喇"
+    assert cantonese_converter.convert("好了")[0] == "好了"
+    assert cantonese_converter.convert("我吃了饭")[0] == "我食咗饭"
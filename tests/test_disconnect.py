@@ -0,0 +1,130 @@
+import asyncio
+
+import pytest
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.testclient import TestClient
+
+from app.utils.disconnect import CLIENT_CLOSED_REQUEST, run_until_disconnected
+
+
+class FakeRequest:
+    """A request whose client disconnects after a delay"""
+
+    method = "POST"
+
+    class url:
+        path = "/api/podcast/generate"
+
+    def __init__(self, disconnect_after: float):
+        self.disconnect_after = disconnect_after
+
+    async def receive(self):
+        await asyncio.sleep(self.disconnect_after)
+        return {"type": "http.disconnect"}
+
+
+def test_result_returned_while_connected():
+    """Test the coroutine result is returned when the client stays connected"""
+    async def work():
+        await asyncio.sleep(0.01)
+        return "done"
+
+    assert asyncio.run(run_until_disconnected(FakeRequest(1.0), work())) == "done"
+    assert asyncio.run(run_until_disconnected(None, work())) == "done"
+
+
+def test_disconnect_cancels_and_waits_for_cleanup():
+    """Test a disconnect cancels the work and waits for its cleanup to finish"""
+    events = []
+
+    async def work():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            await asyncio.sleep(0.01)
+            events.append("cleaned up")
+            raise
+
+    with pytest.raises(HTTPException) as exc_info:
+        asyncio.run(run_until_disconnected(FakeRequest(0.01), work()))
+    assert exc_info.value.status_code == CLIENT_CLOSED_REQUEST
+    assert events == ["cleaned up"]
+
+
+def test_no_false_disconnect_under_asgi():
+    """Test a connected client under a real ASGI app is not treated as disconnected"""
+    app = FastAPI()
+
+    @app.post("/work")
+    async def work_endpoint(body: dict, http_request: Request = None):
+        async def work():
+            await asyncio.sleep(0.05)
+            return {"echo": body["value"]}
+        return await run_until_disconnected(http_request, work())
+
+    response = TestClient(app).post("/work", json={"value": 3})
+    assert response.status_code == 200
+    assert response.json() == {"echo": 3}
+
+
+def test_single_flight_keeps_running_for_remaining_waiters(monkeypatch):
+    """Test one caller leaving does not cancel work another caller still waits for"""
+    fakeredis = pytest.importorskip("fakeredis")
+    from app.services.cache_service import cache_service
+    from app.services.single_flight import SingleFlight
+
+    monkeypatch.setattr(cache_service, "redis_client", fakeredis.FakeRedis())
+    flight = SingleFlight()
+    runs = []
+
+    async def produce():
+        runs.append("start")
+        await asyncio.sleep(0.05)
+        runs.append("finish")
+        return {"audio_url": "/static/a.mp3"}
+
+    async def scenario():
+        first = asyncio.ensure_future(flight.run("key", produce))
+        second = asyncio.ensure_future(flight.run("key", produce))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        result, shared = await second
+        return first.cancelled(), result, shared
+
+    first_cancelled, result, shared = asyncio.run(scenario())
+    assert first_cancelled
+    assert result == {"audio_url": "/static/a.mp3"}
+    assert shared
+    assert runs == ["start", "finish"]
+
+
+def test_single_flight_cancels_when_all_waiters_leave(monkeypatch):
+    """Test the work is cancelled once every caller has gone"""
+    fakeredis = pytest.importorskip("fakeredis")
+    from app.services.cache_service import cache_service
+    from app.services.single_flight import SingleFlight
+
+    monkeypatch.setattr(cache_service, "redis_client", fakeredis.FakeRedis())
+    flight = SingleFlight()
+    events = []
+
+    async def produce():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            events.append("cancelled")
+            raise
+
+    async def scenario():
+        caller = asyncio.ensure_future(flight.run("key", produce))
+        await asyncio.sleep(0.01)
+        caller.cancel()
+        await asyncio.gather(caller, return_exceptions=True)
+        await asyncio.sleep(0.01)
+
+    asyncio.run(scenario())
+    assert events == ["cancelled"]
+    assert flight.stats()["abandoned"] == 1
+    assert flight.stats()["in_flight"] == 0
+    # 锁已释放，下一个请求可以立即执行
+    assert cache_service.redis_client.get("single_flight:lock:key") is None
@@ -0,0 +1,116 @@
+import asyncio
+import shutil
+
+import pytest
+
+from app.services.file_optimizer import FileOptimizer
+from test_mp3_info import EDGE_FRAME, MPEG1_FRAME_LEN, MPEG1_HEADER
+
+MPEG1_FRAME = MPEG1_HEADER + b"\x00" * (MPEG1_FRAME_LEN - 4)
+# MPEG-1 Layer III, 160 kbps, 44.1 kHz, stereo (above the pass-through bitrate)
+MPEG1_160K_FRAME = bytes([0xFF, 0xFB, 0xA0, 0x00]) + b"\x00" * (522 - 4)
+# MPEG-1 Layer II, 128 kbps, 44.1 kHz, stereo
+LAYER2_FRAME = bytes([0xFF, 0xFD, 0x80, 0x00]) + b"\x00" * (417 - 4)
+# MPEG-2.5 Layer III, 32 kbps, 11.025 kHz, mono (non-standard sample rate)
+MPEG25_FRAME = bytes([0xFF, 0xE3, 0x40, 0xC4]) + b"\x00" * (208 - 4)
+
+FFMPEG_STDERR = """Input #0, mp3, from 'pipe:0':
+  Duration: 00:01:02.50, start: 0.000000, bitrate: 48 kb/s
+  Stream #0:0: Audio: mp3, 24000 Hz, mono, fltp, 48 kb/s
+out_time_us=30000000
+out_time_us=62480000
+progress=end
+"""
+
+
+@pytest.fixture
+def optimizer():
+    return FileOptimizer()
+
+
+@pytest.mark.parametrize("frame", [EDGE_FRAME, MPEG1_FRAME])
+def test_passthrough_accepts_target_profile(optimizer, frame):
+    """Test Layer III at or below 128k with a standard sample rate is passed through"""
+    info = optimizer._check_passthrough(frame * 20, "episode.mp3")
+    assert info is not None
+    assert info["passthrough"] is True
+    assert info["optimized_size"] == len(frame) * 20
+
+
+@pytest.mark.parametrize("frame", [MPEG1_160K_FRAME, LAYER2_FRAME, MPEG25_FRAME])
+def test_passthrough_rejects_other_profiles(optimizer, frame):
+    """Test higher bitrates, other layers and non-standard sample rates are re-encoded"""
+    assert optimizer._check_passthrough(frame * 20, "episode.mp3") is None
+
+
+def test_passthrough_rejects_non_mp3(optimizer):
+    """Test non-MP3 files and undecodable data are never passed through"""
+    assert optimizer._check_passthrough(EDGE_FRAME * 20, "episode.wav") is None
+    assert optimizer._check_passthrough(b"not an mp3 file at all", "episode.mp3") is None
+
+
+def test_optimize_audio_returns_input_unchanged(optimizer):
+    """Test a conforming MP3 is returned as-is without re-encoding"""
+    audio = EDGE_FRAME * 20
+    content, info = asyncio.run(optimizer.optimize_audio(audio, "episode.mp3"))
+    assert content is audio
+    assert info["pipeline"] == "passthrough"
+    assert optimizer.audio_stats == {"passthrough": 1, "reencoded": 0}
+
+
+def test_single_pass_failure_falls_back_to_pydub(optimizer, monkeypatch):
+    """Test a failing ffmpeg pipeline falls back to the pydub path"""
+    calls = []
+
+    async def single_pass(audio_content, filename, audio_config):
+        calls.append("ffmpeg")
+        raise RuntimeError("ffmpeg crashed")
+
+    def from_file(path):
+        calls.append("pydub")
+        raise RuntimeError("no decoder")
+
+    monkeypatch.setattr(optimizer, "ffmpeg_path", "/usr/bin/ffmpeg")
+    monkeypatch.setattr(optimizer, "_optimize_audio_single_pass", single_pass)
+    monkeypatch.setattr("app.services.file_optimizer.AudioSegment.from_file", from_file)
+
+    with pytest.raises(Exception, match="音频优化失败"):
+        asyncio.run(optimizer.optimize_audio(MPEG1_160K_FRAME * 20, "episode.mp3"))
+    assert calls == ["ffmpeg", "pydub"]
+    assert optimizer.audio_stats == {"passthrough": 0, "reencoded": 1}
+
+
+@pytest.mark.parametrize("profile, expected", [(None, (44100, 2, None)), ("speech", (24000, 1, "loudnorm"))])
+def test_speech_profile_is_opt_in(optimizer, monkeypatch, profile, expected):
+    """Test uploads keep the general profile and only generated podcasts get the speech profile"""
+    used = []
+
+    async def single_pass(audio_content, filename, audio_config):
+        used.append(audio_config)
+        return audio_content, {}
+
+    monkeypatch.setattr(optimizer, "ffmpeg_path", "/usr/bin/ffmpeg")
+    monkeypatch.setattr(optimizer, "_optimize_audio_single_pass", single_pass)
+    kwargs = {"audio_profile": profile} if profile else {}
+    asyncio.run(optimizer.optimize_file(MPEG1_160K_FRAME * 20, "upload.mp3", **kwargs))
+
+    config = used[0]
+    loudnorm = config["loudnorm_filter"].split("=")[0] if config["loudnorm_filter"] else None
+    assert (config["sample_rate"], config["channels"], loudnorm) == expected
+
+
+def test_ffmpeg_progress_parsing():
+    """Test durations are read from the single-pass ffmpeg stderr"""
+    assert FileOptimizer._parse_ffmpeg_duration(FFMPEG_STDERR) == 62500
+    assert FileOptimizer._parse_ffmpeg_out_time(FFMPEG_STDERR) == 62480
+    assert FileOptimizer._parse_ffmpeg_out_time("") is None
+
+
+@pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="ffmpeg is not installed")
+def test_single_pass_encodes_to_target_profile(optimizer, monkeypatch):
+    """Test the ffmpeg single-pass pipeline re-encodes to the speech profile"""
+    monkeypatch.setattr(optimizer, "ffmpeg_path", shutil.which("ffmpeg"))
+    speech = optimizer.audio_profiles["speech"]
+    _, info = asyncio.run(optimizer._optimize_audio_single_pass(MPEG1_160K_FRAME * 200, "episode.mp3", speech))
+    assert info["pipeline"] == "ffmpeg-single-pass"
+    assert info["optimized_sample_rate"] == speech["sample_rate"]
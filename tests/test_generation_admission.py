@@ -0,0 +1,201 @@
+import asyncio
+import threading
+
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+
+import app.services.generation_admission as admission_module
+from app.core.config import settings
+from app.services.cache_service import cache_service
+from app.services.generation_admission import GenerationAdmission
+
+
+class FakeClock:
+    """Replaces the time module inside generation_admission"""
+
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def time(self):
+        return self.now
+
+    def monotonic(self):
+        return self.now
+
+
+class BrokenRedis:
+    """A Redis client whose every call fails"""
+
+    def __getattr__(self, name):
+        def fail(*args, **kwargs):
+            raise ConnectionError("redis is down")
+        return fail
+
+
+@pytest.fixture
+def redis(monkeypatch):
+    client = fakeredis.FakeRedis()
+    monkeypatch.setattr(cache_service, "redis_client", client)
+    return client
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(admission_module, "time", fake)
+    return fake
+
+
+def make_admission(monkeypatch, limit: int) -> GenerationAdmission:
+    monkeypatch.setattr(settings, "MAX_CONCURRENT_GENERATIONS", limit)
+    return GenerationAdmission()
+
+
+def ticket(plan: str, name: str) -> str:
+    return f"{plan}|{name}|{name}"
+
+
+def test_plan_caps(monkeypatch, redis, clock):
+    """Test each plan stops at its share of the slots while others can still be admitted"""
+    admission = make_admission(monkeypatch, 10)
+    assert admission.plan_caps == {"free": 6, "pro": 9, "enterprise": 10}
+
+    results = [admission._try_acquire(ticket("free", f"f{i}"), "free") for i in range(7)]
+    assert results[:6] == [0] * 6
+    assert results[6] > 0
+    # The remaining slots are still open to other plans
+    assert admission._try_acquire(ticket("pro", "p"), "pro") == 0
+
+
+def test_weighted_fair_order(monkeypatch, redis, clock):
+    """Test queued requests are admitted by virtual finish time (weights 1/3/6)"""
+    admission = make_admission(monkeypatch, 1)
+    assert admission._try_acquire(ticket("free", "holder"), "free") == 0
+
+    waiters = [("free", "a"), ("free", "b"), ("pro", "c"), ("enterprise", "d")]
+    for plan, name in waiters:
+        assert admission._try_acquire(ticket(plan, name), plan) > 0
+
+    admitted = []
+    holder = ticket("free", "holder")
+    for _ in waiters:
+        admission._leave_queue(holder)
+        for plan, name in waiters:
+            if (plan, name) not in admitted and admission._try_acquire(ticket(plan, name), plan) == 0:
+                admitted.append((plan, name))
+                holder = ticket(plan, name)
+                break
+    assert admitted == [("enterprise", "d"), ("pro", "c"), ("free", "a"), ("free", "b")]
+
+
+def test_old_requests_age_ahead(monkeypatch, redis, clock):
+    """Test a free request that has waited long enough is admitted before a new enterprise request"""
+    admission = make_admission(monkeypatch, 1)
+    admission.lease_seconds = 3600
+    admission.poll_interval = 100
+    assert admission._try_acquire(ticket("free", "holder"), "free") == 0
+    assert admission._try_acquire(ticket("free", "old"), "free") > 0
+
+    clock.now += admission.service_seconds * 2
+    assert admission._try_acquire(ticket("enterprise", "new"), "enterprise") > 0
+
+    admission._leave_queue(ticket("free", "holder"))
+    assert admission._try_acquire(ticket("enterprise", "new"), "enterprise") > 0
+    assert admission._try_acquire(ticket("free", "old"), "free") == 0
+
+
+def test_expired_holder_and_dead_waiter_are_pruned(monkeypatch, redis, clock):
+    """Test a crashed holder's lease and a disconnected waiter's heartbeat expire"""
+    admission = make_admission(monkeypatch, 1)
+    assert admission._try_acquire(ticket("free", "crashed"), "free") == 0
+    assert admission._try_acquire(ticket("free", "gone"), "free") == 1
+    assert admission.stats()["queue_depth"] == 1
+
+    clock.now += admission.lease_seconds + 1
+    assert admission.stats()["queue_depth"] == 0
+    assert admission._try_acquire(ticket("free", "next"), "free") == 0
+    assert redis.zscore(admission.QUEUE_KEY, ticket("free", "gone")) is None
+
+
+def test_holder_lease_is_renewed(monkeypatch, redis):
+    """Test a holder keeps renewing its lease while it runs"""
+    admission = make_admission(monkeypatch, 1)
+    admission.lease_seconds = 0.3
+
+    async def run():
+        async with admission.slot("user@example.com", "free") as held:
+            first = redis.zscore(admission.HOLDERS_KEY, held)
+            await asyncio.sleep(0.5)
+            renewed = redis.zscore(admission.HOLDERS_KEY, held)
+        return first, renewed, redis.zcard(admission.HOLDERS_KEY)
+
+    first, renewed, remaining = asyncio.run(run())
+    assert renewed > first
+    assert remaining == 0
+
+
+def test_queue_positions_and_timeout(monkeypatch, redis):
+    """Test waiters see their queue position and time out with 503"""
+    admission = make_admission(monkeypatch, 1)
+    admission.poll_interval = 0.01
+    admission.wait_timeout = 0.2
+
+    async def run():
+        async with admission.slot("holder@example.com", "free"):
+            waiter = asyncio.ensure_future(admission.slot("waiter@example.com", "pro").__aenter__())
+            await asyncio.sleep(0.05)
+            positions = admission.stats("waiter@example.com")["queue_positions"]
+            with pytest.raises(Exception) as exc_info:
+                await waiter
+            return positions, exc_info.value
+
+    positions, error = asyncio.run(run())
+    assert positions == [1]
+    assert error.status_code == 503
+    assert redis.zcard(admission.QUEUE_KEY) == 0
+
+
+def test_local_semaphore_fallback(monkeypatch):
+    """Test the limit is still enforced in-process when Redis is unavailable"""
+    monkeypatch.setattr(cache_service, "redis_client", BrokenRedis())
+    admission = make_admission(monkeypatch, 2)
+    running = []
+    peak = []
+
+    async def work():
+        async with admission.slot("user@example.com", "free"):
+            running.append(1)
+            peak.append(len(running))
+            await asyncio.sleep(0.02)
+            running.pop()
+
+    async def run():
+        await asyncio.gather(*(work() for _ in range(6)))
+
+    asyncio.run(run())
+    assert max(peak) == 2
+    # Each event loop gets its own semaphore
+    asyncio.run(run())
+
+
+def test_release_runs_off_the_event_loop(monkeypatch, redis):
+    """Test leaving the queue does not call Redis on the event loop thread"""
+    admission = make_admission(monkeypatch, 1)
+    threads = []
+    leave_queue = admission._leave_queue
+
+    def record_thread(ticket):
+        threads.append(threading.get_ident())
+        leave_queue(ticket)
+
+    monkeypatch.setattr(admission, "_leave_queue", record_thread)
+
+    async def run():
+        async with admission.slot("user@example.com", "free"):
+            pass
+        return threading.get_ident()
+
+    loop_thread = asyncio.run(run())
+    assert threads and loop_thread not in threads
+    assert redis.zcard(admission.HOLDERS_KEY) == 0
@@ -0,0 +1,162 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import app.models.notification  # noqa: F401  register models User relates to
+import app.models.podcast  # noqa: F401
+import app.models.social  # noqa: F401
+import app.services.generation_quota as quota_module
+from app.models.user import User
+from app.services.cache_service import cache_service
+from app.services.generation_quota import GenerationQuota
+
+
+class BrokenRedis:
+    """A Redis client whose every call fails"""
+
+    def __getattr__(self, name):
+        def fail(*args, **kwargs):
+            raise ConnectionError("redis is down")
+        return fail
+
+
+class FakeClock:
+    """Replaces the time module inside generation_quota so leases can expire"""
+
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def quota(monkeypatch):
+    monkeypatch.setattr(cache_service, "redis_client", fakeredis.FakeRedis())
+    return GenerationQuota()
+
+
+def make_user(email="user@example.com", used=0):
+    return User(email=email, monthly_generation_count=used, last_generation_reset=datetime.utcnow())
+
+
+@pytest.fixture
+def users_db(monkeypatch, tmp_path):
+    """A SQLite users table holding one user, used by the quota module's SessionLocal"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'quota.db'}")
+    User.__table__.create(engine)
+    session_factory = sessionmaker(bind=engine)
+    monkeypatch.setattr(quota_module, "SessionLocal", session_factory)
+    db = session_factory()
+    db.add(User(email="user@example.com", monthly_generation_count=1, last_generation_reset=datetime.utcnow()))
+    db.commit()
+    db.close()
+    return session_factory
+
+
+def load_user(session_factory):
+    db = session_factory()
+    user = db.query(User).filter(User.email == "user@example.com").first()
+    db.expunge(user)
+    db.close()
+    return user
+
+
+def test_limit_boundary(quota):
+    """Test the last unit of quota can be reserved and the next one is refused"""
+    user = make_user(used=2)
+    assert quota.reserve(user, limit=3) is not None
+    assert quota.usage(user) == 3
+    assert quota.reserve(user, limit=3) is None
+    # -1 means unlimited
+    assert quota.reserve(user, limit=-1) is not None
+
+
+def test_seed_ignores_previous_month(quota):
+    """Test a count from an earlier month does not count against this month"""
+    user = User(email="user@example.com", monthly_generation_count=5, last_generation_reset=datetime(2000, 1, 1))
+    assert quota.reserve(user, limit=1) is not None
+
+
+def test_concurrent_reservations_respect_limit(quota):
+    """Test concurrent reservations never exceed the limit"""
+    user = make_user()
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(lambda _: quota.reserve(user, limit=5), range(40)))
+    assert sum(1 for result in results if result is not None) == 5
+    assert quota.usage(user) == 5
+
+
+def test_release_and_expired_lease_free_quota(quota, monkeypatch):
+    """Test released and expired reservations no longer hold quota"""
+    clock = FakeClock()
+    monkeypatch.setattr(quota_module, "time", clock)
+    user = make_user()
+
+    reservation = quota.reserve(user, limit=1)
+    assert quota.reserve(user, limit=1) is None
+    quota.release(reservation)
+    assert quota.reserve(user, limit=1) is not None
+
+    # A reservation whose holder crashed is reclaimed once its lease expires
+    assert quota.reserve(user, limit=1) is None
+    clock.now += quota.lease_seconds + 1
+    assert quota.usage(user) == 0
+    assert quota.reserve(user, limit=1) is not None
+
+
+def test_commit_and_flush(quota, users_db):
+    """Test committed usage persists in Redis and is flushed to the users table"""
+    session_factory = users_db
+    user = load_user(session_factory)
+
+    reservation = quota.reserve(user, limit=3)
+    assert quota.commit(reservation) == 2
+    assert quota.usage(user) == 2
+    # Dirty markers from an earlier month are not flushed
+    quota.redis.sadd(quota.DIRTY_KEY, "200001:user@example.com")
+
+    assert quota.flush() == 1
+    assert quota.redis.scard(quota.DIRTY_KEY) == 0
+    db = session_factory()
+    assert db.query(User.monthly_generation_count).filter(User.email == "user@example.com").scalar() == 2
+    db.close()
+    assert quota.flush() == 0
+
+
+def test_redis_outage_meters_in_database(monkeypatch, users_db):
+    """Test generations are counted in the users table while Redis is down"""
+    monkeypatch.setattr(cache_service, "redis_client", BrokenRedis())
+    quota = GenerationQuota()
+
+    reservation = quota.reserve(load_user(users_db), limit=3)
+    assert reservation.reservation_id is None
+    assert quota.commit(reservation) == 2
+    assert quota.commit(quota.reserve(load_user(users_db), limit=3)) == 3
+    # The limit check sees the database count, not a stale seed
+    assert quota.reserve(load_user(users_db), limit=3) is None
+
+
+def test_commit_script_failure_falls_back_to_database(quota, monkeypatch, users_db):
+    """Test a commit that fails in Redis is written to the database and Redis catches up later"""
+    reservation = quota.reserve(load_user(users_db), limit=5)
+    redis = quota.redis
+    monkeypatch.setattr(cache_service, "redis_client", BrokenRedis())
+    quota._commit_script = None
+    assert quota.commit(reservation) == 2
+
+    monkeypatch.setattr(cache_service, "redis_client", redis)
+    quota._reserve_script = None
+    user = load_user(users_db)
+    assert user.monthly_generation_count == 2
+    # The stale Redis counter is raised to the database count on the next reservation;
+    # the first reservation is held until its lease expires
+    assert quota.reserve(user, limit=5) is not None
+    assert quota.redis.get(quota._key(reservation.month, user.email, "used")) == b"2"
+    assert quota.usage(user) == 4
@@ -0,0 +1,60 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import app.models.notification  # noqa: F401  register models User relates to
+import app.models.social  # noqa: F401
+import app.routers.podcast as podcast_router
+from app.core.security import get_current_user
+from app.models.user import User
+
+OWNER = "owner@example.com"
+
+
+@pytest.fixture
+def caller():
+    return {"user": User(email=OWNER, is_admin=False)}
+
+
+@pytest.fixture
+def client(monkeypatch, caller):
+    monkeypatch.setattr(
+        podcast_router, "get_job_status",
+        lambda job_id: {"jobId": job_id, "userEmail": OWNER, "status": "completed"} if job_id == "job" else None
+    )
+    monkeypatch.setattr(
+        podcast_router, "get_batch_status",
+        lambda batch_id: {"batchId": batch_id, "userEmail": OWNER, "status": "running"} if batch_id == "job" else None
+    )
+    app = FastAPI()
+    app.include_router(podcast_router.router, prefix="/api/podcast")
+    app.dependency_overrides[get_current_user] = lambda: caller["user"]
+    return TestClient(app)
+
+
+ENDPOINTS = ["/api/podcast/jobs", "/api/podcast/batches"]
+
+
+@pytest.mark.parametrize("endpoint", ENDPOINTS)
+def test_job_visible_to_owner(client, endpoint):
+    """Test the submitter can read their job"""
+    response = client.get(f"{endpoint}/job")
+    assert response.status_code == 200
+    assert response.json()["userEmail"] == OWNER
+
+
+@pytest.mark.parametrize("endpoint", ENDPOINTS)
+@pytest.mark.parametrize("is_admin, expected", [(False, 404), (True, 200)])
+def test_job_hidden_from_other_users(client, caller, endpoint, is_admin, expected):
+    """Test other users get the same 404 as a missing job, while admins can read it"""
+    caller["user"] = User(email="other@example.com", is_admin=is_admin)
+    assert client.get(f"{endpoint}/job").status_code == expected
+    assert client.get(f"{endpoint}/missing").status_code == 404
+
+
+@pytest.mark.parametrize("endpoint", ENDPOINTS)
+def test_job_requires_token(endpoint):
+    """Test the job endpoints reject requests without a bearer token"""
+    app = FastAPI()
+    app.include_router(podcast_router.router, prefix="/api/podcast")
+    assert TestClient(app).get(f"{endpoint}/job").status_code == 403
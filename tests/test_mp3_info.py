@@ -0,0 +1,55 @@
+import struct
+
+import pytest
+
+from app.utils.mp3_info import scan_mp3, scan_mp3_file
+
+# MPEG-2 Layer III, 48 kbps, 24 kHz, mono (the Edge TTS output format)
+EDGE_HEADER = bytes([0xFF, 0xF3, 0x64, 0xC4])
+EDGE_FRAME = EDGE_HEADER + b"\x00" * (144 - 4)
+
+# MPEG-1 Layer III, 128 kbps, 44.1 kHz, stereo
+MPEG1_HEADER = bytes([0xFF, 0xFB, 0x90, 0x00])
+MPEG1_FRAME_LEN = 417
+
+
+def test_cbr_stream_duration():
+    """A plain CBR frame stream is measured from its size and bitrate."""
+    info = scan_mp3(EDGE_FRAME * 100)
+    assert info["sample_rate"] == 24000
+    assert info["channels"] == 1
+    assert info["bitrate"] == 48000
+    assert info["duration"] == pytest.approx(100 * 576 / 24000)
+    assert info["vbr"] is False
+
+
+def test_id3v2_tag_and_exact_scan():
+    """ID3v2 tags are skipped and an exact scan counts every frame."""
+    tag = b"ID3\x03\x00\x00" + bytes([0, 0, 0, 20]) + b"\x00" * 20
+    info = scan_mp3(tag + EDGE_FRAME * 50, exact=True)
+    assert info["frames"] == 50
+    assert info["method"] == "frame-scan"
+    assert info["duration"] == pytest.approx(50 * 576 / 24000)
+
+
+def test_xing_header_frame_count():
+    """The Xing header's frame count is used instead of walking frames."""
+    first = bytearray(MPEG1_HEADER + b"\x00" * (MPEG1_FRAME_LEN - 4))
+    first[36:48] = b"Xing" + struct.pack(">II", 0x01, 1000)
+    data = bytes(first) + (MPEG1_HEADER + b"\x00" * (MPEG1_FRAME_LEN - 4)) * 3
+    info = scan_mp3(data)
+    assert info["method"] == "xing"
+    assert info["frames"] == 1000
+    assert info["duration"] == pytest.approx(1000 * 1152 / 44100)
+
+
+def test_scan_file_and_invalid_data(tmp_path):
+    """Files are scanned through mmap; non-MP3 data raises ValueError."""
+    path = tmp_path / "episode.mp3"
+    path.write_bytes(EDGE_FRAME * 20)
+    info = scan_mp3_file(str(path))
+    assert info["file_size"] == 20 * 144
+    assert info["duration"] == pytest.approx(20 * 576 / 24000)
+
+    with pytest.raises(ValueError):
+        scan_mp3(b"not an mp3 file at all")
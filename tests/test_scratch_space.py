@@ -0,0 +1,38 @@
+import os
+
+import pytest
+
+from app.services.scratch_space import ScratchSpace
+
+
+@pytest.fixture
+def scratch(tmp_path):
+    space = ScratchSpace()
+    space.directory = str(tmp_path)
+    return space
+
+
+def test_path_removed_on_error(scratch, tmp_path):
+    """Test scratch paths are deleted even when the caller fails"""
+    with pytest.raises(RuntimeError):
+        with scratch.path(".mp3") as path:
+            with open(path, "wb") as f:
+                f.write(b"audio")
+            assert os.path.dirname(path) == str(tmp_path)
+            raise RuntimeError("ffmpeg failed")
+    assert os.listdir(tmp_path) == []
+    assert scratch.in_use == 0
+
+
+def test_sweep_removes_only_stale_scratch_files(scratch, tmp_path):
+    """Test the startup sweep removes old scratch files and keeps everything else"""
+    stale = tmp_path / f"{ScratchSpace.PREFIX}old.mp3"
+    fresh = tmp_path / f"{ScratchSpace.PREFIX}new.mp3"
+    other = tmp_path / "podcast.mp3"
+    for path in (stale, fresh, other):
+        path.write_bytes(b"audio")
+    os.utime(stale, (0, 0))
+    os.utime(other, (0, 0))
+
+    assert scratch.sweep() == 1
+    assert sorted(os.listdir(tmp_path)) == sorted([fresh.name, other.name])
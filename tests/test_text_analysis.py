@@ -0,0 +1,27 @@
+from app.utils.text_analysis import DEFAULT_TITLE, analyze_text
+
+def test_character_histogram():
+    """Test characters are counted by class in a single pass"""
+    analysis = analyze_text("你好 abc 123！")
+    assert analysis.counts == {"han": 2, "latin": 3, "digit": 3, "space": 2, "other": 1}
+    assert analysis.is_chinese
+    assert analysis.readable_chars == 8
+
+def test_cantonese_markers():
+    """Test Cantonese markers are counted and scored"""
+    assert analyze_text("佢哋食咗飯").cantonese_markers == 3
+    assert analyze_text("佢哋食咗飯").is_cantonese
+    assert not analyze_text("他们吃了饭").is_cantonese
+    assert analyze_text("hello").cantonese_score == 0.0
+
+def test_title_from_first_sentence():
+    """Test the title is the first sentence without punctuation"""
+    assert analyze_text("今日天氣好好！我哋去行山。").title == "今日天氣好好"
+    assert analyze_text("一" * 60 + "。").title == "一" * 50 + "..."
+    assert analyze_text("！？").title == DEFAULT_TITLE
+
+def test_result_is_reused():
+    """Test repeated analysis of the same text returns the cached result"""
+    text = "重复分析同一段文本。"
+    assert analyze_text(text) is analyze_text(text)
+    assert analyze_text(text).sentences == ["重复分析同一段文本。"]
@@ -0,0 +1,43 @@
+from app.utils.text_splitter import estimate_tokens, split_by_headings, split_sentences, split_text_by_tokens, split_text_into_chunks
+
+def test_split_sentences():
+    """Test sentence splitting on Chinese and English punctuation"""
+    text = "你好，世界。今日天氣好好！Pi is 3.14 today. 最後一句"
+    assert split_sentences(text) == ["你好，世界。", "今日天氣好好！", "Pi is 3.14 today.", "最後一句"]
+
+def test_chunks_respect_max_chars():
+    """Test chunks are packed from whole sentences within the size limit"""
+    text = "第一句。第二句。第三句。"
+    assert split_text_into_chunks(text, max_chars=8) == ["第一句。第二句。", "第三句。"]
+
+def test_long_sentence_is_split():
+    """Test a sentence longer than the limit is split into several chunks"""
+    chunks = split_text_into_chunks("一" * 25 + "。", max_chars=10)
+    assert all(len(chunk) <= 10 for chunk in chunks)
+    assert "".join(chunks) == "一" * 25 + "。"
+
+def test_paragraphs_start_new_chunk():
+    """Test each paragraph is packed separately"""
+    assert split_text_into_chunks("第一段。\n第二段。", max_chars=100) == ["第一段。", "第二段。"]
+
+def test_token_segments_keep_paragraph_breaks():
+    """Test token-budgeted segments stay within budget and rejoin to the original paragraphs"""
+    text = "第一段第一句。第一段第二句。\n\n第二段。\n" + "很长的一句话，" * 60 + "结束。"
+    segments = split_text_by_tokens(text, max_tokens=60)
+    assert len(segments) > 2
+    assert all(estimate_tokens(segment) <= 60 for segment in segments)
+    assert "".join(segments) == text
+
+def test_split_by_headings_uses_shallowest_repeated_level():
+    """Test a document is split at its top heading level with sub-headings kept in the body"""
+    document = "前言。\n# 第一集\n## 小节\n内容一。\n# 第二集\n内容二。"
+    assert split_by_headings(document) == [
+        ("", "前言。"),
+        ("第一集", "小节\n内容一。"),
+        ("第二集", "内容二。"),
+    ]
+
+def test_split_by_headings_chapters():
+    """Test chapter headings split a document and a document without headings stays whole"""
+    assert [title for title, _ in split_by_headings("第一章 開始\n內容。\n第二章 結束\n內容。")] == ["第一章 開始", "第二章 結束"]
+    assert split_by_headings("只有一段內容。") == [("", "只有一段內容。")]
@@ -0,0 +1,61 @@
+import asyncio
+from collections import OrderedDict
+
+import pytest
+
+from app.core.config import settings
+from app.services.cache_service import cache_service
+from app.services.translation_cache import translation_cache
+from app.services.translation_engine import PROMPT_VERSION, TRANSLATION_MODEL, TranslationEngine
+from scripts.fake_openai_server import FakeOpenAIHandler, start_server
+
+
+@pytest.fixture
+def fake_openai(monkeypatch):
+    server = start_server(latency=0.05)
+    monkeypatch.setattr(settings, "OPENAI_API_BASE", f"http://127.0.0.1:{server.server_address[1]}/v1")
+    monkeypatch.setenv("OPENAI_API_KEY", "fake")
+    monkeypatch.setattr(translation_cache, "enabled", False)
+    yield server
+    server.shutdown()
+
+
+def test_long_text_is_translated_in_order(fake_openai):
+    """Test long text is split into segments and reassembled in the original order"""
+    engine = TranslationEngine()
+    engine.segment_tokens = 30
+    text = "\n".join(f"第{i}段：我们不在这里。" for i in range(8))
+    served = FakeOpenAIHandler.requests_served
+
+    translated = asyncio.run(engine.translate(text))
+
+    assert translated.split("\n") == [f"第{i}段：我哋唔喺这里。" for i in range(8)]
+    assert FakeOpenAIHandler.requests_served - served > 1
+
+
+def test_batch_translation_keeps_input_order(fake_openai):
+    """Test batch translation returns one result per input text"""
+    engine = TranslationEngine()
+    results = asyncio.run(engine.translate_batch(["他是老师", "我们的书"]))
+    assert [item["translatedText"] for item in results] == ["佢係老师", "我哋嘅书"]
+    assert all(item["error"] is None for item in results)
+
+
+def test_is_cached_does_not_count_lookups(monkeypatch):
+    """Test checking for a cached translation leaves the hit ratio untouched"""
+    fakeredis = pytest.importorskip("fakeredis")
+    monkeypatch.setattr(cache_service, "redis_client", fakeredis.FakeRedis())
+    monkeypatch.setattr(translation_cache, "enabled", True)
+    monkeypatch.setattr(translation_cache, "_local", OrderedDict())
+    for counter in ("local_hits", "redis_hits", "misses"):
+        monkeypatch.setattr(translation_cache, counter, 0)
+    engine = TranslationEngine()
+
+    assert not engine.is_cached("我们不在这里。")
+    assert translation_cache.stats()["misses"] == 0
+
+    key = translation_cache.make_key("我们不在这里。", "cantonese", TRANSLATION_MODEL, PROMPT_VERSION)
+    translation_cache.set(key, "我哋唔喺度。")
+    monkeypatch.setattr(translation_cache, "_local", OrderedDict())
+    assert engine.is_cached("我们不在这里。")
+    assert translation_cache.stats()["redis_hits"] == 0
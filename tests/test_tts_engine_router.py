@@ -0,0 +1,197 @@
+import asyncio
+import time
+
+import pytest
+
+from app.services.tts_engine_router import EngineStats, TTSEngineRouter
+
+
+class StubEngine:
+    """An engine that answers after a delay, optionally failing"""
+
+    def __init__(self, name: str, delay: float = 0.0, fail: bool = False):
+        self.name = name
+        self.delay = delay
+        self.fail = fail
+        self.calls = []
+
+    def voice_for(self, voice: str) -> str:
+        return voice
+
+    async def synthesize(self, text: str, voice: str) -> bytes:
+        self.calls.append("started")
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.calls.append("cancelled")
+            raise
+        if self.fail:
+            raise RuntimeError(f"{self.name} failed")
+        return self.name.encode()
+
+
+def make_router(*engines, hedge_delay: float = 0.05) -> TTSEngineRouter:
+    router = TTSEngineRouter(list(engines))
+    router.hedge_enabled = True
+    router.hedge_min_delay = hedge_delay
+    router.hedge_default_delay = 0
+    return router
+
+
+def expire_breaker(stats: EngineStats):
+    stats.opened_at -= stats.reset_timeout
+
+
+def test_breaker_opens_after_consecutive_failures():
+    """Test the breaker opens after the failure threshold and rejects requests"""
+    stats = EngineStats("edge")
+    for _ in range(stats.failure_threshold - 1):
+        stats.record_failure()
+    assert stats.state == EngineStats.CLOSED
+    stats.record_failure()
+    assert stats.state == EngineStats.OPEN
+    assert not stats.available()
+
+
+def test_breaker_opens_on_error_rate():
+    """Test the breaker opens once the windowed error rate passes the threshold"""
+    stats = EngineStats("edge")
+    for _ in range(4):
+        stats.record_success(1.0, 1000)
+        stats.record_failure()
+        stats.record_failure()
+    assert stats.consecutive_failures < stats.failure_threshold
+    assert stats.state == EngineStats.OPEN
+
+
+def test_half_open_allows_a_single_trial():
+    """Test only one trial passes in half_open and its outcome decides the next state"""
+    stats = EngineStats("edge")
+    for _ in range(stats.failure_threshold):
+        stats.record_failure()
+    expire_breaker(stats)
+    assert stats.available()
+
+    assert stats.acquire() == "trial"
+    assert stats.state == EngineStats.HALF_OPEN
+    assert not stats.available()
+    assert stats.acquire() is None
+    assert stats.acquire(force=True) == "normal"
+
+    # A cancelled trial frees the slot so the next request becomes the trial
+    stats.release_trial()
+    assert stats.available()
+    assert stats.acquire() == "trial"
+    stats.record_success(1.0, 1000)
+    assert stats.state == EngineStats.CLOSED
+    assert stats.available()
+
+
+def test_failed_trial_reopens_breaker():
+    """Test a failed half_open trial reopens the breaker"""
+    stats = EngineStats("edge")
+    for _ in range(stats.failure_threshold):
+        stats.record_failure()
+    expire_breaker(stats)
+    stats.acquire()
+    stats.record_failure()
+    assert stats.state == EngineStats.OPEN
+    assert not stats.available()
+
+
+def test_concurrent_requests_send_a_single_trial():
+    """Test concurrent requests on a half_open engine send only one trial and the rest fall back"""
+    primary = StubEngine("edge", delay=0.05)
+    backup = StubEngine("google")
+    router = make_router(primary, backup, hedge_delay=5.0)
+    for _ in range(router.stats["edge"].failure_threshold):
+        router.stats["edge"].record_failure()
+    expire_breaker(router.stats["edge"])
+
+    async def run():
+        return await asyncio.gather(*(router.synthesize("你好", "voice") for _ in range(3)))
+
+    engines = [engine for _, engine in asyncio.run(run())]
+    assert primary.calls == ["started"]
+    assert engines.count(primary) == 1
+    assert engines.count(backup) == 2
+    # Requests turned away by the breaker are not engine failures
+    assert router.stats["edge"].state == EngineStats.CLOSED
+
+
+def test_hedge_delay_scales_with_text_length():
+    """Test the hedge delay follows the length-scaled percentile without an absolute cap"""
+    router = make_router(StubEngine("edge"), StubEngine("google"), hedge_delay=3.0)
+    router.hedge_factor = 1.5
+    for _ in range(20):
+        router.stats["edge"].record_success(10.0, 1000)
+    assert router.hedge_delay("edge", 1000) == pytest.approx(15.0)
+    assert router.hedge_delay("edge", 10000) == pytest.approx(150.0)
+    assert router.hedge_delay("edge", 100) == pytest.approx(3.0)
+
+
+def test_hedge_fires_after_delay_and_cancels_primary():
+    """Test a slow primary triggers a hedge whose result wins and the primary is cancelled"""
+    primary = StubEngine("edge", delay=5)
+    backup = StubEngine("google", delay=0.01)
+    router = make_router(primary, backup)
+
+    audio, engine = asyncio.run(router.synthesize("你好", "voice"))
+    assert (audio, engine) == (b"google", backup)
+    assert primary.calls == ["started", "cancelled"]
+    assert (router.hedges_fired, router.hedges_won) == (1, 1)
+    # Cancelled requests are not counted as failures
+    assert router.stats["edge"].failures == 0
+
+
+def test_fast_primary_does_not_hedge():
+    """Test no hedge is sent when the primary answers within the delay"""
+    primary = StubEngine("edge", delay=0.01)
+    backup = StubEngine("google")
+    router = make_router(primary, backup, hedge_delay=1.0)
+
+    audio, engine = asyncio.run(router.synthesize("你好", "voice"))
+    assert engine is primary
+    assert backup.calls == []
+    assert router.hedges_fired == 0
+
+
+def test_primary_failure_falls_back_without_waiting():
+    """Test a failing primary switches to the next engine immediately"""
+    primary = StubEngine("edge", fail=True)
+    backup = StubEngine("google")
+    router = make_router(primary, backup, hedge_delay=5.0)
+
+    started = time.monotonic()
+    audio, engine = asyncio.run(router.synthesize("你好", "voice"))
+    assert engine is backup
+    assert time.monotonic() - started < 1.0
+    assert router.stats["edge"].failures == 1
+
+
+def test_fallbacks_tried_in_priority_order():
+    """Test engines are tried in priority order and the last error surfaces when all fail"""
+    engines = [StubEngine("a", fail=True), StubEngine("b", fail=True), StubEngine("c")]
+    router = make_router(*engines)
+    router.hedge_enabled = False
+
+    audio, engine = asyncio.run(router.synthesize("你好", "voice"))
+    assert engine is engines[2]
+    assert [len(e.calls) for e in engines] == [1, 1, 1]
+
+    engines[2].fail = True
+    with pytest.raises(RuntimeError, match="c failed"):
+        asyncio.run(router.synthesize("你好", "voice"))
+
+
+def test_open_breaker_is_skipped():
+    """Test an engine with an open breaker is not tried first"""
+    primary = StubEngine("edge")
+    backup = StubEngine("google")
+    router = make_router(primary, backup)
+    for _ in range(router.stats["edge"].failure_threshold):
+        router.stats["edge"].record_failure()
+
+    audio, engine = asyncio.run(router.synthesize("你好", "voice"))
+    assert engine is backup
+    assert primary.calls == []